@@ -0,0 +1,36 @@
+"""
+数据归档
+将在线表中的旧记录分批移动到结构相同的归档表（保留原主键），控制在线表的数据量
+"""
+from django.db import transaction
+
+
+def archive_in_batches(queryset, archive_model, batch_size=1000):
+    """
+    将queryset命中的记录分批移入archive_model，返回移动的行数
+
+    - 归档表的字段须是在线表字段的子集（按字段名对应）
+    - 每批在一个事务中完成“写入归档表 + 从在线表删除”，中断后重新执行即可继续
+    - 按主键顺序推进，不会反复扫描前面不满足条件的记录
+    """
+    pk_name = queryset.model._meta.pk.attname
+    fields = [field.attname for field in archive_model._meta.concrete_fields]
+    total = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by(pk_name)
+        if last_pk is not None:
+            batch = batch.filter(**{f'{pk_name}__gt': last_pk})
+        with transaction.atomic():
+            rows = list(batch.values(*fields)[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][pk_name]
+            archive_model.objects.bulk_create(
+                [archive_model(**row) for row in rows], ignore_conflicts=True
+            )
+            queryset.model.objects.filter(
+                **{f'{pk_name}__in': [row[pk_name] for row in rows]}
+            ).delete()
+        total += len(rows)
+    return total
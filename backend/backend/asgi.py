@@ -5,12 +5,32 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+除Django应用外，这里还挂载了通知推送接口（Server-Sent Events，见 notifications/stream.py），
+长连接不经过Django的请求处理流程，需使用ASGI服务器运行，例如：
+    uvicorn backend.asgi:application
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+if settings.DEBUG:
+    # 与runserver一致，调试模式下由应用自身提供静态文件（如管理后台的样式）
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    django_application = ASGIStaticFilesHandler(django_application)
+
+# 需在Django初始化之后导入
+from notifications.stream import STREAM_PATH, notification_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await notification_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,169 @@
+"""
+批量请求
+POST /api/batch/ 在一次HTTP请求中执行多个API调用，减少页面加载时的请求数：
+- 只对批量请求本身做一次认证，子请求以同一用户直接分发到URLconf中的视图，不再经过中间件和JWT解码
+- 子请求按顺序执行；parallel为true时，相邻的只读请求（GET/HEAD）在线程池中并发执行，
+  写请求作为分隔点，保证写请求之后的读请求能读到写入的结果
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# 单次批量请求最多包含的子请求数，可通过 BATCH_MAX_REQUESTS 配置
+DEFAULT_MAX_REQUESTS = 20
+# 并发执行只读子请求的线程数，可通过 BATCH_MAX_WORKERS 配置
+DEFAULT_MAX_WORKERS = 4
+READ_METHODS = ('GET', 'HEAD')
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False, default=dict)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/'):
+            raise serializers.ValidationError('只能请求 /api/ 下的接口')
+        return value
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = serializers.ListField(child=SubRequestSerializer(), allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = getattr(settings, 'BATCH_MAX_REQUESTS', DEFAULT_MAX_REQUESTS)
+        if len(value) > limit:
+            raise serializers.ValidationError(f'最多包含{limit}个子请求')
+        return value
+
+
+def build_request(parent, spec):
+    """
+    以批量请求（DRF的Request）为模板构造子请求，沿用客户端地址等环境信息，
+    并标记为已认证的同一用户
+    """
+    url = urlsplit(spec['path'])
+    data = json.dumps(spec['body']).encode() if 'body' in spec else b''
+    environ = {key: value for key, value in parent.META.items() if not key.startswith('wsgi.')}
+    environ.update({
+        'REQUEST_METHOD': spec['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(data)),
+        'wsgi.input': BytesIO(data),
+        'wsgi.url_scheme': parent.scheme,
+    })
+    for name, value in spec['headers'].items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    request = WSGIRequest(environ)
+    # DRF的Request遇到这两个属性时使用ForcedAuthentication，跳过认证类。
+    # 这是DRF内部约定（rest_framework.test.force_authenticate同样依赖它），按requirements.txt中的
+    # djangorestframework==3.15.1确认；升级DRF时需确认 rest_framework.request.Request.__init__ 仍读取这两个属性，
+    # BatchRequestTests.test_sub_requests_reuse_parent_authentication 会在约定失效时失败
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def error_result(status_code, detail):
+    return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
+
+
+def dispatch(parent, spec):
+    """执行一个子请求，返回 {status, headers, body}；单个子请求出错不影响其他子请求"""
+    request = build_request(parent, spec)
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return error_result(404, '未找到。')
+    if getattr(match.func, 'view_class', None) is BatchView:
+        return error_result(400, '不能嵌套批量请求')
+
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Http404:
+        return error_result(404, '未找到。')
+    except PermissionDenied:
+        return error_result(403, '您没有执行该操作的权限。')
+    except Exception:
+        logger.exception('批量请求中的子请求 %s %s 执行失败', spec['method'], spec['path'])
+        return error_result(500, '服务器错误')
+    if response.streaming:
+        return error_result(400, '批量请求不支持流式响应的接口')
+
+    body = None
+    if response.content:
+        if response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset, errors='replace')
+    return {'status': response.status_code, 'headers': dict(response.items()), 'body': body}
+
+
+def dispatch_in_thread(parent, spec):
+    try:
+        return dispatch(parent, spec)
+    finally:
+        # 线程中打开的数据库连接不会被请求结束信号关闭
+        connections.close_all()
+
+
+def run_batch(parent, specs, parallel=False):
+    """按顺序执行子请求；parallel时相邻的只读请求并发执行。返回与specs一一对应的结果"""
+    if not parallel:
+        return [dispatch(parent, spec) for spec in specs]
+
+    results = [None] * len(specs)
+    workers = getattr(settings, 'BATCH_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as executor:
+        pending = []
+        for index, spec in enumerate(specs):
+            if spec['method'] in READ_METHODS:
+                pending.append((index, executor.submit(dispatch_in_thread, parent, spec)))
+                continue
+            # 写请求：等之前的只读请求完成后再执行
+            for position, future in pending:
+                results[position] = future.result()
+            pending = []
+            results[index] = dispatch(parent, spec)
+        for position, future in pending:
+            results[position] = future.result()
+    return results
+
+
+class BatchView(APIView):
+    """
+    批量请求
+
+    请求：{ requests: [{method, path, body?, headers?}, ...], parallel: false }
+    - path 为完整路径（可带查询参数），如 /api/bugs/?page=2
+    - body 为JSON请求体；headers 为额外的请求头（如 If-None-Match），认证信息沿用批量请求的
+    响应：{ responses: [{status, headers, body}, ...] }，顺序与requests一致
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        results = run_batch(request, data['requests'], data['parallel'])
+        return Response({'responses': results})
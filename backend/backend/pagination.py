@@ -0,0 +1,31 @@
+"""
+全局分页配置
+在DRF默认页码分页的基础上支持客户端通过 page_size 参数指定每页数量
+"""
+from django.core.paginator import Paginator
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    标准页码分页
+
+    查询参数：
+    - page: 页码
+    - page_size: 每页数量，默认取 REST_FRAMEWORK['PAGE_SIZE']，最大100
+
+    视图已经统计过查询集的总数时（如条件请求的指纹查询），可以设置视图的 known_count 属性，
+    分页时直接使用，不再执行COUNT(*)
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.known_count = getattr(view, 'known_count', None)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
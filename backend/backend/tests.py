@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bugs.models import Bug
+from modules.models import Module, Product, Project
+from users.views import ProfileView
+
+User = get_user_model()
+
+
+class BatchTestMixin:
+    """一名测试人员、一个模块，以及发送批量请求的辅助方法"""
+
+    def setUp(self):
+        self.tester = User.objects.create_user('t_tester', password='x', role='tester')
+        project = Project.objects.create(name='电商平台')
+        product = Product.objects.create(project=project, name='用户中心')
+        self.module = Module.objects.create(product=product, name='用户登录')
+        self.bug = Bug.objects.create(title='BUG 0', description='复现步骤', module=self.module, creator=self.tester)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tester)
+
+    def batch(self, requests, **data):
+        return self.client.post('/api/batch/', dict(data, requests=requests), format='json')
+
+    def create_spec(self, title):
+        return {'method': 'POST', 'path': '/api/bugs/', 'body': {
+            'title': title, 'description': '复现步骤', 'module': self.module.id,
+            'severity': 'minor', 'priority': 'medium',
+        }}
+
+
+class BatchRequestTests(BatchTestMixin, APITestCase):
+    """批量请求：结果顺序、单个子请求的错误、嵌套与流式接口、数量上限、认证沿用"""
+
+    def test_results_in_request_order(self):
+        response = self.batch([
+            {'path': f'/api/bugs/{self.bug.id}/?fields=id,title'},
+            {'path': '/api/bugs/999999/'},
+            {'path': '/api/not-found/'},
+            self.create_spec('新BUG'),
+            {'path': '/api/bugs/?fields=title'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.data['responses']
+        self.assertEqual([result['status'] for result in results], [200, 404, 404, 201, 200])
+        self.assertEqual(results[0]['body'], {'id': self.bug.id, 'title': 'BUG 0'})
+        self.assertIn('ETag', results[0]['headers'])
+        self.assertEqual(
+            [bug['title'] for bug in results[4]['body']['results']], ['新BUG', 'BUG 0']
+        )
+
+    def test_conditional_sub_request(self):
+        path = f'/api/bugs/{self.bug.id}/'
+        etag = self.batch([{'path': path}]).data['responses'][0]['headers']['ETag']
+        result = self.batch([{'path': path, 'headers': {'If-None-Match': etag}}]).data['responses'][0]
+        self.assertEqual((result['status'], result['body']), (304, None))
+
+    def test_nested_batch_is_rejected(self):
+        results = self.batch([
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'requests': [{'path': '/api/bugs/'}]}},
+            {'path': f'/api/bugs/{self.bug.id}/'},
+        ]).data['responses']
+        self.assertEqual([result['status'] for result in results], [400, 200])
+        self.assertEqual(results[0]['body'], {'detail': '不能嵌套批量请求'})
+
+    def test_streaming_sub_request_is_rejected(self):
+        result = self.batch([{'path': '/api/bugs/export/?file_type=csv'}]).data['responses'][0]
+        self.assertEqual(result['status'], 400)
+        self.assertEqual(result['body'], {'detail': '批量请求不支持流式响应的接口'})
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_request_limit(self):
+        spec = {'path': '/api/bugs/'}
+        self.assertEqual(self.batch([spec, spec]).status_code, 200)
+        response = self.batch([spec, spec, spec])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('requests', response.data)
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch([{'path': '/admin/'}]).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.batch([{'path': '/api/bugs/'}]).status_code, 401)
+
+    def test_sub_requests_reuse_parent_authentication(self):
+        token = AccessToken.for_user(self.tester)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        seen = []
+
+        def profile(view, request):
+            seen.append((request.user, str(request.auth), request.successful_authenticator))
+            return Response({'username': request.user.username})
+
+        with mock.patch.object(JWTAuthentication, 'authenticate', autospec=True,
+                               side_effect=JWTAuthentication.authenticate) as authenticate, \
+                mock.patch.object(ProfileView, 'get', profile):
+            response = client.post('/api/batch/', {'requests': [
+                {'path': '/api/users/profile/'}, {'path': '/api/users/profile/'},
+            ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['responses'][0]['body'], {'username': 't_tester'})
+        # 只认证批量请求本身一次，子请求沿用其用户和令牌，不再解码JWT
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual(len(seen), 2)
+        for user, auth, authenticator in seen:
+            self.assertEqual((user, auth), (self.tester, str(token)))
+            self.assertEqual(type(authenticator).__name__, 'ForcedAuthentication')
+
+
+class ParallelBatchTests(BatchTestMixin, TransactionTestCase):
+    """parallel时只读子请求在线程池中执行，写请求之后的读请求能读到写入的结果"""
+
+    def test_reads_after_a_write_see_it(self):
+        read = {'path': '/api/bugs/?fields=title'}
+        results = self.batch([read, read, self.create_spec('新BUG 1'), read, self.create_spec('新BUG 2'), read],
+                             parallel=True).data['responses']
+        self.assertEqual([result['status'] for result in results], [200, 200, 201, 200, 201, 200])
+        self.assertEqual(
+            [result['body']['count'] for result in results if result['status'] == 200], [1, 1, 2, 3]
+        )
+        self.assertEqual(Bug.objects.count(), 3)
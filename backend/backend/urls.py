@@ -3,12 +3,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .batch import BatchView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/bugs/', include('bugs.urls')),
     path('api/modules/', include('modules.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
 
 if settings.DEBUG:
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BugsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bugs'
+
+    def ready(self):
+        # 注册信号处理（全文检索索引同步）
+        from . import signals  # noqa: F401
@@ -0,0 +1,141 @@
+"""
+BUG模块 - 增量同步
+客户端在本地缓存自己数据范围内的BUG，通过 /api/bugs/changes/?since=<水位> 只获取水位之后的变化：
+- 新建和修改的BUG按 (updated_at, id) 键集顺序读取
+- 删除、移出数据范围的BUG来自墓碑表（见 BugTombstone），按 (created_at, id) 顺序读取
+- 路径变化的模块（项目/产品/模块改名、移动）单独返回，客户端据此更新缓存中BUG的模块路径
+水位是三者读取位置的base64编码，客户端原样回传即可。
+
+updated_at在保存时取值，事务提交可能稍晚：水位最多推进到“当前时间 - 延迟窗口”，
+窗口内的变化会在下一次同步中再返回一次（客户端按id覆盖即可），避免漏掉提交较慢的事务
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from modules.models import Module
+from .models import BugTombstone
+from .pagination import KeysetPagination
+
+# 每次最多返回的BUG数（删除记录、模块分别计数），可通过 BUG_CHANGES_LIMIT 配置
+DEFAULT_LIMIT = 500
+# 水位的延迟窗口（秒），可通过 BUG_CHANGES_LAG_SECONDS 配置
+DEFAULT_LAG_SECONDS = 5
+# 墓碑记录保留天数，可通过 BUG_TOMBSTONE_RETENTION_DAYS 配置；更早的水位需要重新全量同步
+DEFAULT_RETENTION_DAYS = 30
+
+# 水位中的读取位置：键 => 排序时间字段
+STREAMS = (('b', 'updated_at'), ('t', 'created_at'), ('m', 'updated_at'))
+
+
+class InvalidToken(Exception):
+    """水位无法解析"""
+
+
+class ExpiredToken(Exception):
+    """水位早于墓碑记录的保留期限，期间的删除可能已被清理"""
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'BUG_TOMBSTONE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+
+
+def encode_token(positions):
+    payload = {
+        key: [value.isoformat(), pk] for key, (value, pk) in positions.items()
+    }
+    data = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """解析水位，返回 {键: (时间, id)}"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        positions = {}
+        for key, _ in STREAMS:
+            value, pk = payload[key]
+            value = parse_datetime(value)
+            if value is None or not isinstance(pk, int):
+                raise ValueError
+            positions[key] = (value, pk)
+    except (TypeError, ValueError, KeyError, binascii.Error):
+        raise InvalidToken('无效的水位')
+    return positions
+
+
+def _read(queryset, field, position, limit):
+    """按 (field, id) 顺序读取position之后的至多limit行，返回 (行, 是否还有更多)"""
+    ordering = (field, 'id')
+    queryset = queryset.order_by(*ordering)
+    if position is not None:
+        queryset = queryset.filter(KeysetPagination._after(ordering, position))
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _advance(position, rows, field, has_more, horizon):
+    """
+    本次读取后的新位置：读到的最后一行；没有更多时不超过延迟窗口的起点，
+    窗口内的行下次会再读一遍
+    """
+    if rows:
+        position = (getattr(rows[-1], field), rows[-1].id)
+    if has_more:
+        return position
+    if position is None or position > (horizon, 0):
+        return (horizon, 0)
+    return position
+
+
+def collect_changes(bugs, tombstones, token=None, limit=None):
+    """
+    收集水位之后的变化
+
+    - bugs: 当前用户数据范围内的BUG查询集（可预先select_related/only）
+    - tombstones: 按同样规则过滤的墓碑记录查询集
+    - token: 上次返回的水位；为空时从头返回全部BUG（用于首次建立缓存），删除和模块只返回延迟窗口内的
+
+    返回 {changed: [Bug], deleted: [BUG id], modules: [Module], next: 新水位, has_more: 是否还有更多}；
+    has_more为true时客户端应立即用新水位继续同步
+    """
+    limit = limit or getattr(settings, 'BUG_CHANGES_LIMIT', DEFAULT_LIMIT)
+    now = timezone.now()
+    horizon = now - timedelta(seconds=getattr(settings, 'BUG_CHANGES_LAG_SECONDS', DEFAULT_LAG_SECONDS))
+    if token:
+        positions = decode_token(token)
+        if positions['t'][0] < now - tombstone_retention():
+            raise ExpiredToken('水位已过期，请重新全量同步')
+    else:
+        positions = {'b': None, 't': (horizon, 0), 'm': (horizon, 0)}
+
+    # 移出数据范围的墓碑记录对应的BUG可能仍然可见（如分配给了测试人员自己创建的BUG），这些不下发
+    tombstones = tombstones.filter(~Exists(bugs.order_by().filter(id=OuterRef('bug_id'))))
+    sources = {
+        'b': bugs,
+        't': tombstones.only('id', 'bug_id', 'created_at'),
+        'm': Module.objects.only('id', 'path', 'updated_at'),
+    }
+    results = {}
+    has_more = False
+    next_positions = {}
+    for key, field in STREAMS:
+        rows, more = _read(sources[key], field, positions[key], limit)
+        results[key] = rows
+        has_more = has_more or more
+        next_positions[key] = _advance(positions[key], rows, field, more, horizon)
+
+    return {
+        'changed': results['b'],
+        'deleted': list(dict.fromkeys(row.bug_id for row in results['t'])),
+        'modules': results['m'],
+        'next': encode_token(next_positions),
+        'has_more': has_more,
+    }
@@ -0,0 +1,256 @@
+"""
+BUG模块 - 列表导出
+按列表的筛选条件流式导出BUG，支持 CSV / NDJSON / XLSX 三种格式：
+- 只查询导出需要的列（values_list，不实例化模型），按 (created_at, id) 键集分批查询：
+  每批一条独立的查询，不依赖数据库驱动的服务端游标（MySQL的mysqlclient会把整个结果集读入内存）
+- 每积累一批行就输出一段响应，内存占用与导出行数无关
+- XLSX由标准库zipfile直接写入不可回溯的输出流，工作表使用内联字符串，无需共享字符串表
+- CSV/XLSX中以 = + - @ 等开头的文本前加单引号，避免在Excel中被当作公式执行
+"""
+import csv
+import json
+import re
+import zipfile
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Bug
+from .pagination import KeysetPagination
+
+# 每次从数据库读取的行数，可通过 BUG_EXPORT_CHUNK_SIZE 配置
+DEFAULT_CHUNK_SIZE = 2000
+# 每输出一段响应包含的行数
+ROWS_PER_CHUNK = 500
+# 导出按创建时间倒序（全文检索时也不按相关度排序），与列表的默认排序一致
+EXPORT_ORDERING = ('-created_at', '-id')
+# 表格软件会当作公式解析的开头字符
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# 查询的列 => 导出行的键
+VALUE_FIELDS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('severity', 'severity'),
+    ('priority', 'priority'),
+    ('status', 'status'),
+    ('module__path', 'module_path'),
+    ('version', 'version'),
+    ('creator__username', 'creator_name'),
+    ('assignee__username', 'assignee_name'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+DISPLAY_CHOICES = {
+    'severity': dict(Bug.SEVERITY_CHOICES),
+    'priority': dict(Bug.PRIORITY_CHOICES),
+    'status': dict(Bug.STATUS_CHOICES),
+}
+# CSV/XLSX的列（键, 表头），枚举字段导出显示值
+TABLE_COLUMNS = (
+    ('id', 'ID'),
+    ('title', '标题'),
+    ('severity_display', '严重程度'),
+    ('priority_display', '优先级'),
+    ('status_display', '状态'),
+    ('module_path', '所属模块'),
+    ('version', '版本号'),
+    ('creator_name', '创建人'),
+    ('assignee_name', '处理人'),
+    ('created_at', '创建时间'),
+    ('updated_at', '更新时间'),
+)
+
+# XML 1.0 不允许的控制字符
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_PARTS = (
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+     'officeDocument/2006/relationships/officeDocument"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="BUG" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+     'officeDocument/2006/relationships/worksheet"/>'
+     '</Relationships>'),
+)
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _keyset_batches(queryset, chunk_size):
+    """按 EXPORT_ORDERING 分批查询，每批从上一批最后一行之后开始，产出每一行的值元组"""
+    columns = [column for column, _ in VALUE_FIELDS]
+    keys = [column.split('__')[0] for column in columns]
+    positions = [keys.index(field.lstrip('-')) for field in EXPORT_ORDERING]
+    queryset = queryset.order_by(*EXPORT_ORDERING).values_list(*columns)
+    position = None
+    while True:
+        batch = queryset
+        if position is not None:
+            batch = batch.filter(KeysetPagination._after(EXPORT_ORDERING, position))
+        rows = list(batch[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        position = tuple(rows[-1][i] for i in positions)
+
+
+def export_rows(queryset, chunk_size=None):
+    """按 EXPORT_ORDERING 逐行产出导出用的字典"""
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'BUG_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    keys = [key for _, key in VALUE_FIELDS]
+    for values in _keyset_batches(queryset, chunk_size):
+        row = dict(zip(keys, values))
+        for field, choices in DISPLAY_CHOICES.items():
+            row[f'{field}_display'] = choices.get(row[field], row[field])
+        row['module_path'] = row['module_path'] or ''
+        row['assignee_name'] = row['assignee_name'] or ''
+        row['created_at'] = timezone.localtime(row['created_at'])
+        row['updated_at'] = timezone.localtime(row['updated_at'])
+        yield row
+
+
+def _table_cells(row):
+    """CSV/XLSX一行的单元格值，可能被解析为公式的文本加单引号前缀"""
+    cells = []
+    for key, _ in TABLE_COLUMNS:
+        value = row[key]
+        if key in ('created_at', 'updated_at'):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        elif isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+            value = "'" + value
+        cells.append(value)
+    return cells
+
+
+def _batched(pieces):
+    """把逐行生成的片段按 ROWS_PER_CHUNK 合并后输出，减少写响应的次数"""
+    batch = []
+    for piece in pieces:
+        batch.append(piece)
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield ''.join(batch).encode()
+            batch = []
+    if batch:
+        yield ''.join(batch).encode()
+
+
+class _Echo:
+    """csv.writer的伪文件：write直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    # UTF-8 BOM，Excel打开时才能正确识别中文
+    header = '\ufeff' + writer.writerow([title for _, title in TABLE_COLUMNS])
+    return _batched(chain([header], (writer.writerow(_table_cells(row)) for row in rows)))
+
+
+def stream_ndjson(rows):
+    def line(row):
+        row['created_at'] = row['created_at'].isoformat()
+        row['updated_at'] = row['updated_at'].isoformat()
+        return json.dumps(row, ensure_ascii=False) + '\n'
+    return _batched(line(row) for row in rows)
+
+
+class _StreamBuffer:
+    """
+    只写缓冲区：zipfile写入的数据暂存在这里，由生成器逐段取出
+    没有tell/seek，zipfile会按不可回溯的流写入（文件大小等记录在数据描述符中）
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _xlsx_row(index, cells):
+    parts = [f'<row r="{index}">']
+    for value in cells:
+        if isinstance(value, int):
+            parts.append(f'<c t="n"><v>{value}</v></c>')
+        else:
+            text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+            parts.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    parts.append('</row>')
+    return ''.join(parts).encode()
+
+
+def stream_xlsx(rows):
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS:
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(SHEET_HEAD.encode())
+            sheet.write(_xlsx_row(1, [title for _, title in TABLE_COLUMNS]))
+            for index, row in enumerate(rows, 2):
+                sheet.write(_xlsx_row(index, _table_cells(row)))
+                if index % ROWS_PER_CHUNK == 0:
+                    data = buffer.take()
+                    if data:
+                        yield data
+            sheet.write(SHEET_TAIL.encode())
+    yield buffer.take()
+
+
+# 导出格式 => (Content-Type, 生成器)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', stream_csv),
+    'ndjson': ('application/x-ndjson; charset=utf-8', stream_ndjson),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_xlsx),
+}
+
+
+def export_response(queryset, file_type):
+    """返回流式下载响应，file_type须为 EXPORT_FORMATS 中的格式"""
+    content_type, stream = EXPORT_FORMATS[file_type]
+    filename = 'bugs-{}.{}'.format(timezone.localtime().strftime('%Y%m%d-%H%M%S'), file_type)
+    response = StreamingHttpResponse(stream(export_rows(queryset)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # 关闭Nginx的响应缓冲，边查询边下载
+    response['X-Accel-Buffering'] = 'no'
+    return response
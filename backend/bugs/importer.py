@@ -0,0 +1,300 @@
+"""
+BUG模块 - 批量导入
+从CSV/NDJSON文件导入BUG及其操作历史，供迁移旧系统数据使用（管理命令 import_bugs 和管理员导入接口）：
+- 逐行读取文件，创建人/处理人/模块在内存中按用户名、模块路径查找，不逐行查询
+- 每批记录先逐行校验，无效的行跳过并记入报告；有效的行用 bulk_create 在一个事务中写入
+- 每批提交后回调进度（已处理到第几条记录），中断后可从该位置继续导入
+- 写入时同步全文检索索引、节点数量汇总和每日统计；相似BUG索引按id自动补齐
+- dry_run时只校验，不写入数据库，报告中的导入数为可导入的记录数
+
+文件格式与导出接口一致：NDJSON使用英文字段名，CSV可使用导出文件的中文表头；
+选项字段既可以是选项值也可以是显示值。原文件中的id会被忽略，导入的BUG使用新的id；
+保留原文件的创建时间，更新时间取导入时间，使增量同步接口（按updated_at读取）能返回导入的BUG
+"""
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from modules.models import Module
+from .export import TABLE_COLUMNS
+from .models import Bug, BugHistory
+from .rollups import adjust_node_counts, bug_deltas
+from .search import get_search_backend
+from .stats import add_daily_stats, tally_daily_stats
+
+User = get_user_model()
+
+# 每批导入的记录数，可通过 BUG_IMPORT_BATCH_SIZE 配置
+DEFAULT_BATCH_SIZE = 1000
+# 报告中最多列出的错误行数
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# CSV表头 => 字段名：导出文件的中文表头，以及导出文件中没有的几个字段
+HEADER_ALIASES = {title: key for key, title in TABLE_COLUMNS}
+HEADER_ALIASES.update({
+    '严重程度': 'severity',
+    '优先级': 'priority',
+    '状态': 'status',
+    '描述': 'description',
+    '解决说明': 'solution',
+    '驳回原因': 'reject_reason',
+})
+
+# 选项字段：选项值和显示值都映射为选项值
+CHOICES = {
+    'severity': Bug.SEVERITY_CHOICES,
+    'priority': Bug.PRIORITY_CHOICES,
+    'status': Bug.STATUS_CHOICES,
+    'action': BugHistory.ACTION_CHOICES,
+}
+CHOICE_VALUES = {
+    field: {**{code: code for code, _ in choices}, **{label: code for code, label in choices}}
+    for field, choices in CHOICES.items()
+}
+
+
+class RowError(Exception):
+    """单条记录无效，跳过该记录"""
+
+
+class ImportConflict(Exception):
+    """导入期间有其他写入，无法确定新行的主键；当前批次已回滚，可从报告中的位置继续"""
+
+
+def read_records(stream, file_type):
+    """
+    逐条读取导入文件，产出 (序号, 记录)，序号从1开始
+    stream为二进制文件对象；NDJSON中无法解析的行产出 (序号, None)
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_type == 'csv':
+        yield from enumerate(csv.DictReader(text), 1)
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record
+
+
+def insert_rows(model, objs, timestamp_fields):
+    """
+    批量插入并回填主键，再恢复被 auto_now / auto_now_add 覆盖的时间字段，须在事务中调用
+
+    数据库不支持 bulk_create 返回主键时（SQLite、MySQL），插入后在同一事务内按自增顺序取回新行的主键，
+    取到的行数不一致说明有其他写入穿插，抛出ImportConflict
+    """
+    if not objs:
+        return
+    wanted = [[getattr(obj, name) for name in timestamp_fields] for obj in objs]
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objs)
+    else:
+        last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+        model.objects.bulk_create(objs)
+        ids = list(
+            model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:len(objs) + 1]
+        )
+        if len(ids) != len(objs):
+            raise ImportConflict('导入期间有其他写入，请稍后从中断处继续导入')
+        for obj, pk in zip(objs, ids):
+            obj.pk = pk
+    for obj, values in zip(objs, wanted):
+        for name, value in zip(timestamp_fields, values):
+            setattr(obj, name, value)
+    model.objects.bulk_update(objs, timestamp_fields)
+
+
+class BugImporter:
+    """
+    BUG批量导入
+
+    - start: 跳过序号不大于start的记录（从上次中断处继续）
+    - progress: 每批提交后以报告为参数回调，可用于输出进度、保存断点
+    - dry_run: 只校验记录，不写入
+
+    报告格式：{processed: 已处理到的记录序号, imported: 导入数, failed: 无效记录数, errors: [{row, detail}]}
+    """
+
+    def __init__(self, batch_size=None, start=0, progress=None, dry_run=False):
+        self.batch_size = batch_size or getattr(settings, 'BUG_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.start = start
+        self.progress = progress
+        self.dry_run = dry_run
+        self.report = {'processed': start, 'imported': 0, 'failed': 0, 'errors': []}
+        # 查找表：用户名 => 用户id，模块完整路径 => 模块id
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.modules = dict(Module.objects.values_list('path', 'id'))
+
+    def run(self, records):
+        batch = []
+        for number, record in records:
+            if number <= self.start:
+                continue
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report
+
+    def import_batch(self, batch):
+        bugs = []
+        entries = []
+        for number, record in batch:
+            try:
+                bug, history = self.build(record)
+            except RowError as e:
+                self.report['failed'] += 1
+                if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+                    self.report['errors'].append({'row': number, 'detail': str(e)})
+                continue
+            bugs.append(bug)
+            entries.append(history)
+
+        if not self.dry_run:
+            self.write_batch(bugs, entries)
+        self.report['processed'] = batch[-1][0]
+        self.report['imported'] += len(bugs)
+        if self.progress:
+            self.progress(self.report)
+
+    def write_batch(self, bugs, entries):
+        with transaction.atomic():
+            insert_rows(Bug, bugs, ['created_at'])
+            for bug, history in zip(bugs, entries):
+                for entry in history:
+                    entry.bug_id = bug.id
+            insert_rows(BugHistory, [entry for history in entries for entry in history], ['created_at'])
+            adjust_node_counts(bug_deltas([(bug.module_id, bug.status, bug.severity) for bug in bugs]))
+            backend = get_search_backend()
+            for bug in bugs:
+                backend.index(bug)
+            # 只累加本批BUG及其历史对应的每日统计
+            add_daily_stats(tally_daily_stats(
+                {},
+                [(bug.created_at, bug.module_id, bug.creator_id, bug.assignee_id, bug.severity) for bug in bugs],
+                [
+                    (entry.created_at, entry.action, entry.old_value, entry.new_value, bug.module_id,
+                     bug.creator_id, bug.assignee_id, bug.status, bug.severity)
+                    for bug, history in zip(bugs, entries) for entry in history
+                ],
+                self.users,
+            ))
+
+    def build(self, record):
+        """校验一条记录，返回 (未保存的Bug, [未保存的BugHistory])"""
+        if not isinstance(record, dict):
+            raise RowError('不是有效的JSON对象')
+        record = {
+            HEADER_ALIASES.get(key.strip(), key.strip()): value
+            for key, value in record.items() if isinstance(key, str)
+        }
+        created_at = self._datetime(record, 'created_at', timezone.now())
+        bug = Bug(
+            title=self._text(record, 'title', Bug, required=True),
+            description=self._text(record, 'description', Bug),
+            severity=self._choice(record, 'severity', 'minor'),
+            priority=self._choice(record, 'priority', 'medium'),
+            status=self._choice(record, 'status', 'pending'),
+            module_id=self._module(record),
+            version=self._text(record, 'version', Bug),
+            creator_id=self._user(record, 'creator_name', required=True),
+            assignee_id=self._user(record, 'assignee_name'),
+            solution=self._text(record, 'solution', Bug),
+            reject_reason=self._text(record, 'reject_reason', Bug),
+            created_at=created_at,
+        )
+
+        history = record.get('history')
+        if history in (None, ''):
+            return bug, [BugHistory(
+                operator_id=bug.creator_id, action='create',
+                description=f'创建了BUG: {bug.title}', created_at=created_at
+            )]
+        if not isinstance(history, list) or not all(isinstance(entry, dict) for entry in history):
+            raise RowError('history 应为对象数组')
+        return bug, [
+            BugHistory(
+                operator_id=self._user(entry, 'operator_name'),
+                action=self._choice(entry, 'action', None, label='history.action'),
+                field_name=self._text(entry, 'field_name', BugHistory),
+                old_value=self._text(entry, 'old_value', BugHistory),
+                new_value=self._text(entry, 'new_value', BugHistory),
+                description=self._text(entry, 'description', BugHistory),
+                created_at=self._datetime(entry, 'created_at', created_at),
+            )
+            for entry in history
+        ]
+
+    def _text(self, record, key, model, required=False):
+        value = record.get(key)
+        value = '' if value is None else str(value)
+        if required and not value.strip():
+            raise RowError(f'{key} 不能为空')
+        max_length = model._meta.get_field(key).max_length
+        if max_length and len(value) > max_length:
+            raise RowError(f'{key} 长度不能超过{max_length}')
+        return value
+
+    def _choice(self, record, key, default, label=None):
+        value = record.get(key)
+        if value in (None, ''):
+            if default is None:
+                raise RowError(f'{label or key} 不能为空')
+            return default
+        code = CHOICE_VALUES[key].get(str(value))
+        if code is None:
+            raise RowError(f'{label or key} 的取值无效: {value}')
+        return code
+
+    def _user(self, record, key, required=False):
+        username = record.get(key)
+        if not username:
+            if required:
+                raise RowError(f'{key} 不能为空')
+            return None
+        if not isinstance(username, str):
+            raise RowError(f'{key} 应为字符串')
+        if username not in self.users:
+            raise RowError(f'用户不存在: {username}')
+        return self.users[username]
+
+    def _module(self, record):
+        path = record.get('module_path')
+        if not path:
+            return None
+        if not isinstance(path, str):
+            raise RowError('module_path 应为字符串')
+        if path not in self.modules:
+            raise RowError(f'模块不存在: {path}')
+        return self.modules[path]
+
+    def _datetime(self, record, key, default):
+        value = record.get(key)
+        if not value:
+            return default
+        try:
+            parsed = parse_datetime(str(value))
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise RowError(f'{key} 的时间格式无效: {value}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
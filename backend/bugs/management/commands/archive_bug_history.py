@@ -0,0 +1,35 @@
+"""
+归档BUG操作历史
+
+用法：python manage.py archive_bug_history [--days 365] [--batch-size 1000]
+将早于保留天数的操作历史分批移入归档表 bug_history_archive，建议每天定时执行；
+保留天数默认取配置 BUG_HISTORY_RETENTION_DAYS（365天）
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.archive import archive_in_batches
+from bugs.models import BugHistory, BugHistoryArchive
+
+
+class Command(BaseCommand):
+    help = '将超过保留期限的BUG操作历史移入归档表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'BUG_HISTORY_RETENTION_DAYS', 365),
+            help='在线保留的天数'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批移动的行数')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        count = archive_in_batches(
+            BugHistory.objects.filter(created_at__lt=cutoff),
+            BugHistoryArchive,
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'已归档 {count} 条操作历史'))
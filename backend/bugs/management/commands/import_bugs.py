@@ -0,0 +1,94 @@
+"""
+批量导入BUG
+
+用法：python manage.py import_bugs <文件> [--file-type csv|ndjson] [--batch-size 1000] [--restart] [--dry-run]
+逐批写入并在每批提交后保存断点（默认为 <文件>.checkpoint），中断后重新执行同一命令即从断点继续；
+文件内容变化（大小不同）时断点失效，从头导入。全部导入完成后删除断点文件。
+--dry-run 只校验文件中的记录并报告无效记录，不写入数据库，也不读写断点
+"""
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bugs.importer import IMPORT_FORMATS, BugImporter, ImportConflict, read_records
+
+
+class Command(BaseCommand):
+    help = '从CSV/NDJSON文件批量导入BUG及操作历史'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径')
+        parser.add_argument('--file-type', choices=IMPORT_FORMATS, help='文件格式，默认按扩展名判断')
+        parser.add_argument('--batch-size', type=int, help='每批导入的记录数')
+        parser.add_argument('--checkpoint', help='断点文件路径')
+        parser.add_argument('--restart', action='store_true', help='忽略已有断点，从头导入')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.isfile(path):
+            raise CommandError(f'文件不存在: {path}')
+        file_type = options['file_type'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        size = os.path.getsize(path)
+
+        dry_run = options['dry_run']
+        start = 0
+        if not options['restart'] and not dry_run:
+            start = self.load_checkpoint(checkpoint_path, path, size)
+            if start:
+                self.stdout.write(f'从断点继续：跳过前 {start} 条记录')
+
+        def progress(report):
+            if not dry_run:
+                self.save_checkpoint(
+                    checkpoint_path, {'source': path, 'size': size, 'processed': report['processed']}
+                )
+            self.stdout.write(
+                f'已处理 {report["processed"]} 条，导入 {report["imported"]} 条，无效 {report["failed"]} 条'
+            )
+
+        importer = BugImporter(
+            batch_size=options['batch_size'], start=start, progress=progress, dry_run=dry_run
+        )
+        with open(path, 'rb') as stream:
+            try:
+                report = importer.run(read_records(stream, file_type))
+            except ImportConflict as e:
+                raise CommandError(f'{e}（已处理到第 {importer.report["processed"]} 条）')
+
+        for error in report['errors']:
+            self.stderr.write(f'第 {error["row"]} 条: {error["detail"]}')
+        if report['failed'] > len(report['errors']):
+            self.stderr.write(f'……另有 {report["failed"] - len(report["errors"])} 条无效记录未列出')
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f'校验完成：可导入 {report["imported"]} 条，无效 {report["failed"]} 条'
+            ))
+            return
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：导入 {report["imported"]} 条，无效 {report["failed"]} 条'
+        ))
+
+    def load_checkpoint(self, checkpoint_path, path, size):
+        try:
+            with open(checkpoint_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('source') != path or data.get('size') != size:
+            self.stdout.write(self.style.WARNING('断点与导入文件不匹配，从头导入'))
+            return 0
+        return data.get('processed', 0)
+
+    def save_checkpoint(self, checkpoint_path, data):
+        """原子写盘：先写临时文件再替换"""
+        directory = os.path.dirname(os.path.abspath(checkpoint_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, checkpoint_path)
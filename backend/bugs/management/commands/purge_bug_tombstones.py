@@ -0,0 +1,31 @@
+"""
+清理BUG墓碑记录
+
+用法：python manage.py purge_bug_tombstones [--days 30]
+删除早于保留天数的墓碑记录，建议每天定时执行；保留天数默认取配置 BUG_TOMBSTONE_RETENTION_DAYS（30天），
+增量同步接口对早于保留期限的水位返回410，客户端重新全量同步
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bugs.changes import DEFAULT_RETENTION_DAYS
+from bugs.models import BugTombstone
+
+
+class Command(BaseCommand):
+    help = '删除超过保留期限的BUG墓碑记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=getattr(settings, 'BUG_TOMBSTONE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS),
+            help='保留的天数'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        count, _ = BugTombstone.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'已删除 {count} 条墓碑记录'))
@@ -0,0 +1,20 @@
+"""
+重建BUG每日统计汇总表
+
+用法：python manage.py rebuild_bug_daily_stats [--batch-size 1000]
+适用于首次上线汇总表、或汇总数据与BUG表出现偏差时
+"""
+from django.core.management.base import BaseCommand
+
+from bugs.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = '从BUG表及操作历史全量重建每日统计汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批读取/写入的行数')
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'每日统计汇总已重建，共 {count} 行'))
@@ -0,0 +1,20 @@
+"""
+重建项目/产品/模块节点的BUG数量汇总
+
+用法：python manage.py rebuild_bug_node_counts
+适用于首次上线汇总表、或直接修改BUG表导致汇总出现偏差时
+"""
+from django.core.management.base import BaseCommand
+
+from bugs.rollups import rebuild_node_counts
+
+
+class Command(BaseCommand):
+    help = '从BUG表全量重建项目/产品/模块节点的BUG数量汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的行数')
+
+    def handle(self, *args, **options):
+        count = rebuild_node_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'节点BUG数量汇总已重建，共 {count} 行'))
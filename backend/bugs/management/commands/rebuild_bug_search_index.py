@@ -0,0 +1,25 @@
+"""
+重建BUG全文检索索引
+
+用法：python manage.py rebuild_bug_search_index [--batch-size 1000]
+适用于批量导入数据、或直接修改数据库导致索引与BUG表不一致时
+（MySQL的FULLTEXT索引由数据库自动维护，无需重建）
+"""
+from django.core.management.base import BaseCommand
+
+from bugs.models import Bug
+from bugs.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = '重建BUG全文检索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的行数')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild(Bug.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{type(backend).__name__}: 全文检索索引已重建，共 {count} 条'
+        ))
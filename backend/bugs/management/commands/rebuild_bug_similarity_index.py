@@ -0,0 +1,19 @@
+"""
+重建相似BUG检测索引
+
+用法：python manage.py rebuild_bug_similarity_index
+重新计算全部BUG的MinHash签名并写入 BUG_SIMILARITY_INDEX_PATH（默认 var/bug_minhash.pkl）
+运行中的服务进程会在重启后加载新索引
+"""
+from django.core.management.base import BaseCommand
+
+from bugs.similarity import SimilarityIndex, index_path
+
+
+class Command(BaseCommand):
+    help = '重建相似BUG检测（MinHash）索引'
+
+    def handle(self, *args, **options):
+        index = SimilarityIndex(index_path())
+        count = index.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'相似BUG索引已重建，共 {count} 条，写入 {index.path}'))
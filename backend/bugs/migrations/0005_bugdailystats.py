@@ -0,0 +1,39 @@
+# Generated by Django 3.2.22 on 2026-10-17 20:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bugs', '0004_bughistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BugDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('processing', '处理中'), ('resolved', '已解决'), ('rejected', '已驳回'), ('closed', '已关闭')], max_length=20, verbose_name='状态')),
+                ('severity', models.CharField(choices=[('critical', '致命'), ('major', '严重'), ('minor', '一般'), ('trivial', '轻微')], max_length=20, verbose_name='严重程度')),
+                ('created', models.PositiveIntegerField(default=0, verbose_name='新建数')),
+                ('entered', models.PositiveIntegerField(default=0, verbose_name='进入状态数')),
+                ('assigned', models.PositiveIntegerField(default=0, verbose_name='分配数')),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='处理人')),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+                ('module', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='modules.module', verbose_name='所属模块')),
+            ],
+            options={
+                'verbose_name': 'BUG每日统计',
+                'verbose_name_plural': 'BUG每日统计',
+                'db_table': 'bug_daily_stats',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'module', 'creator', 'assignee', 'status', 'severity')},
+            },
+        ),
+    ]
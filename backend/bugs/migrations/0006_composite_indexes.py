@@ -0,0 +1,41 @@
+# Generated by Django 3.2.22 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bugs', '0005_bugdailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['created_at', 'id'], name='bugs_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['assignee', 'created_at'], name='bugs_assignee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['assignee', 'status', 'created_at'], name='bugs_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['creator', 'created_at'], name='bugs_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['module', 'created_at'], name='bugs_module_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['status', 'created_at'], name='bugs_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bughistory',
+            index=models.Index(fields=['bug', 'created_at'], name='bug_history_bug_created_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+import re
+
+from django.db import migrations
+
+# 切词规则复制自 bugs.search（迁移不依赖可能变化的应用代码），与写入索引时的规则一致
+CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+SEGMENT_RE = re.compile(rf'[{CJK_CHARS}]+|[^\W{CJK_CHARS}]+')
+CJK_RE = re.compile(rf'[{CJK_CHARS}]')
+
+
+def ngram_text(text):
+    """连续的中文切分为重叠的二元组，其他字母数字按词切分并转为小写，以空格连接"""
+    tokens = []
+    for match in SEGMENT_RE.finditer((text or '').lower()):
+        word = match.group()
+        if CJK_RE.match(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return ' '.join(tokens)
+
+
+def create_search_index(apps, schema_editor):
+    """按数据库类型创建全文检索索引：SQLite使用FTS5虚拟表，MySQL使用FULLTEXT索引"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS bugs_fts "
+            "USING fts5(title, description, tokenize='unicode61')"
+        )
+        Bug = apps.get_model('bugs', 'Bug')
+        rows = [
+            (bug_id, ngram_text(title), ngram_text(description))
+            for bug_id, title, description in Bug.objects.values_list('id', 'title', 'description')
+        ]
+        if rows:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO bugs_fts (rowid, title, description) VALUES (%s, %s, %s)', rows
+                )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE bugs ADD FULLTEXT INDEX bugs_fulltext_idx (title, description) WITH PARSER ngram'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS bugs_fts')
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE bugs DROP INDEX bugs_fulltext_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bugs', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.22 on 2026-10-17 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bugs', '0007_bug_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BugHistoryArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='原记录ID')),
+                ('action', models.CharField(choices=[('create', '创建'), ('update', '更新'), ('status_change', '状态变更'), ('assign', '分配'), ('delete', '删除')], max_length=20, verbose_name='操作类型')),
+                ('field_name', models.CharField(blank=True, default='', max_length=50, verbose_name='变更字段')),
+                ('old_value', models.TextField(blank=True, default='', verbose_name='原值')),
+                ('new_value', models.TextField(blank=True, default='', verbose_name='新值')),
+                ('description', models.TextField(blank=True, default='', verbose_name='操作描述')),
+                ('created_at', models.DateTimeField(verbose_name='操作时间')),
+                ('bug', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_history', to='bugs.bug', verbose_name='BUG')),
+                ('operator', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='操作人')),
+            ],
+            options={
+                'verbose_name': 'BUG操作历史归档',
+                'verbose_name_plural': 'BUG操作历史归档',
+                'db_table': 'bug_history_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bughistoryarchive',
+            index=models.Index(fields=['bug', 'created_at'], name='bug_history_arch_bug_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.22 on 2026-10-17 21:08
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def backfill_node_counts(apps, schema_editor):
+    """按现有BUG统计各节点的数量"""
+    Bug = apps.get_model('bugs', 'Bug')
+    BugNodeCount = apps.get_model('bugs', 'BugNodeCount')
+    rows = Bug.objects.filter(module__isnull=False).order_by().values(
+        'module_id', 'module__product_id', 'module__project_id', 'status', 'severity'
+    ).annotate(n=models.Count('id'))
+    totals = Counter()
+    for row in rows:
+        for level, node_id in (
+            ('module', row['module_id']),
+            ('product', row['module__product_id']),
+            ('project', row['module__project_id']),
+        ):
+            totals[(level, node_id, row['status'], row['severity'])] += row['n']
+    BugNodeCount.objects.bulk_create([
+        BugNodeCount(level=level, node_id=node_id, status=status, severity=severity, count=count)
+        for (level, node_id, status, severity), count in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bugs', '0008_bughistoryarchive'),
+        ('modules', '0002_module_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BugNodeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('project', '项目'), ('product', '产品'), ('module', '模块')], max_length=10, verbose_name='层级')),
+                ('node_id', models.BigIntegerField(verbose_name='节点ID')),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('processing', '处理中'), ('resolved', '已解决'), ('rejected', '已驳回'), ('closed', '已关闭')], max_length=20, verbose_name='状态')),
+                ('severity', models.CharField(choices=[('critical', '致命'), ('major', '严重'), ('minor', '一般'), ('trivial', '轻微')], max_length=20, verbose_name='严重程度')),
+                ('count', models.IntegerField(default=0, verbose_name='BUG数')),
+            ],
+            options={
+                'verbose_name': 'BUG节点汇总',
+                'verbose_name_plural': 'BUG节点汇总',
+                'db_table': 'bug_node_counts',
+                'unique_together': {('level', 'node_id', 'status', 'severity')},
+            },
+        ),
+        migrations.RunPython(backfill_node_counts, migrations.RunPython.noop),
+    ]
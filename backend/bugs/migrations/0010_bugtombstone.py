@@ -0,0 +1,36 @@
+# Generated by Django 3.2.22 on 2026-10-17 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bugs', '0009_bugnodecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BugTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bug_id', models.BigIntegerField(verbose_name='BUG ID')),
+                ('creator_id', models.BigIntegerField(null=True, verbose_name='创建人ID')),
+                ('assignee_id', models.BigIntegerField(null=True, verbose_name='处理人ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='记录时间')),
+            ],
+            options={
+                'verbose_name': 'BUG墓碑',
+                'verbose_name_plural': 'BUG墓碑',
+                'db_table': 'bug_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['updated_at', 'id'], name='bugs_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bugtombstone',
+            index=models.Index(fields=['created_at', 'id'], name='bug_tombstones_created_idx'),
+        ),
+    ]
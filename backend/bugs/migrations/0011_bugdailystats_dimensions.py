@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def fill_dimensions(apps, schema_editor):
+    """
+    为已有的汇总行计算维度键
+    模块或处理人为空的行可能已被并发写入重复创建，同一日期、同一维度的行合并为一行
+    """
+    BugDailyStats = apps.get_model('bugs', 'BugDailyStats')
+    kept = {}
+    duplicates = []
+    for row in BugDailyStats.objects.order_by('id').iterator():
+        row.dimensions = '{}:{}:{}:{}:{}'.format(
+            row.module_id or 0, row.creator_id, row.assignee_id or 0, row.status, row.severity
+        )
+        first = kept.get((row.date, row.dimensions))
+        if first is None:
+            kept[(row.date, row.dimensions)] = row
+            continue
+        first.created += row.created
+        first.entered += row.entered
+        first.assigned += row.assigned
+        duplicates.append(row.id)
+    BugDailyStats.objects.filter(id__in=duplicates).delete()
+    BugDailyStats.objects.bulk_update(
+        list(kept.values()), ['dimensions', 'created', 'entered', 'assigned'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bugs', '0010_bugtombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bugdailystats',
+            name='dimensions',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='维度键'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='bugdailystats',
+            unique_together={('date', 'dimensions')},
+        ),
+    ]
@@ -105,6 +105,23 @@ class Bug(models.Model):
         verbose_name = 'BUG'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']  # 按创建时间倒序，最新的在前
+        # 组合索引与列表/统计接口的筛选+排序组合对应
+        indexes = [
+            # 默认排序及游标分页：ORDER BY created_at DESC, id DESC
+            models.Index(fields=['created_at', 'id'], name='bugs_created_id_idx'),
+            # 开发人员数据范围（assignee=我）、按处理人筛选
+            models.Index(fields=['assignee', 'created_at'], name='bugs_assignee_created_idx'),
+            # 开发人员按状态筛选、统计中的开发人员待处理排行
+            models.Index(fields=['assignee', 'status', 'created_at'], name='bugs_assignee_status_idx'),
+            # 测试人员数据范围（creator=我 OR assignee=我）、按创建人筛选
+            models.Index(fields=['creator', 'created_at'], name='bugs_creator_created_idx'),
+            # 按模块筛选、统计中的模块排行
+            models.Index(fields=['module', 'created_at'], name='bugs_module_created_idx'),
+            # 按状态筛选（看板各列）
+            models.Index(fields=['status', 'created_at'], name='bugs_status_created_idx'),
+            # 增量同步：ORDER BY updated_at, id
+            models.Index(fields=['updated_at', 'id'], name='bugs_updated_id_idx'),
+        ]
 
     def __str__(self):
         """返回BUG标题作为字符串表示"""
@@ -180,6 +197,179 @@ class BugHistory(models.Model):
         verbose_name = 'BUG操作历史'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            # 详情页按BUG查询操作历史并按时间倒序
+            models.Index(fields=['bug', 'created_at'], name='bug_history_bug_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.bug.title} - {self.get_action_display()} - {self.created_at}'
+
+
+class BugHistoryArchive(models.Model):
+    """
+    BUG操作历史归档
+
+    超过保留期限的操作历史由 archive_bug_history 命令从 bug_history 移入此表，保留原id；
+    详情和历史接口在在线记录不足时按需读取，调用方无需区分两张表
+    """
+    
+    ACTION_CHOICES = BugHistory.ACTION_CHOICES
+    
+    id = models.BigIntegerField('原记录ID', primary_key=True)
+    bug = models.ForeignKey(
+        Bug,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='archived_history',
+        verbose_name='BUG'
+    )
+    operator = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        db_index=False,
+        related_name='+',
+        verbose_name='操作人'
+    )
+    action = models.CharField('操作类型', max_length=20, choices=ACTION_CHOICES)
+    field_name = models.CharField('变更字段', max_length=50, blank=True, default='')
+    old_value = models.TextField('原值', blank=True, default='')
+    new_value = models.TextField('新值', blank=True, default='')
+    description = models.TextField('操作描述', blank=True, default='')
+    created_at = models.DateTimeField('操作时间')
+    
+    class Meta:
+        db_table = 'bug_history_archive'
+        verbose_name = 'BUG操作历史归档'
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['bug', 'created_at'], name='bug_history_arch_bug_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.bug_id} - {self.get_action_display()} - {self.created_at}'
+
+
+class BugDailyStats(models.Model):
+    """
+    BUG每日统计汇总（物化的仪表盘趋势数据）
+    
+    按 日期 × 模块 × 创建人 × 处理人 × 状态 × 严重程度 汇总当天发生的事件数：
+    - created: 当天新建的BUG数
+    - entered: 当天流转进入该状态的次数（新建计为进入待处理）
+    - assigned: 当天分配给该处理人的次数
+    
+    由创建、状态变更、分配操作增量维护，
+    可通过 python manage.py rebuild_bug_daily_stats 从BUG及操作历史重建
+    
+    模块、处理人可以为空，唯一索引中的NULL互不冲突；维度另存为非空的 dimensions 键（见 dimensions_key），
+    以 (date, dimensions) 唯一，并发写入同一维度的首个事件时才能可靠地退回到UPDATE
+    """
+    
+    date = models.DateField('日期')
+    dimensions = models.CharField('维度键', max_length=100, editable=False)
+    module = models.ForeignKey(
+        'modules.Module',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='所属模块'
+    )
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='创建人'
+    )
+    assignee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='处理人'
+    )
+    status = models.CharField('状态', max_length=20, choices=Bug.STATUS_CHOICES)
+    severity = models.CharField('严重程度', max_length=20, choices=Bug.SEVERITY_CHOICES)
+    created = models.PositiveIntegerField('新建数', default=0)
+    entered = models.PositiveIntegerField('进入状态数', default=0)
+    assigned = models.PositiveIntegerField('分配数', default=0)
+    
+    class Meta:
+        db_table = 'bug_daily_stats'
+        verbose_name = 'BUG每日统计'
+        verbose_name_plural = verbose_name
+        ordering = ['-date']
+        unique_together = ('date', 'dimensions')
+    
+    def __str__(self):
+        return f'{self.date} - {self.get_status_display()} - {self.get_severity_display()}'
+    
+    @staticmethod
+    def dimensions_key(module_id, creator_id, assignee_id, status, severity):
+        """维度键，空的模块、处理人记为0"""
+        return f'{module_id or 0}:{creator_id}:{assignee_id or 0}:{status}:{severity}'
+
+
+class BugNodeCount(models.Model):
+    """
+    项目/产品/模块节点的BUG数量汇总
+    
+    按 层级 × 节点 × 状态 × 严重程度 记录当前的BUG数，任意节点的各状态、各严重程度数量
+    只需读取该节点的汇总行，不扫描BUG表。
+    由BUG的新建、状态/严重程度/模块变更、删除及节点的移动、删除增量维护（见 signals.py），
+    可通过 python manage.py rebuild_bug_node_counts 从BUG表重建
+    """
+    
+    LEVEL_CHOICES = (
+        ('project', '项目'),
+        ('product', '产品'),
+        ('module', '模块'),
+    )
+    
+    level = models.CharField('层级', max_length=10, choices=LEVEL_CHOICES)
+    # 不使用外键，节点删除后由信号清理对应的汇总行
+    node_id = models.BigIntegerField('节点ID')
+    status = models.CharField('状态', max_length=20, choices=Bug.STATUS_CHOICES)
+    severity = models.CharField('严重程度', max_length=20, choices=Bug.SEVERITY_CHOICES)
+    count = models.IntegerField('BUG数', default=0)
+    
+    class Meta:
+        db_table = 'bug_node_counts'
+        verbose_name = 'BUG节点汇总'
+        verbose_name_plural = verbose_name
+        unique_together = ('level', 'node_id', 'status', 'severity')
+    
+    def __str__(self):
+        return f'{self.level}#{self.node_id} - {self.status} - {self.severity}: {self.count}'
+
+
+class BugTombstone(models.Model):
+    """
+    BUG墓碑记录，供增量同步接口（/api/bugs/changes/）通知客户端从本地缓存中移除BUG
+    
+    - BUG删除时记录创建人和处理人，按与BUG相同的数据权限规则下发
+    - 处理人变更时为原处理人记录一条（创建人为空），BUG可能因此移出其数据范围；
+      仍在数据范围内的BUG由增量同步接口过滤掉
+    不使用外键，BUG和用户删除后记录仍然保留；超过保留期限的记录由 purge_bug_tombstones 清理
+    """
+    
+    bug_id = models.BigIntegerField('BUG ID')
+    creator_id = models.BigIntegerField('创建人ID', null=True)
+    assignee_id = models.BigIntegerField('处理人ID', null=True)
+    created_at = models.DateTimeField('记录时间', auto_now_add=True)
+    
+    class Meta:
+        db_table = 'bug_tombstones'
+        verbose_name = 'BUG墓碑'
+        verbose_name_plural = verbose_name
+        indexes = [
+            # 增量同步按 (created_at, id) 顺序读取
+            models.Index(fields=['created_at', 'id'], name='bug_tombstones_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f'BUG#{self.bug_id} @ {self.created_at}'
@@ -0,0 +1,233 @@
+"""
+BUG模块 - 分页
+提供键集（游标）分页，按排序字段的值定位下一页，
+不执行COUNT(*)和OFFSET，翻到任意深度的代价都与第一页相同
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    键集分页
+
+    - ordering: 排序字段，最后一个字段必须唯一（如id），保证位置确定
+    - 游标为排序字段值的base64编码，客户端只需原样回传next/previous链接
+
+    查询参数：
+    - cursor: 游标
+    - page_size: 每页数量（不超过max_page_size）
+
+    返回格式：{ next: 下一页链接, previous: 上一页链接, results: [...] }
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = '无效的游标'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_next_cursor(self):
+        """下一页的游标（不含链接），无下一页时返回None"""
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.position_of(self.page[-1]))
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # 越过末尾的空页，去掉游标回到第一页
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        cursor = self.encode_cursor(self.position_of(self.page[0]), reverse=True)
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def position_of(self, obj):
+        """返回对象在排序字段上的取值，用于生成游标"""
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def encode_cursor(self, position, reverse=False):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """
+        解析游标，返回 (位置, 是否向前翻页)；无游标时位置为None
+        位置中的每个值按model上对应排序字段的类型转换，被篡改的游标返回404而不是进入查询
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        fields = [model._meta.get_field(field.lstrip('-')) for field in self.ordering]
+        return [self._convert(field, value) for field, value in zip(fields, position)], reverse
+    
+    def _convert(self, field, value):
+        """把游标中的一个值转换为排序字段的Python值，不合法时返回404"""
+        if isinstance(field, models.DateTimeField):
+            try:
+                parsed = parse_datetime(value) if isinstance(value, str) else None
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise NotFound(self.invalid_cursor_message)
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            return parsed
+        if isinstance(field, models.IntegerField):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise NotFound(self.invalid_cursor_message)
+            return value
+        if not isinstance(value, str) or (field.choices and value not in dict(field.flatchoices)):
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _after(ordering, position):
+        """
+        构造“排在position之后”的条件（按字典序比较多个字段）
+        例：(-created_at, -id) => created_at < c OR (created_at = c AND id < i)
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class ChainedQuerySet:
+    """
+    首尾相接的多个查询集，供键集分页跨表翻页（如在线表 + 归档表）
+
+    querysets按ordering排序时整体先后相接：前一个的所有记录都排在后一个之前。
+    取数时依次查询，前面的结果已经足够时不再查询后面的；反向排序时按相反顺序查询。
+    只支持键集分页用到的 order_by / filter / 切片
+    """
+
+    def __init__(self, querysets, ordering):
+        self.querysets = list(querysets)
+        self.ordering = tuple(ordering)
+        self.reverse = False
+
+    @property
+    def model(self):
+        """游标按第一个查询集的模型解析，各查询集的排序字段类型须一致"""
+        return self.querysets[0].model
+
+    def _clone(self, querysets, reverse=None):
+        clone = ChainedQuerySet(querysets, self.ordering)
+        clone.reverse = self.reverse if reverse is None else reverse
+        return clone
+
+    def order_by(self, *fields):
+        if fields == self.ordering:
+            reverse = False
+        elif fields == tuple(KeysetPagination._flip(field) for field in self.ordering):
+            reverse = True
+        else:
+            raise ValueError(f'不支持的排序: {fields}')
+        return self._clone([qs.order_by(*fields) for qs in self.querysets], reverse)
+
+    def filter(self, *args, **kwargs):
+        return self._clone([qs.filter(*args, **kwargs) for qs in self.querysets])
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.start or item.step or item.stop is None:
+            raise TypeError('只支持 [:n] 形式的切片')
+        rows = []
+        querysets = reversed(self.querysets) if self.reverse else self.querysets
+        for queryset in querysets:
+            rows.extend(queryset[:item.stop - len(rows)])
+            if len(rows) >= item.stop:
+                break
+        return rows
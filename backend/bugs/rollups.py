@@ -0,0 +1,141 @@
+"""
+BUG模块 - 节点数量汇总
+维护项目/产品/模块三级节点上的BUG数量（BugNodeCount）：
+- BUG的一次变化换算为所在模块及其产品、项目三个节点上的增减，相同的行合并为一次UPDATE
+- 模块或产品移动时，把节点的计数从原上级转移到新上级
+- 读取时按节点汇总为 总数 / 未关闭数 / 各状态 / 各严重程度
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from modules.models import Module
+from .models import Bug, BugNodeCount
+
+# 视为“未关闭”的状态
+OPEN_STATUSES = ('pending', 'processing')
+
+
+def bug_deltas(states, sign=1):
+    """
+    将BUG状态换算为节点计数的增减
+    states: [(module_id, status, severity), ...]；sign为1表示增加，-1表示减少
+    返回 Counter{(level, node_id, status, severity): 增减数}
+    """
+    states = [state for state in states if state and state[0] is not None]
+    deltas = Counter()
+    if not states:
+        return deltas
+    parents = {
+        module_id: (product_id, project_id)
+        for module_id, product_id, project_id in Module.objects.filter(
+            id__in={state[0] for state in states}
+        ).values_list('id', 'product_id', 'project_id')
+    }
+    for module_id, status, severity in states:
+        if module_id not in parents:
+            continue
+        product_id, project_id = parents[module_id]
+        for level, node_id in (('module', module_id), ('product', product_id), ('project', project_id)):
+            deltas[(level, node_id, status, severity)] += sign
+    return deltas
+
+
+def adjust_node_counts(deltas):
+    """按 bug_deltas 的结果增减计数；只有增加时才会创建缺失的行"""
+    for (level, node_id, status, severity), n in deltas.items():
+        if not n:
+            continue
+        key = {'level': level, 'node_id': node_id, 'status': status, 'severity': severity}
+        if BugNodeCount.objects.filter(**key).update(count=F('count') + n) or n < 0:
+            continue
+        try:
+            with transaction.atomic():
+                BugNodeCount.objects.create(**key, count=n)
+        except IntegrityError:
+            # 并发请求已创建该行，退回到UPDATE
+            BugNodeCount.objects.filter(**key).update(count=F('count') + n)
+
+
+def move_node_counts(level, node_id, old_parents, new_parents):
+    """
+    节点移动到新的上级：把该节点的计数从原上级减去、加到新上级
+    old_parents/new_parents: [(level, node_id), ...]
+    """
+    rows = BugNodeCount.objects.filter(level=level, node_id=node_id).exclude(count=0).values_list(
+        'status', 'severity', 'count'
+    )
+    deltas = Counter()
+    for status, severity, count in rows:
+        for parent_level, parent_id in old_parents:
+            deltas[(parent_level, parent_id, status, severity)] -= count
+        for parent_level, parent_id in new_parents:
+            deltas[(parent_level, parent_id, status, severity)] += count
+    adjust_node_counts(deltas)
+
+
+def drop_node_counts(level, node_id, parents=()):
+    """节点删除：从上级中减去该节点的计数（其下的BUG不再属于任何节点），并删除该节点的汇总行"""
+    move_node_counts(level, node_id, parents, ())
+    BugNodeCount.objects.filter(level=level, node_id=node_id).delete()
+
+
+def empty_summary():
+    return {
+        'total': 0,
+        'open': 0,
+        'status': {code: 0 for code, _ in Bug.STATUS_CHOICES},
+        'severity': {code: 0 for code, _ in Bug.SEVERITY_CHOICES},
+    }
+
+
+def node_counts(level=None, node_ids=None):
+    """
+    读取节点的BUG数量汇总
+    返回 {(level, node_id): {'total', 'open', 'status': {...}, 'severity': {...}}}；
+    指定node_ids时，没有BUG的节点也返回全0的汇总
+    """
+    rows = BugNodeCount.objects.exclude(count=0)
+    if level is not None:
+        rows = rows.filter(level=level)
+    if node_ids is not None:
+        rows = rows.filter(node_id__in=node_ids)
+
+    summaries = {}
+    if node_ids is not None:
+        summaries = {(level, node_id): empty_summary() for node_id in node_ids}
+    for row_level, node_id, status, severity, count in rows.values_list(
+        'level', 'node_id', 'status', 'severity', 'count'
+    ):
+        summary = summaries.setdefault((row_level, node_id), empty_summary())
+        summary['total'] += count
+        if status in OPEN_STATUSES:
+            summary['open'] += count
+        summary['status'][status] += count
+        summary['severity'][severity] += count
+    return summaries
+
+
+def rebuild_node_counts(batch_size=1000):
+    """从BUG表全量重建节点汇总，返回写入的汇总行数"""
+    rows = Bug.objects.filter(module__isnull=False).order_by().values(
+        'module_id', 'module__product_id', 'module__project_id', 'status', 'severity'
+    ).annotate(n=Count('id'))
+    totals = Counter()
+    for row in rows:
+        for level, node_id in (
+            ('module', row['module_id']),
+            ('product', row['module__product_id']),
+            ('project', row['module__project_id']),
+        ):
+            totals[(level, node_id, row['status'], row['severity'])] += row['n']
+
+    objs = [
+        BugNodeCount(level=level, node_id=node_id, status=status, severity=severity, count=count)
+        for (level, node_id, status, severity), count in totals.items()
+    ]
+    with transaction.atomic():
+        BugNodeCount.objects.all().delete()
+        BugNodeCount.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
@@ -0,0 +1,175 @@
+"""
+BUG模块 - 全文检索
+为BUG列表的 search 参数提供可替换的检索后端：
+- SQLiteFTSSearchBackend: SQLite FTS5虚拟表，中文按二元组（bigram）切分后建索引
+- MySQLFulltextSearchBackend: MySQL FULLTEXT索引（ngram解析器）
+- LikeSearchBackend: 标题/描述模糊匹配，无需任何索引
+
+可通过配置 BUG_SEARCH_BACKEND 指定后端类的路径，未配置时按数据库类型自动选择
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# 中日韩统一表意文字
+CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+SEGMENT_RE = re.compile(rf'[{CJK_CHARS}]+|[^\W{CJK_CHARS}]+')
+CJK_RE = re.compile(rf'[{CJK_CHARS}]')
+
+
+def ngram_segments(text):
+    """
+    将文本切分为词段，每个词段是一组相邻的词元
+    - 连续的中文切分为重叠的二元组：“登录失败” => 登录 录失 失败
+    - 其他字母数字按词切分并转为小写
+    """
+    segments = []
+    for match in SEGMENT_RE.finditer((text or '').lower()):
+        word = match.group()
+        if CJK_RE.match(word) and len(word) > 1:
+            segments.append([word[i:i + 2] for i in range(len(word) - 1)])
+        else:
+            segments.append([word])
+    return segments
+
+
+def ngram_text(text):
+    """返回以空格分隔的词元文本，写入FTS索引"""
+    return ' '.join(token for segment in ngram_segments(text) for token in segment)
+
+
+class LikeSearchBackend:
+    """
+    模糊匹配检索：title/description 包含关键字
+    不依赖索引，作为其他后端无法处理查询时的兜底
+    """
+
+    def search(self, queryset, query):
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    def index(self, bug):
+        pass
+
+    def remove(self, bug_id):
+        pass
+
+    def rebuild(self, queryset, batch_size=1000):
+        return 0
+
+
+class SQLiteFTSSearchBackend(LikeSearchBackend):
+    """
+    SQLite FTS5检索
+
+    bugs_fts 虚拟表以BUG的id作为rowid，保存经二元组切分的标题和描述，
+    由Bug的保存/删除信号同步；结果按bm25相关度排序（标题权重更高）
+    """
+    table = 'bugs_fts'
+    title_weight = 10.0
+    description_weight = 1.0
+
+    def match_expression(self, query):
+        """
+        将用户输入转换为FTS5查询表达式，每个词段作为一个短语，词段之间为AND关系
+        含单个汉字的查询无法用二元组匹配，返回None
+        """
+        phrases = []
+        for segment in ngram_segments(query):
+            if len(segment) == 1 and CJK_RE.match(segment[0]) and len(segment[0]) == 1:
+                return None
+            phrases.append('"{}"'.format(' '.join(segment)))
+        return ' AND '.join(phrases) or None
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if expression is None:
+            return super().search(queryset, query)
+        # 与FTS表连接一次：MATCH筛选出匹配的行，bm25直接在连接结果上计算，不逐行执行子查询；bm25分值越小越相关
+        return queryset.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = bugs.id', f'{self.table} MATCH %s'],
+            params=[expression],
+            select={'search_rank': f'bm25({self.table}, %s, %s)'},
+            select_params=(self.title_weight, self.description_weight),
+        ).order_by('search_rank', '-created_at')
+
+    def index(self, bug):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [bug.id])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)',
+                [bug.id, ngram_text(bug.title), ngram_text(bug.description)]
+            )
+
+    def remove(self, bug_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [bug_id])
+
+    def rebuild(self, queryset, batch_size=1000):
+        """清空并重建索引，返回写入的行数"""
+        rows = queryset.order_by().values_list('id', 'title', 'description')
+        count = 0
+        batch = []
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            for bug_id, title, description in rows.iterator(chunk_size=batch_size):
+                batch.append((bug_id, ngram_text(title), ngram_text(description)))
+                if len(batch) >= batch_size:
+                    count += self._insert(cursor, batch)
+                    batch = []
+            count += self._insert(cursor, batch)
+        return count
+
+    def _insert(self, cursor, batch):
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)', batch
+            )
+        return len(batch)
+
+
+class MySQLFulltextSearchBackend(LikeSearchBackend):
+    """
+    MySQL全文检索
+
+    依赖 bugs 表上的 FULLTEXT(title, description) WITH PARSER ngram 索引，
+    索引由MySQL自动维护；每个关键字作为必须出现的短语，按相关度倒序。
+    短于 ngram_token_size 的关键字（如单个汉字）不会被索引，这类查询改用模糊匹配
+    """
+    # 与MySQL服务端的 ngram_token_size 配置一致（默认2）
+    ngram_token_size = 2
+
+    def search(self, queryset, query):
+        terms = [term.replace('"', '') for term in query.split()]
+        terms = [term for term in terms if term]
+        if not terms or any(len(term) < self.ngram_token_size for term in terms):
+            return super().search(queryset, query)
+        expression = ' '.join(f'+"{term}"' for term in terms)
+        match = 'MATCH (bugs.title, bugs.description) AGAINST (%s IN BOOLEAN MODE)'
+        return queryset.annotate(
+            search_rank=RawSQL(match, (expression,))
+        ).filter(search_rank__gt=0).order_by('-search_rank', '-created_at')
+
+
+_backend = None
+
+
+def get_search_backend():
+    """返回当前使用的检索后端实例（进程内单例）"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'BUG_SEARCH_BACKEND', None)
+        if path:
+            backend_class = import_string(path)
+        elif connection.vendor == 'sqlite':
+            backend_class = SQLiteFTSSearchBackend
+        elif connection.vendor == 'mysql':
+            backend_class = MySQLFulltextSearchBackend
+        else:
+            backend_class = LikeSearchBackend
+        _backend = backend_class()
+    return _backend
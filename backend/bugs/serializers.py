@@ -2,9 +2,11 @@
 BUG模块 - 序列化器
 定义BUG数据的序列化和反序列化规则，支持列表、详情、创建、更新等场景
 """
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
 from django.contrib.auth import get_user_model
 from .models import Bug, BugAttachment, BugHistory
+from .pagination import ChainedQuerySet, KeysetPagination
 
 User = get_user_model()
 
@@ -28,7 +30,83 @@ class BugHistorySerializer(serializers.ModelSerializer):
         ]
 
 
-class BugListSerializer(serializers.ModelSerializer):
+class QueryPlanMixin:
+    """
+    查询规划混入类
+
+    通过 query_plan 声明输出字段依赖的数据库列（支持 a__b__c 形式的跨表路径），
+    未声明的字段默认依赖同名列。视图层调用 plan_queryset 即可得到
+    精确的 select_related / only 查询集，避免逐行触发关联查询（N+1）
+    """
+    query_plan = {}
+
+    @classmethod
+    def plan_queryset(cls, queryset, field_names=None):
+        if field_names is None:
+            field_names = cls.Meta.fields
+        
+        columns = set()
+        relations = set()
+        for name in field_names:
+            for path in cls.query_plan.get(name, (name,)):
+                parts = path.split('__')
+                # 跨表路径需要同时加载沿途的外键列，否则无法select_related
+                for i in range(1, len(parts)):
+                    prefix = '__'.join(parts[:i])
+                    columns.add(prefix)
+                    relations.add(prefix)
+                columns.add(path)
+        
+        # 只保留最长的关联路径，select_related会自动包含其前缀
+        relations = [
+            r for r in relations
+            if not any(other.startswith(r + '__') for other in relations)
+        ]
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        return queryset.only(*sorted(columns))
+
+
+class SparseFieldsMixin:
+    """
+    稀疏字段集混入类
+
+    视图通过 select_fields 解析请求的 fields / omit 参数（逗号分隔的字段名），
+    再以 fields 参数实例化序列化器，只输出这些字段；与 QueryPlanMixin 配合时，
+    把同一组字段传给 plan_queryset，SQL的列和关联随之裁剪
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, fields=None, omit=None):
+        """
+        返回需要输出的字段（保持声明顺序），两个参数都未传时返回None；
+        包含未知字段、fields传了空值、或排除后一个字段都不剩时返回400
+        """
+        if fields is None and not omit:
+            return None
+        declared = list(cls.Meta.fields)
+        names = {}
+        for param, value in (('fields', fields), ('omit', omit)):
+            names[param] = {name.strip() for name in (value or '').split(',') if name.strip()}
+            unknown = names[param] - set(declared)
+            if unknown:
+                raise ValidationError({param: '未知字段: ' + ', '.join(sorted(unknown))})
+        if fields is not None and not names['fields']:
+            raise ValidationError({'fields': '至少需要指定一个字段'})
+        selected = names['fields'] or set(declared)
+        result = [name for name in declared if name in selected and name not in names['omit']]
+        if not result:
+            raise ValidationError({'omit': '不能排除全部字段'})
+        return result
+
+
+class BugListSerializer(SparseFieldsMixin, QueryPlanMixin, serializers.ModelSerializer):
     creator_name = serializers.CharField(source='creator.username', read_only=True)
     assignee_name = serializers.CharField(source='assignee.username', read_only=True, default='')
     severity_display = serializers.CharField(source='get_severity_display', read_only=True)
@@ -45,13 +123,35 @@ class BugListSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
     
+    query_plan = {
+        'creator_name': ('creator__username',),
+        'assignee_name': ('assignee__username',),
+        'severity_display': ('severity',),
+        'priority_display': ('priority',),
+        'status_display': ('status',),
+        'module_path': ('module__path',),
+    }
+    
     def get_module_path(self, obj):
         if obj.module:
-            return f"{obj.module.product.project.name} / {obj.module.product.name} / {obj.module.name}"
+            return obj.module.path
         return ''
 
 
-class BugDetailSerializer(serializers.ModelSerializer):
+class BugKanbanCardSerializer(QueryPlanMixin, serializers.ModelSerializer):
+    """看板卡片：只包含卡片展示所需的字段"""
+    assignee_name = serializers.CharField(source='assignee.username', read_only=True, default='')
+    
+    class Meta:
+        model = Bug
+        fields = ['id', 'title', 'severity', 'priority', 'assignee_name', 'created_at']
+    
+    query_plan = {
+        'assignee_name': ('assignee__username',),
+    }
+
+
+class BugDetailSerializer(SparseFieldsMixin, QueryPlanMixin, serializers.ModelSerializer):
     creator_name = serializers.CharField(source='creator.username', read_only=True)
     assignee_name = serializers.CharField(source='assignee.username', read_only=True, default='')
     severity_display = serializers.CharField(source='get_severity_display', read_only=True)
@@ -60,7 +160,11 @@ class BugDetailSerializer(serializers.ModelSerializer):
     attachments = BugAttachmentSerializer(many=True, read_only=True)
     module_path = serializers.SerializerMethodField()
     module_cascade = serializers.SerializerMethodField()
-    history = BugHistorySerializer(many=True, read_only=True)
+    history = serializers.SerializerMethodField()
+    history_next = serializers.SerializerMethodField()
+    
+    # 详情中只内嵌最近的若干条操作历史，更早的通过 /api/bugs/{id}/history/ 分页获取
+    HISTORY_LIMIT = 20
     
     class Meta:
         model = Bug
@@ -69,33 +173,123 @@ class BugDetailSerializer(serializers.ModelSerializer):
             'priority', 'priority_display', 'status', 'status_display',
             'module', 'module_path', 'module_cascade', 'version', 'creator', 'creator_name',
             'assignee', 'assignee_name', 'solution', 'reject_reason',
-            'attachments', 'history', 'created_at', 'updated_at'
+            'attachments', 'history', 'history_next', 'created_at', 'updated_at'
         ]
     
+    # 附件和操作历史在序列化时单独查询，不占用BUG表的列
+    query_plan = {
+        'creator_name': ('creator__username',),
+        'assignee_name': ('assignee__username',),
+        'severity_display': ('severity',),
+        'priority_display': ('priority',),
+        'status_display': ('status',),
+        'module_path': ('module__path',),
+        'module_cascade': ('module__project', 'module__product'),
+        'attachments': (),
+        'history': (),
+        'history_next': (),
+    }
+    
+    def _latest_history(self, obj):
+        """
+        最近HISTORY_LIMIT+1条历史（连同操作人查询），多取一条用于判断是否还有更早的记录
+        与 history 接口读取同一个“在线表 + 归档表”的链式来源：在线记录足够时只查询在线表，
+        不足时接着读取归档表，不依赖记录的内容（如导入的BUG没有创建记录）推断是否已归档
+        """
+        if not hasattr(obj, '_latest_history'):
+            paginator = KeysetPagination()
+            history = ChainedQuerySet([
+                obj.history.select_related('operator'),
+                obj.archived_history.select_related('operator'),
+            ], paginator.ordering)
+            obj._latest_history = history.order_by(*paginator.ordering)[:self.HISTORY_LIMIT + 1]
+        return obj._latest_history
+    
+    def get_history(self, obj):
+        return BugHistorySerializer(self._latest_history(obj)[:self.HISTORY_LIMIT], many=True).data
+    
+    def get_history_next(self, obj):
+        """更早历史的游标，传给 history 接口的 cursor 参数；没有更早的记录时为None"""
+        entries = self._latest_history(obj)
+        if len(entries) <= self.HISTORY_LIMIT:
+            return None
+        paginator = KeysetPagination()
+        return paginator.encode_cursor(paginator.position_of(entries[self.HISTORY_LIMIT - 1]))
+    
     def get_module_path(self, obj):
         if obj.module:
-            return f"{obj.module.product.project.name} / {obj.module.product.name} / {obj.module.name}"
+            return obj.module.path
         return ''
     
     def get_module_cascade(self, obj):
         if obj.module:
-            return [obj.module.product.project.id, obj.module.product.id, obj.module.id]
+            return [obj.module.project_id, obj.module.product_id, obj.module.id]
         return []
 
 
+class SimilarBugSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    score = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Bug
+        fields = ['id', 'title', 'status', 'status_display', 'score']
+    
+    def get_score(self, obj):
+        return round(self.context['scores'][obj.id], 2)
+
+
+class SimilarBugQuerySerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    limit = serializers.IntegerField(required=False, default=5, min_value=1, max_value=20)
+    # 编辑已有BUG时排除其自身
+    exclude = serializers.IntegerField(required=False)
+
+
+class DuplicateBugError(APIException):
+    """提报时发现疑似重复的BUG（409），响应中附带这些BUG"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = '存在疑似重复的BUG，确认不重复后请重新提交'
+    
+    def __init__(self, duplicates):
+        self.detail = {'detail': self.default_detail, 'duplicates': duplicates}
+
+
 class BugCreateSerializer(serializers.ModelSerializer):
+    # 相似度达到该值的BUG视为疑似重复
+    DUPLICATE_THRESHOLD = 0.6
+    
     attachments = serializers.ListField(
         child=serializers.ImageField(), 
         write_only=True, 
         required=False
     )
+    # 为True时，存在疑似重复的BUG则拒绝提报并返回这些BUG；客户端确认后不带该参数重新提交
+    check_duplicates = serializers.BooleanField(write_only=True, required=False, default=False)
     
     class Meta:
         model = Bug
         fields = [
-            'title', 'description', 'severity', 'priority',
-            'module', 'version', 'assignee', 'attachments'
+            'id', 'title', 'description', 'severity', 'priority',
+            'module', 'version', 'assignee', 'attachments', 'check_duplicates'
         ]
+        read_only_fields = ['id']
+    
+    def validate(self, attrs):
+        if attrs.pop('check_duplicates', False):
+            from .similarity import find_similar_bugs
+            matches = find_similar_bugs(
+                self.context['view'].get_queryset(),
+                attrs.get('title', ''), attrs.get('description', ''),
+                min_score=self.DUPLICATE_THRESHOLD
+            )
+            if matches:
+                scores = {bug.id: score for bug, score in matches}
+                raise DuplicateBugError(SimilarBugSerializer(
+                    [bug for bug, _ in matches], many=True, context={'scores': scores}
+                ).data)
+        return attrs
     
     def create(self, validated_data):
         attachments = validated_data.pop('attachments', [])
@@ -147,3 +341,27 @@ class BugStatusUpdateSerializer(serializers.Serializer):
         if status == 'rejected' and not attrs.get('reject_reason'):
             raise serializers.ValidationError({'reject_reason': '驳回BUG时必须填写驳回原因'})
         return attrs
+
+
+class BugBulkSerializer(serializers.Serializer):
+    """批量操作的BUG id列表"""
+    # 单次批量操作的BUG数量上限
+    MAX_IDS = 200
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS
+    )
+    
+    def validate_ids(self, value):
+        # 去重并保持提交顺序
+        return list(dict.fromkeys(value))
+
+
+class BugBulkStatusUpdateSerializer(BugBulkSerializer, BugStatusUpdateSerializer):
+    pass
+
+
+class BugBulkAssignSerializer(BugBulkSerializer):
+    assignee = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.all(), error_messages={'null': '请选择处理人', 'required': '请选择处理人'}
+    )
@@ -0,0 +1,173 @@
+"""
+BUG模块 - 信号处理
+- BUG保存/删除时同步全文检索索引和相似BUG索引
+- BUG及项目/产品/模块变化时维护节点数量汇总（rollups.py）
+- 模块删除前刷新其下BUG的更新时间，使列表/详情的条件请求（ETag）失效
+- BUG删除、处理人变更时记录墓碑，供增量同步接口通知客户端移除（changes.py）
+"""
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from modules.models import Project, Product, Module
+from .models import Bug, BugTombstone
+from .rollups import adjust_node_counts, bug_deltas, drop_node_counts, move_node_counts
+from .search import get_search_backend
+from .similarity import get_similarity_index
+
+# 影响节点汇总的BUG字段
+COUNTED_FIELDS = ('module_id', 'status', 'severity')
+# 影响检索索引和相似度索引的BUG字段
+INDEXED_FIELDS = ('title', 'description')
+
+
+@receiver(post_init, sender=Bug)
+def remember_bug_indexed_text(sender, instance, **kwargs):
+    instance._indexed_text = _loaded_values(instance, INDEXED_FIELDS)
+
+
+@receiver(post_save, sender=Bug)
+def index_bug(sender, instance, created, update_fields=None, **kwargs):
+    """
+    标题或描述变化时重建该BUG的索引
+    与加载时的值比较，未变化则跳过；加载时标题或描述被延迟（only/defer）无法比较，按已变化处理
+    """
+    if update_fields is not None and not set(INDEXED_FIELDS) & set(update_fields):
+        return
+    text = (instance.title, instance.description)
+    if not created and instance._indexed_text == text:
+        return
+    get_search_backend().index(instance)
+    instance._indexed_text = text
+    
+    # 相似度索引只在本进程已加载时增量更新（只改内存，由后台线程写盘），未加载的进程首次查询时会补齐
+    index = get_similarity_index(load=False)
+    if index is not None:
+        index.add(instance.id, instance.title, instance.description)
+
+
+@receiver(post_delete, sender=Bug)
+def unindex_bug(sender, instance, **kwargs):
+    get_search_backend().remove(instance.id)
+    
+    index = get_similarity_index(load=False)
+    if index is not None:
+        index.remove(instance.id)
+
+
+@receiver(post_delete, sender=Bug)
+def record_bug_tombstone(sender, instance, **kwargs):
+    BugTombstone.objects.create(
+        bug_id=instance.id, creator_id=instance.creator_id, assignee_id=instance.assignee_id
+    )
+
+
+@receiver(post_init, sender=Bug)
+def remember_bug_assignee(sender, instance, **kwargs):
+    instance._synced_assignee_id = instance.__dict__.get('assignee_id')
+
+
+@receiver(post_save, sender=Bug)
+def record_unassign_tombstone(sender, instance, created, **kwargs):
+    """处理人变更后BUG可能移出原处理人的数据范围，为原处理人记录墓碑"""
+    old_assignee_id = instance._synced_assignee_id
+    if not created and old_assignee_id is not None and old_assignee_id != instance.assignee_id:
+        BugTombstone.objects.create(bug_id=instance.id, assignee_id=old_assignee_id)
+    instance._synced_assignee_id = instance.__dict__.get('assignee_id')
+
+
+def _loaded_values(instance, fields):
+    """实例上已加载的字段值；有字段被延迟加载（only/defer）时返回None，不触发额外查询"""
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return tuple(instance.__dict__[field] for field in fields)
+
+
+@receiver(post_init, sender=Bug)
+def remember_bug_counted_state(sender, instance, **kwargs):
+    instance._counted_state = _loaded_values(instance, COUNTED_FIELDS)
+
+
+def _stored_state(bug_id):
+    return Bug.objects.filter(pk=bug_id).values_list(*COUNTED_FIELDS).first()
+
+
+@receiver(pre_save, sender=Bug)
+@receiver(pre_delete, sender=Bug)
+def load_bug_counted_state(sender, instance, **kwargs):
+    """实例的汇总字段未完整加载时，保存/删除前从数据库读取原值"""
+    if instance.pk is not None and instance._counted_state is None:
+        instance._counted_state = _stored_state(instance.pk)
+
+
+@receiver(post_save, sender=Bug)
+def update_bug_node_counts(sender, instance, created, update_fields=None, **kwargs):
+    """新建BUG计入所在节点；模块、状态或严重程度变化时从原节点转移到新节点"""
+    if update_fields is not None and not {'module', 'status', 'severity'} & set(update_fields):
+        return
+    old_state = None if created else instance._counted_state
+    new_state = _loaded_values(instance, COUNTED_FIELDS) or _stored_state(instance.pk)
+    if old_state != new_state:
+        deltas = bug_deltas([new_state])
+        deltas.update(bug_deltas([old_state], -1))
+        adjust_node_counts(deltas)
+    instance._counted_state = new_state
+
+
+@receiver(post_delete, sender=Bug)
+def remove_bug_node_counts(sender, instance, **kwargs):
+    adjust_node_counts(bug_deltas([instance._counted_state], -1))
+
+
+@receiver(post_init, sender=Module)
+@receiver(post_init, sender=Product)
+def remember_node_parents(sender, instance, **kwargs):
+    fields = ('product_id', 'project_id') if sender is Module else ('project_id',)
+    instance._counted_parents = _loaded_values(instance, fields)
+
+
+@receiver(post_save, sender=Module)
+def move_module_node_counts(sender, instance, created, **kwargs):
+    """模块移动到其他产品时，把其计数从原产品、项目转移到新产品、项目"""
+    parents = (instance.product_id, instance.project_id)
+    old_parents = instance._counted_parents
+    if not created and old_parents is not None and old_parents != parents:
+        move_node_counts(
+            'module', instance.id,
+            [('product', old_parents[0]), ('project', old_parents[1])],
+            [('product', parents[0]), ('project', parents[1])]
+        )
+    instance._counted_parents = parents
+
+
+@receiver(post_save, sender=Product)
+def move_product_node_counts(sender, instance, created, **kwargs):
+    """产品移动到其他项目时，把其计数从原项目转移到新项目"""
+    old_parents = instance._counted_parents
+    if not created and old_parents is not None and old_parents != (instance.project_id,):
+        move_node_counts(
+            'product', instance.id, [('project', old_parents[0])], [('project', instance.project_id)]
+        )
+    instance._counted_parents = (instance.project_id,)
+
+
+@receiver(pre_delete, sender=Module)
+def touch_module_bugs(sender, instance, **kwargs):
+    # 模块删除时BUG的模块由数据库批量置空，不会更新updated_at
+    Bug.objects.filter(module=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Module)
+def drop_module_node_counts(sender, instance, **kwargs):
+    """模块删除后其下BUG的模块置空，从所属产品、项目中减去"""
+    drop_node_counts(
+        'module', instance.id, [('product', instance.product_id), ('project', instance.project_id)]
+    )
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Project)
+def drop_parent_node_counts(sender, instance, **kwargs):
+    # 其下的模块先于产品、项目删除，计数已随模块减去，这里只清理汇总行
+    level = 'product' if sender is Product else 'project'
+    drop_node_counts(level, instance.id)
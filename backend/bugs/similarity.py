@@ -0,0 +1,310 @@
+"""
+BUG模块 - 相似BUG检测
+基于MinHash签名和LSH（局部敏感哈希）分桶的进程内索引，用于提报BUG时提示可能重复的BUG：
+- 文本按全文检索相同的规则切词（中文二元组、英文单词），取词元集合计算MinHash签名
+- 签名分为若干段，任意一段完全相同的BUG进入候选集，再按签名估算的Jaccard相似度排序
+- 索引由 rebuild_bug_similarity_index 命令构建并持久化到磁盘，服务进程只加载，之后随BUG的保存/删除增量更新；
+  索引文件不存在时不构建（全量计算签名耗时与BUG数成正比），查询返回空结果
+- 增量更新只修改内存中的索引，由后台线程定期写盘（进程退出时也会写盘），保存BUG的请求不等待写盘
+- 长文本只取哈希值最小的 MAX_SHINGLES 个词元计算签名（bottom-k采样），单次签名的耗时有上限
+
+查询只访问候选桶，不扫描BUG表。多进程部署时，其他进程的变化在查询前补齐：
+新建的BUG按id、修改过的BUG按updated_at、删除的BUG按墓碑记录（BugTombstone）读取
+"""
+import atexit
+import hashlib
+import heapq
+import logging
+import os
+import pickle
+import random
+import tempfile
+import threading
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Bug, BugTombstone
+from .search import ngram_segments
+
+logger = logging.getLogger(__name__)
+
+# 签名长度 = 分段数 × 每段行数；16段×4行时相似度约0.5以上的BUG大概率进入候选集
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+# 小于2^32的最大素数，签名值可以用32位无符号整数存储
+PRIME = 4294967291
+# 固定种子，保证不同进程、不同时间生成的签名一致
+_rng = random.Random(20240101)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+
+# 参与签名计算的词元数上限：签名耗时与 NUM_PERM × 词元数 成正比
+MAX_SHINGLES = 128
+
+# 后台线程的写盘间隔（秒）
+SAVE_INTERVAL = 60
+# 补齐其他进程修改时的延迟窗口（秒）：窗口内的修改下次查询时会再读一遍，避免漏掉提交较慢的事务
+CATCH_UP_LAG = 5
+
+
+def shingles(title, description=''):
+    """返回标题和描述的词元集合"""
+    tokens = set()
+    for text in (title, description):
+        for segment in ngram_segments(text):
+            tokens.update(segment)
+    return tokens
+
+
+def minhash(tokens):
+    """
+    计算词元集合的MinHash签名（array('I')），空集合返回None
+    词元超过 MAX_SHINGLES 个时只取哈希值最小的部分：取舍只取决于词元本身，相同的词元在不同文本中取舍一致
+    """
+    if not tokens:
+        return None
+    hashes = {
+        int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'little')
+        for token in tokens
+    }
+    if len(hashes) > MAX_SHINGLES:
+        hashes = heapq.nsmallest(MAX_SHINGLES, hashes)
+    return array('I', (
+        min((a * h + b) % PRIME for h in hashes)
+        for a, b in PERMUTATIONS
+    ))
+
+
+def band_keys(signature):
+    """签名每一段的桶键"""
+    return [
+        hash(tuple(signature[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND]))
+        for i in range(NUM_BANDS)
+    ]
+
+
+def estimate_similarity(left, right):
+    """两个签名相同位置取值相等的比例，即Jaccard相似度的估计值"""
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERM
+
+
+class SimilarityIndex:
+    """
+    MinHash/LSH索引
+
+    - signatures: BUG id => 签名
+    - buckets: 每段一个字典，桶键 => 该桶内的BUG id集合
+    - max_id: 已索引的最大BUG id，用于补齐其他进程新建的BUG
+    - synced_at: 已补齐到的时间水位，用于补齐其他进程修改、删除的BUG
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.signatures = {}
+        self.buckets = [{} for _ in range(NUM_BANDS)]
+        self.max_id = 0
+        self.synced_at = None
+        self.dirty = False
+        self.lock = threading.RLock()
+        # 串行化写盘，避免较早的快照覆盖较新的
+        self.save_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def add(self, bug_id, title, description):
+        signature = minhash(shingles(title, description))
+        with self.lock:
+            self._discard(bug_id)
+            self.max_id = max(self.max_id, bug_id)
+            if signature is not None:
+                self.signatures[bug_id] = signature
+                for band, key in zip(self.buckets, band_keys(signature)):
+                    band.setdefault(key, set()).add(bug_id)
+            self.dirty = True
+
+    def remove(self, bug_id):
+        with self.lock:
+            self._discard(bug_id)
+            self.dirty = True
+
+    def _discard(self, bug_id):
+        signature = self.signatures.pop(bug_id, None)
+        if signature is None:
+            return
+        for band, key in zip(self.buckets, band_keys(signature)):
+            members = band.get(key)
+            if members is not None:
+                members.discard(bug_id)
+                if not members:
+                    del band[key]
+
+    def query(self, title, description='', limit=5, min_score=0.3, exclude=None):
+        """返回最相似的BUG列表 [(bug_id, 相似度), ...]，按相似度倒序"""
+        signature = minhash(shingles(title, description))
+        if signature is None:
+            return []
+        self.catch_up()
+        with self.lock:
+            candidates = set()
+            for band, key in zip(self.buckets, band_keys(signature)):
+                candidates.update(band.get(key, ()))
+            candidates.discard(exclude)
+            scored = [
+                (bug_id, estimate_similarity(signature, self.signatures[bug_id]))
+                for bug_id in candidates
+            ]
+        scored = [item for item in scored if item[1] >= min_score]
+        scored.sort(key=lambda item: (-item[1], -item[0]))
+        return scored[:limit]
+
+    def catch_up(self):
+        """
+        补齐水位之后的变化：id大于max_id的新BUG（主键范围查询）、updated_at晚于水位的修改（updated_at索引）、
+        水位之后记录的墓碑中已不存在的BUG（删除）；水位推进到本次读取前的“当前时间 - CATCH_UP_LAG”
+        """
+        horizon = timezone.now() - timedelta(seconds=CATCH_UP_LAG)
+        max_id, synced_at = self.max_id, self.synced_at
+        sources = [Bug.objects.filter(id__gt=max_id)]
+        if synced_at is not None:
+            sources.append(Bug.objects.filter(id__lte=max_id, updated_at__gt=synced_at))
+        for queryset in sources:
+            rows = queryset.order_by().values_list('id', 'title', 'description')
+            for bug_id, title, description in rows.iterator(chunk_size=1000):
+                self.add(bug_id, title, description)
+        if synced_at is not None:
+            deleted = BugTombstone.objects.filter(created_at__gt=synced_at).filter(
+                ~Exists(Bug.objects.filter(id=OuterRef('bug_id')))
+            ).values_list('bug_id', flat=True)
+            for bug_id in set(deleted):
+                self.remove(bug_id)
+        with self.lock:
+            if self.synced_at is None or self.synced_at < horizon:
+                self.synced_at = horizon
+
+    def rebuild(self):
+        with self.lock:
+            self.signatures = {}
+            self.buckets = [{} for _ in range(NUM_BANDS)]
+            self.max_id = 0
+            self.synced_at = None
+            self.catch_up()
+            self.save()
+        return len(self.signatures)
+
+    def load(self):
+        """从磁盘加载索引，文件不存在或格式不兼容时返回False"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        if (data.get('num_perm'), data.get('rows_per_band'), data.get('max_shingles')) != (
+            NUM_PERM, ROWS_PER_BAND, MAX_SHINGLES
+        ) or 'synced_at' not in data:
+            return False
+        with self.lock:
+            self.signatures = data['signatures']
+            self.buckets = data['buckets']
+            self.max_id = data['max_id']
+            self.synced_at = data['synced_at']
+            self.dirty = False
+        return True
+
+    def save(self):
+        """
+        原子写盘：先写临时文件再替换
+        只在序列化时持有索引锁，写文件期间查询和增量更新不受影响
+        """
+        with self.save_lock:
+            with self.lock:
+                data = pickle.dumps({
+                    'num_perm': NUM_PERM,
+                    'rows_per_band': ROWS_PER_BAND,
+                    'max_shingles': MAX_SHINGLES,
+                    'signatures': self.signatures,
+                    'buckets': self.buckets,
+                    'max_id': self.max_id,
+                    'synced_at': self.synced_at,
+                }, protocol=pickle.HIGHEST_PROTOCOL)
+                self.dirty = False
+            try:
+                directory = os.path.dirname(self.path)
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                self.dirty = True
+                raise
+
+    def start_autosave(self, interval=SAVE_INTERVAL):
+        """启动后台写盘线程：每interval秒检查一次，有增量更新时写盘"""
+        def run():
+            while not self.stopped.wait(interval):
+                if self.dirty:
+                    try:
+                        self.save()
+                    except OSError:
+                        logger.exception('相似BUG索引写盘失败：%s', self.path)
+
+        threading.Thread(target=run, name='bug-similarity-autosave', daemon=True).start()
+
+    def stop(self):
+        """停止后台写盘线程，有未写盘的更新时写盘"""
+        self.stopped.set()
+        if self.dirty:
+            self.save()
+
+
+def index_path():
+    """索引文件路径，可通过 BUG_SIMILARITY_INDEX_PATH 配置"""
+    return str(getattr(
+        settings, 'BUG_SIMILARITY_INDEX_PATH',
+        os.path.join(settings.BASE_DIR, 'var', 'bug_minhash.pkl')
+    ))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(load=True):
+    """
+    返回进程内的相似度索引
+    - 尚未加载时从磁盘加载；索引文件不存在或不兼容时返回None，不在请求中构建
+      （需执行 python manage.py rebuild_bug_similarity_index），之后的调用会再次尝试加载
+    - load=False时，索引尚未加载则直接返回None（供信号处理使用，避免保存BUG时读取索引文件）
+    """
+    global _index
+    if _index is None and load:
+        with _index_lock:
+            if _index is None:
+                index = SimilarityIndex(index_path())
+                if not index.load():
+                    return None
+                index.start_autosave()
+                atexit.register(index.stop)
+                _index = index
+    return _index
+
+
+def find_similar_bugs(queryset, title, description='', limit=5, min_score=0.3, exclude=None):
+    """
+    查找与草稿相似的BUG
+    queryset用于限定可见范围（数据权限），返回 [(bug, 相似度), ...]
+    """
+    index = get_similarity_index()
+    if index is None:
+        return []
+    # 多取一些候选，抵消数据权限过滤掉的部分
+    matches = index.query(
+        title, description, limit=limit * 4, min_score=min_score, exclude=exclude
+    )
+    scores = dict(matches)
+    bugs = queryset.filter(id__in=scores).only('id', 'title', 'status', 'created_at')
+    ranked = sorted(bugs, key=lambda bug: (-scores[bug.id], -bug.id))
+    return [(bug, scores[bug.id]) for bug in ranked[:limit]]
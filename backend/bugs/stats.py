@@ -0,0 +1,205 @@
+"""
+BUG模块 - 统计聚合
+为仪表盘统计接口提供聚合计算：
+- 状态/严重程度/优先级分布通过条件聚合一次扫描得出
+- 近30天趋势读取每日汇总表（BugDailyStats），耗时与历史数据量无关
+- 每日汇总表的增量维护与全量重建
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Bug, BugHistory, BugHistoryArchive, BugDailyStats
+
+# 各维度统计项，顺序即返回JSON中的键顺序
+BREAKDOWN_FIELDS = (
+    ('status', ('pending', 'processing', 'resolved', 'rejected', 'closed')),
+    ('severity', ('critical', 'major', 'minor', 'trivial')),
+    # urgent不在优先级选项中，保留该键以兼容前端的数据结构
+    ('priority', ('urgent', 'high', 'medium', 'low')),
+)
+
+
+def compute_breakdown(queryset):
+    """
+    计算BUG总数及各维度分布
+
+    返回：{'total': n, 'status': {...}, 'severity': {...}, 'priority': {...}}
+    """
+    aggregates = {'total': Count('id')}
+    for field, keys in BREAKDOWN_FIELDS:
+        for key in keys:
+            aggregates[f'{field}_{key}'] = Count('id', filter=Q(**{field: key}))
+
+    row = queryset.order_by().aggregate(**aggregates)
+
+    data = {'total': row['total']}
+    for field, keys in BREAKDOWN_FIELDS:
+        data[field] = {key: row[f'{field}_{key}'] for key in keys}
+    return data
+
+
+def compute_trend(stats_queryset, days=30):
+    """
+    基于每日汇总表计算最近days天（不含今天）每天新建和解决的BUG数量
+
+    - created: 当天新建的BUG数
+    - resolved: 当天流转为已解决的次数
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days)
+
+    rows = stats_queryset.filter(
+        date__gte=start, date__lt=today
+    ).values('date').annotate(
+        created_total=Sum('created'),
+        resolved_total=Sum('entered', filter=Q(status='resolved')),
+    ).order_by()
+    buckets = {row['date']: row for row in rows}
+
+    trend = []
+    for i in range(days):
+        date = start + timedelta(days=i)
+        row = buckets.get(date, {})
+        trend.append({
+            'date': date.strftime('%m-%d'),
+            'created': row.get('created_total') or 0,
+            'resolved': row.get('resolved_total') or 0,
+        })
+    return trend
+
+
+def _stats_key(date, module_id, creator_id, assignee_id, status, severity):
+    """汇总行的维度；按 (date, dimensions) 唯一索引查找，其余字段写入新建的行"""
+    return {
+        'date': date,
+        'dimensions': BugDailyStats.dimensions_key(module_id, creator_id, assignee_id, status, severity),
+        'module_id': module_id,
+        'creator_id': creator_id,
+        'assignee_id': assignee_id,
+        'status': status,
+        'severity': severity,
+    }
+
+
+def bump_daily_stats(bugs, created=0, entered=0, assigned=0):
+    """
+    增量更新每日汇总表
+
+    bugs为刚发生事件的BUG（已保存的最新状态），相同维度的BUG合并为一次UPDATE
+    例：bump_daily_stats([bug], entered=1) 记录bug当天进入其当前状态
+    """
+    deltas = {'created': created, 'entered': entered, 'assigned': assigned}
+    deltas = {field: value for field, value in deltas.items() if value}
+    today = timezone.localdate()
+
+    groups = Counter(
+        (bug.module_id, bug.creator_id, bug.assignee_id, bug.status, bug.severity)
+        for bug in bugs
+    )
+    for dims, n in groups.items():
+        key = _stats_key(today, *dims)
+        updates = {field: F(field) + value * n for field, value in deltas.items()}
+        if BugDailyStats.objects.filter(**key).update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                BugDailyStats.objects.create(
+                    **key, **{field: value * n for field, value in deltas.items()}
+                )
+        except IntegrityError:
+            # 并发请求已创建该行，退回到UPDATE
+            BugDailyStats.objects.filter(**key).update(**updates)
+
+
+def tally_daily_stats(totals, bugs, history, user_ids):
+    """
+    把新建、状态流转、分配事件累加到 totals：{(日期, 模块, 创建人, 处理人, 状态, 严重程度): {created, entered, assigned}}
+
+    - bugs: (created_at, module_id, creator_id, assignee_id, severity)，每个BUG记一次新建并进入待处理
+    - history: (created_at, action, old_value, new_value, module_id, creator_id, assignee_id, status, severity)，
+      后五项为所属BUG的当前值；历史中记录的是显示值，状态按选项反查，处理人按 user_ids（用户名 => id）反查；
+      与增量维护一致，状态未变化的流转记录（原值与新值相同）不计入
+    历史记录不含事件发生时的模块、处理人等维度，按BUG当前值归类
+    """
+    status_codes = {label: code for code, label in Bug.STATUS_CHOICES}
+
+    def add(date, dims, **deltas):
+        row = totals.setdefault(
+            (timezone.localdate(date),) + dims,
+            {'created': 0, 'entered': 0, 'assigned': 0}
+        )
+        for field, value in deltas.items():
+            row[field] += value
+
+    for created_at, module_id, creator_id, assignee_id, severity in bugs:
+        add(created_at, (module_id, creator_id, assignee_id, 'pending', severity),
+            created=1, entered=1)
+
+    for created_at, action, old_value, new_value, module_id, creator_id, assignee_id, status, severity \
+            in history:
+        if action == 'status_change':
+            if old_value == new_value:
+                continue
+            status = status_codes.get(new_value)
+            if status:
+                add(created_at, (module_id, creator_id, assignee_id, status, severity), entered=1)
+        elif action == 'assign':
+            assignee_id = user_ids.get(new_value, assignee_id)
+            add(created_at, (module_id, creator_id, assignee_id, status, severity), assigned=1)
+    return totals
+
+
+def add_daily_stats(totals):
+    """把 tally_daily_stats 的结果累加到每日汇总表（用于导入等批量写入的场景）"""
+    for key, counts in totals.items():
+        key = _stats_key(*key)
+        counts = {field: value for field, value in counts.items() if value}
+        updates = {field: F(field) + value for field, value in counts.items()}
+        if BugDailyStats.objects.filter(**key).update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                BugDailyStats.objects.create(**key, **counts)
+        except IntegrityError:
+            BugDailyStats.objects.filter(**key).update(**updates)
+
+
+def rebuild_daily_stats(batch_size=1000):
+    """
+    从BUG表及操作历史全量重建每日汇总表
+
+    - 新建事件取自BUG的创建时间
+    - 状态流转和分配事件取自操作历史（含已归档的记录）
+    返回写入的汇总行数
+    """
+    User = get_user_model()
+    user_ids = dict(User.objects.values_list('username', 'id'))
+    totals = {}
+
+    bugs = Bug.objects.order_by().values_list(
+        'created_at', 'module_id', 'creator_id', 'assignee_id', 'severity'
+    )
+    tally_daily_stats(totals, bugs.iterator(chunk_size=batch_size), [], user_ids)
+
+    for history_model in (BugHistory, BugHistoryArchive):
+        history = history_model.objects.filter(
+            action__in=('status_change', 'assign')
+        ).order_by().values_list(
+            'created_at', 'action', 'old_value', 'new_value', 'bug__module_id', 'bug__creator_id',
+            'bug__assignee_id', 'bug__status', 'bug__severity'
+        )
+        tally_daily_stats(totals, [], history.iterator(chunk_size=batch_size), user_ids)
+
+    rows = [
+        BugDailyStats(**_stats_key(*key), **counts)
+        for key, counts in totals.items()
+    ]
+    with transaction.atomic():
+        BugDailyStats.objects.all().delete()
+        BugDailyStats.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+import threading
+from datetime import datetime, timedelta
+from importlib import import_module
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Q, QuerySet
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from modules.models import Project, Product, Module
+from notifications.models import Notification, NotificationCounter
+from notifications.tests import EagerPipelineMixin
+from . import similarity
+from .changes import encode_token
+from .importer import BugImporter, ImportConflict, read_records
+from .models import Bug, BugDailyStats, BugHistory, BugHistoryArchive, BugTombstone
+from .rollups import node_counts, rebuild_node_counts
+from .search import MySQLFulltextSearchBackend, get_search_backend, ngram_text
+from .serializers import BugBulkSerializer, BugDetailSerializer, BugListSerializer
+from .stats import bump_daily_stats, rebuild_daily_stats
+
+User = get_user_model()
+
+
+class BugTestMixin:
+    """测试数据构造：超管、测试、开发各一名，以及一个完整的项目-产品-模块层级"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('t_admin', password='x', role='super_admin')
+        self.tester = User.objects.create_user('t_tester', password='x', role='tester')
+        self.developer = User.objects.create_user('t_dev', password='x', role='developer')
+        project = Project.objects.create(name='电商平台')
+        product = Product.objects.create(project=project, name='用户中心')
+        self.module = Module.objects.create(product=product, name='用户登录')
+
+    def create_bugs(self, count, **kwargs):
+        defaults = {
+            'description': '复现步骤',
+            'module': self.module,
+            'creator': self.tester,
+            'assignee': self.developer,
+        }
+        defaults.update(kwargs)
+        return [
+            Bug.objects.create(title=f'BUG {i}', **defaults)
+            for i in range(count)
+        ]
+
+
+class BugListQueryTests(BugTestMixin, APITestCase):
+    # 列表页的查询上限：COUNT(*) + 一次关联查询
+    LIST_QUERY_CEILING = 2
+
+    def list_query_count(self, user, params=None):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/bugs/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_list_query_count_is_constant(self):
+        self.create_bugs(2)
+        small, _ = self.list_query_count(self.admin)
+        self.create_bugs(30)
+        large, response = self.list_query_count(self.admin)
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.LIST_QUERY_CEILING)
+        self.assertEqual(
+            response.data['results'][0]['module_path'], '电商平台 / 用户中心 / 用户登录'
+        )
+        self.assertEqual(response.data['results'][0]['assignee_name'], 't_dev')
+
+    def test_list_query_count_with_role_scope_and_filters(self):
+        self.create_bugs(15)
+        self.create_bugs(5, assignee=None)
+        count, response = self.list_query_count(
+            self.tester, {'severity': 'minor', 'page': 2}
+        )
+        self.assertLessEqual(count, self.LIST_QUERY_CEILING)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class BugUpdateTests(BugTestMixin, APITestCase):
+    """编辑BUG：变更历史一次批量写入，与BUG更新在同一事务中，查询数不随变更字段数增加"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        self.bug = self.create_bugs(1)[0]
+        self.other = User.objects.create_user('t_dev2', password='x', role='developer')
+
+    def patch(self, data):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(f'/api/bugs/{self.bug.id}/', data, format='json')
+        self.history_inserts = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('INSERT INTO "bug_history"')
+        ]
+        return len(ctx.captured_queries), response
+
+    def test_history_written_in_one_bulk_create(self):
+        bulk_create = BugHistory.objects.bulk_create
+        with mock.patch.object(BugHistory.objects, 'bulk_create', side_effect=bulk_create) as spy:
+            _, response = self.patch({'title': '新标题', 'severity': 'critical', 'assignee': self.other.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(len(spy.call_args[0][0]), 3)
+        self.assertEqual(len(self.history_inserts), 1)
+
+        changes = set(
+            BugHistory.objects.filter(bug=self.bug, action='update').values_list('field_name', 'old_value', 'new_value')
+        )
+        self.assertEqual(changes, {
+            ('title', 'BUG 0', '新标题'),
+            ('severity', '一般', '致命'),
+            ('assignee', 't_dev', 't_dev2'),
+        })
+
+    def test_unchanged_fields_write_no_history(self):
+        _, response = self.patch({'title': 'BUG 0', 'version': self.bug.version})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.history_inserts, [])
+        self.assertFalse(BugHistory.objects.filter(bug=self.bug, action='update').exists())
+
+    def test_failed_history_write_rolls_back_the_bug(self):
+        with mock.patch.object(BugHistory.objects, 'bulk_create', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.patch({'title': '新标题', 'severity': 'critical'})
+        self.bug.refresh_from_db()
+        self.assertEqual((self.bug.title, self.bug.severity), ('BUG 0', 'minor'))
+        self.assertFalse(BugHistory.objects.filter(bug=self.bug, action='update').exists())
+
+    def test_query_count_does_not_grow_with_changed_fields(self):
+        # 只改不影响检索索引、节点数量和处理人记录的字段，查询数只取决于编辑本身
+        one, _ = self.patch({'version': 'v1'})
+        many, _ = self.patch({'version': 'v2', 'priority': 'high'})
+        self.assertEqual(len(self.history_inserts), 1)
+        self.assertEqual(one, many)
+        # 查询BUG、更新BUG、写入历史，外加事务的保存点；标题和描述未变化，不重建检索索引
+        self.assertLessEqual(many, 5)
+
+
+class SparseFieldsTests(BugTestMixin, APITestCase):
+    """fields / omit 稀疏字段集：输出字段、查询的列与关联表随之裁剪，非法参数返回400"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        self.bug = self.create_bugs(3)[0]
+
+    def get(self, path, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path, params)
+        self.queries = [query['sql'] for query in ctx.captured_queries]
+        return response
+
+    def test_list_shape(self):
+        response = self.get('/api/bugs/', {'fields': 'title, id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title'])
+
+        response = self.get('/api/bugs/', {'omit': 'module_path,creator_name'})
+        expected = [name for name in BugListSerializer.Meta.fields if name not in ('module_path', 'creator_name')]
+        self.assertEqual(list(response.data['results'][0]), expected)
+
+        response = self.get('/api/bugs/', {'fields': 'id,title,status', 'omit': 'title'})
+        self.assertEqual(list(response.data['results'][0]), ['id', 'status'])
+
+    def test_detail_shape(self):
+        path = f'/api/bugs/{self.bug.id}/'
+        self.get(path, {})
+        full = len(self.queries)
+        response = self.get(path, {'fields': 'id,title'})
+        self.assertLess(len(self.queries), full)
+        self.assertEqual(response.data, {'id': self.bug.id, 'title': self.bug.title})
+        self.assertFalse(any('bug_history' in sql or 'bug_attachments' in sql for sql in self.queries))
+
+        response = self.get(path, {'omit': 'history,attachments'})
+        self.assertNotIn('history', response.data)
+        self.assertIn('description', response.data)
+
+    def test_select_fields_narrows_columns_and_joins(self):
+        self.get('/api/bugs/', {})
+        full = self.queries
+        self.get('/api/bugs/', {'fields': 'id,title'})
+        narrow = self.queries
+        self.assertEqual(len(narrow), len(full))
+        data_query = narrow[-1]
+        self.assertNotIn('JOIN', data_query)
+        self.assertNotIn('"description"', data_query)
+        self.assertNotIn('"severity"', data_query)
+        self.assertIn('JOIN', full[-1])
+
+        queryset = BugListSerializer.plan_queryset(
+            Bug.objects.all(), BugListSerializer.select_fields('id,creator_name')
+        )
+        self.assertEqual(queryset.query.deferred_loading, ({'id', 'creator', 'creator__username'}, False))
+        self.assertEqual(set(queryset.query.select_related), {'creator'})
+
+    def test_invalid_parameters(self):
+        cases = [
+            ({'fields': 'id,secret'}, 'fields'),
+            ({'omit': 'password'}, 'omit'),
+            ({'fields': ''}, 'fields'),
+            ({'fields': ' , '}, 'fields'),
+            ({'fields': 'id', 'omit': 'id'}, 'omit'),
+            ({'omit': ','.join(BugListSerializer.Meta.fields)}, 'omit'),
+        ]
+        for params, param in cases:
+            with self.subTest(params=params):
+                response = self.get('/api/bugs/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(param, response.data)
+        response = self.get(f'/api/bugs/{self.bug.id}/', {'fields': 'id', 'omit': 'id'})
+        self.assertEqual(response.status_code, 400)
+
+        # 空的omit等同于未传
+        response = self.get('/api/bugs/', {'omit': ''})
+        self.assertEqual(list(response.data['results'][0]), BugListSerializer.Meta.fields)
+
+
+class DateRangeFilterTests(BugTestMixin, APITestCase):
+    """创建日期筛选：按当前时区的 [date_start 零点, date_end 次日零点) 过滤"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def create_at(self, *args):
+        bug = self.create_bugs(1)[0]
+        Bug.objects.filter(id=bug.id).update(created_at=timezone.make_aware(datetime(*args)))
+        return bug.id
+
+    def ids(self, **params):
+        response = self.client.get('/api/bugs/', params)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def test_end_date_includes_whole_local_day(self):
+        before = self.create_at(2024, 3, 9, 23, 59, 59)
+        first = self.create_at(2024, 3, 10, 0, 0, 0)
+        last = self.create_at(2024, 3, 10, 23, 59, 59)
+        after = self.create_at(2024, 3, 11, 0, 0, 0)
+
+        self.assertEqual(self.ids(date_start='2024-03-10', date_end='2024-03-10'), {first, last})
+        self.assertEqual(self.ids(date_end='2024-03-10'), {before, first, last})
+        self.assertEqual(self.ids(date_start='2024-03-11'), {after})
+
+    def test_invalid_and_out_of_range_dates(self):
+        for params in (
+            {'date_start': '2024-13-01'},
+            {'date_end': '2024/03/10'},
+            {'date_end': '9999-12-31'},
+            {'date_start': '0001-01-01'},
+        ):
+            response = self.client.get('/api/bugs/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(set(response.data), set(params))
+
+
+class ExportTests(BugTestMixin, APITestCase):
+    """流式导出：三种格式的内容、公式转义、与列表一致的筛选、键集分批"""
+
+    def export(self, user=None, **params):
+        self.client.force_authenticate(user or self.admin)
+        response = self.client.get('/api/bugs/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_has_bom_header_and_escapes_formulas(self):
+        bug = self.create_bugs(1, version='-1')[0]
+        Bug.objects.filter(id=bug.id).update(title='=HYPERLINK("http://evil","点击")')
+        response, content = self.export()
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment;', response['Content-Disposition'])
+        text = content.decode('utf-8')
+        self.assertTrue(text.startswith('\ufeffID,标题,严重程度'))
+        row = next(csv.reader(io.StringIO(text.splitlines()[1])))
+        self.assertEqual(row[:3], [str(bug.id), "'=HYPERLINK(\"http://evil\",\"点击\")", '一般'])
+        self.assertEqual(row[6], "'-1")
+
+    def test_ndjson_lines(self):
+        bugs = self.create_bugs(3)
+        _, content = self.export(file_type='ndjson')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [bug.id for bug in reversed(bugs)])
+        self.assertEqual(rows[0]['status_display'], '待处理')
+        self.assertEqual(rows[0]['assignee_name'], 't_dev')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        self.create_bugs(3)
+        Bug.objects.update(title='@SUM(A1)')
+        _, content = self.export(file_type='xlsx')
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn('[Content_Types].xml', archive.namelist())
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        rows = sheet.findall(f'{namespace}sheetData/{namespace}row')
+        self.assertEqual(len(rows), 4)
+        titles = [row.findall(f'{namespace}c')[1].findtext(f'.//{namespace}t') for row in rows]
+        self.assertEqual(titles, ['标题'] + ["'@SUM(A1)"] * 3)
+
+    def test_filters_and_scope_match_list(self):
+        self.create_bugs(4)
+        self.create_bugs(3, severity='critical')
+        self.create_bugs(2, severity='critical', assignee=self.admin)
+        for user, params in (
+            (self.admin, {'severity': 'critical'}),
+            (self.developer, {}),
+            (self.developer, {'severity': 'critical'}),
+        ):
+            self.client.force_authenticate(user)
+            listed = [row['id'] for row in self.client.get('/api/bugs/', params).data['results']]
+            _, content = self.export(user, file_type='ndjson', **params)
+            exported = [json.loads(line)['id'] for line in content.decode().splitlines()]
+            self.assertEqual(exported, listed, params)
+
+    @override_settings(BUG_EXPORT_CHUNK_SIZE=3)
+    def test_keyset_batches_cover_ties(self):
+        bugs = self.create_bugs(8)
+        # 相同的创建时间，按id区分先后
+        Bug.objects.filter(id__in=[bug.id for bug in bugs[2:6]]).update(created_at=timezone.now())
+        with CaptureQueriesContext(connection) as ctx:
+            _, content = self.export(file_type='ndjson')
+        exported = [json.loads(line)['id'] for line in content.decode().splitlines()]
+        expected = Bug.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(exported, list(expected))
+        selects = [query for query in ctx.captured_queries if 'FROM "bugs"' in query['sql']]
+        self.assertEqual(len(selects), 3)
+
+    def test_unknown_file_type(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/bugs/export/', {'file_type': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file_type', response.data)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN输出格式依赖SQLite')
+class IndexUsageTests(BugTestMixin, APITestCase):
+    """热点查询必须命中对应的组合索引"""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan.replace('COVERING ', ''), plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan, plan)
+
+    def test_bug_list_queries(self):
+        self.create_bugs(3)
+        self.assertUsesIndex(Bug.objects.order_by('-created_at', '-id'), 'bugs_created_id_idx')
+        self.assertUsesIndex(Bug.objects.filter(assignee=self.developer), 'bugs_assignee_created_idx')
+        self.assertUsesIndex(
+            Bug.objects.filter(assignee=self.developer, status='pending'), 'bugs_assignee_status_idx'
+        )
+        self.assertUsesIndex(Bug.objects.filter(creator=self.tester), 'bugs_creator_created_idx')
+        self.assertUsesIndex(Bug.objects.filter(module=self.module), 'bugs_module_created_idx')
+        self.assertUsesIndex(Bug.objects.filter(status='pending'), 'bugs_status_created_idx')
+        self.assertUsesIndex(Bug.objects.order_by('updated_at', 'id'), 'bugs_updated_id_idx')
+
+    def test_history_and_notification_queries(self):
+        bug = self.create_bugs(1)[0]
+        self.assertUsesIndex(BugHistory.objects.filter(bug=bug), 'bug_history_bug_created_idx')
+        self.assertUsesIndex(
+            Notification.objects.filter(user=self.developer, is_read=False).order_by().values('id'),
+            'notif_user_read_created_idx'
+        )
+        self.assertUsesIndex(Notification.objects.filter(user=self.developer), 'notif_user_created_idx')
+
+
+class ConditionalRequestTests(BugTestMixin, APITestCase):
+    """列表/详情的条件请求：ETag、Last-Modified与304"""
+
+    def get(self, path, params=None, **headers):
+        self.client.force_authenticate(self.admin)
+        return self.client.get(path, params or {}, **headers)
+
+    def test_list_validators_and_304(self):
+        bugs = self.create_bugs(3)
+        response = self.get('/api/bugs/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.get('/api/bugs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        # 只执行指纹聚合查询
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        cached = self.get('/api/bugs/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+        bugs[0].title = '改过的标题'
+        bugs[0].save()
+        self.assertEqual(self.get('/api/bugs/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_depends_on_query(self):
+        self.create_bugs(2)
+        etag = self.get('/api/bugs/')['ETag']
+        self.assertEqual(self.get('/api/bugs/', {'status': 'pending'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_changes_on_delete_and_module_rename(self):
+        bugs = self.create_bugs(2)
+        etag = self.get('/api/bugs/')['ETag']
+        self.module.name = '用户注册'
+        self.module.save()
+        response = self.get('/api/bugs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        bugs[0].delete()
+        self.assertEqual(self.get('/api/bugs/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cursor_page_skips_count(self):
+        bugs = self.create_bugs(3)
+        params = {'pagination': 'cursor'}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get('/api/bugs/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('COUNT(', ctx.captured_queries[0]['sql'].upper())
+
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/bugs/', params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.create_bugs(1)
+        response = self.get('/api/bugs/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Bug.objects.filter(pk=bugs[0].pk).update(title='改过的标题', updated_at=timezone.now())
+        self.assertEqual(self.get('/api/bugs/', params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_validators_and_304(self):
+        bug = self.create_bugs(1)[0]
+        path = f'/api/bugs/{bug.id}/'
+        response = self.get(path)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        # 不同的字段集使用不同的ETag
+        self.assertEqual(self.get(path, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.force_authenticate(self.admin)
+        self.client.patch(path, {'title': '改过的标题'}, format='json')
+        self.assertEqual(self.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(BUG_CHANGES_LAG_SECONDS=0)
+class BugChangesTests(BugTestMixin, APITestCase):
+    """增量同步：变化的BUG、墓碑记录、分页与水位"""
+
+    def sync(self, user, since=None, **params):
+        self.client.force_authenticate(user)
+        if since:
+            params['since'] = since
+        return self.client.get('/api/bugs/changes/', params)
+
+    def changed_ids(self, response):
+        return [bug['id'] for bug in response.data['changed']]
+
+    def test_initial_sync_returns_scope(self):
+        mine = self.create_bugs(2)
+        self.create_bugs(1, assignee=self.admin)
+        response = self.sync(self.developer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.changed_ids(response), [bug.id for bug in mine])
+        self.assertEqual(response.data['deleted'], [])
+        self.assertFalse(response.data['has_more'])
+        # 字段同列表
+        self.assertEqual(response.data['changed'][0]['module_path'], '电商平台 / 用户中心 / 用户登录')
+
+    def test_changed_rows_since_token(self):
+        bugs = self.create_bugs(3)
+        token = self.sync(self.admin).data['next']
+        response = self.sync(self.admin, token)
+        self.assertEqual(self.changed_ids(response), [])
+
+        bugs[1].title = '改过的标题'
+        bugs[1].save()
+        created = self.create_bugs(1)[0]
+        response = self.sync(self.admin, token, fields='id,title')
+        self.assertEqual(self.changed_ids(response), [bugs[1].id, created.id])
+        self.assertEqual(response.data['changed'][0], {'id': bugs[1].id, 'title': '改过的标题'})
+
+    def test_delete_tombstone_follows_role_scope(self):
+        bugs = self.create_bugs(2)
+        other = self.create_bugs(1, creator=self.admin, assignee=self.admin)[0]
+        tokens = {user: self.sync(user).data['next'] for user in (self.admin, self.tester, self.developer)}
+
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.delete(f'/api/bugs/{bugs[0].id}/').status_code, 204)
+        other_id = other.id
+        other.delete()
+
+        self.assertEqual(self.sync(self.admin, tokens[self.admin]).data['deleted'], [bugs[0].id, other_id])
+        self.assertEqual(self.sync(self.tester, tokens[self.tester]).data['deleted'], [bugs[0].id])
+        self.assertEqual(self.sync(self.developer, tokens[self.developer]).data['deleted'], [bugs[0].id])
+
+    def test_unassign_tombstone(self):
+        bugs = self.create_bugs(2)
+        other_dev = User.objects.create_user('t_dev2', password='x', role='developer')
+        token = self.sync(self.developer).data['next']
+
+        self.client.force_authenticate(self.admin)
+        self.client.post(f'/api/bugs/{bugs[0].id}/assign/', {'assignee': other_dev.id})
+        self.client.post('/api/bugs/bulk_assign/', {'ids': [bugs[1].id], 'assignee': other_dev.id}, format='json')
+
+        response = self.sync(self.developer, token)
+        self.assertEqual(self.changed_ids(response), [])
+        self.assertEqual(sorted(response.data['deleted']), [bugs[0].id, bugs[1].id])
+        self.assertEqual(self.changed_ids(self.sync(other_dev, token)), [bugs[0].id, bugs[1].id])
+
+    def test_tombstone_hidden_while_still_in_scope(self):
+        # 测试人员自己创建的BUG改派后仍然可见，只作为变化返回
+        bug = self.create_bugs(1, assignee=self.tester)[0]
+        token = self.sync(self.tester).data['next']
+        bug.assignee = self.developer
+        bug.save()
+        self.assertEqual(BugTombstone.objects.filter(bug_id=bug.id).count(), 1)
+
+        response = self.sync(self.tester, token)
+        self.assertEqual(response.data['deleted'], [])
+        self.assertEqual(self.changed_ids(response), [bug.id])
+        # 管理员同样不会收到改派产生的墓碑
+        self.assertEqual(self.sync(self.admin, token).data['deleted'], [])
+
+    @override_settings(BUG_CHANGES_LIMIT=2)
+    def test_has_more_paging(self):
+        bugs = self.create_bugs(5)
+        seen = []
+        token = None
+        for _ in range(5):
+            response = self.sync(self.admin, token)
+            self.assertLessEqual(len(response.data['changed']), 2)
+            seen += self.changed_ids(response)
+            token = response.data['next']
+            if not response.data['has_more']:
+                break
+        self.assertEqual(seen, [bug.id for bug in bugs])
+        self.assertEqual(self.changed_ids(self.sync(self.admin, token)), [])
+
+    @override_settings(BUG_CHANGES_LAG_SECONDS=60)
+    def test_lag_window_resends_recent_changes(self):
+        bug = self.create_bugs(1)[0]
+        token = self.sync(self.admin).data['next']
+        # 窗口内的变化下一次同步重复返回，不会因提交较慢而遗漏
+        self.assertEqual(self.changed_ids(self.sync(self.admin, token)), [bug.id])
+
+        Bug.objects.filter(pk=bug.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        token = self.sync(self.admin).data['next']
+        self.assertEqual(self.changed_ids(self.sync(self.admin, token)), [])
+
+    def test_imported_bugs_are_returned(self):
+        token = self.sync(self.admin).data['next']
+        line = json.dumps({
+            'title': '旧系统的BUG', 'creator_name': 't_tester',
+            'created_at': '2020-01-01T08:00:00+08:00', 'updated_at': '2020-01-02T08:00:00+08:00',
+        })
+        BugImporter().run(read_records(io.BytesIO(line.encode()), 'ndjson'))
+        response = self.sync(self.admin, token)
+        self.assertEqual([bug['title'] for bug in response.data['changed']], ['旧系统的BUG'])
+
+    def test_invalid_and_expired_token(self):
+        self.assertEqual(self.sync(self.admin, 'garbage').status_code, 400)
+        old = timezone.now() - timedelta(days=31)
+        token = encode_token({'b': (old, 0), 't': (old, 0), 'm': (old, 0)})
+        self.assertEqual(self.sync(self.admin, token).status_code, 410)
+        with override_settings(BUG_TOMBSTONE_RETENTION_DAYS=60):
+            self.assertEqual(self.sync(self.admin, token).status_code, 200)
+
+
+class KeysetPaginationTests(BugTestMixin, APITestCase):
+    """游标分页：顺序、翻页期间新增数据时的稳定性、非法游标、不统计总数"""
+
+    def page(self, cursor=None, **params):
+        self.client.force_authenticate(self.admin)
+        params.update({'pagination': 'cursor', 'page_size': 2})
+        if cursor:
+            params['cursor'] = cursor
+        return self.client.get('/api/bugs/', params)
+
+    def next_cursor(self, response):
+        link = response.data['next']
+        return parse_qs(urlsplit(link).query)['cursor'][0] if link else None
+
+    def cursor_of(self, payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    def test_pages_follow_created_at_desc(self):
+        bugs = self.create_bugs(5)
+        # 同一时间创建的BUG按id倒序
+        Bug.objects.filter(pk__in=[bugs[1].pk, bugs[2].pk]).update(created_at=bugs[1].created_at)
+        expected = list(Bug.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        seen = []
+        cursor = None
+        while True:
+            response = self.page(cursor)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen += [bug['id'] for bug in response.data['results']]
+            cursor = self.next_cursor(response)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_pages_stable_across_inserts(self):
+        bugs = self.create_bugs(4)
+        first = self.page()
+        self.assertEqual([bug['id'] for bug in first.data['results']], [bugs[3].id, bugs[2].id])
+        self.create_bugs(2)
+        second = self.page(self.next_cursor(first))
+        self.assertEqual([bug['id'] for bug in second.data['results']], [bugs[1].id, bugs[0].id])
+
+        previous = parse_qs(urlsplit(second.data['previous']).query)['cursor'][0]
+        back = self.page(previous)
+        self.assertEqual([bug['id'] for bug in back.data['results']], [bugs[3].id, bugs[2].id])
+
+    def test_no_count_query(self):
+        self.create_bugs(3)
+        cursor = self.next_cursor(self.page())
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.page(cursor).status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('COUNT(', ctx.captured_queries[0]['sql'].upper())
+
+    def test_invalid_cursor(self):
+        self.create_bugs(1)
+        for cursor in (
+            'not-base64!',
+            self.cursor_of({'p': ['2024-01-01T00:00:00+00:00'], 'r': 0}),
+            self.cursor_of({'p': ['garbage', 1], 'r': 0}),
+            self.cursor_of({'p': [{}, 1], 'r': 0}),
+            self.cursor_of({'p': ['2024-13-01T00:00:00+00:00', 1], 'r': 0}),
+            self.cursor_of({'p': ['2024-01-01T00:00:00+00:00', '1'], 'r': 0}),
+            self.cursor_of({'p': ['2024-01-01T00:00:00+00:00', [1]], 'r': 0}),
+        ):
+            response = self.page(cursor)
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.data['detail'], '无效的游标')
+
+        # 操作历史跨在线表和归档表翻页，游标同样校验
+        bug = Bug.objects.get()
+        response = self.client.get(
+            f'/api/bugs/{bug.id}/history/', {'cursor': self.cursor_of({'p': [{}, 1], 'r': 0})}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class BugHistoryTests(BugTestMixin, APITestCase):
+    """详情只内嵌最近的操作历史，更早的通过 history_next 游标从 history 接口分页获取"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        self.bug = self.create_bugs(1)[0]
+
+    def add_history(self, count, action='update', start=0, days_ago=10):
+        """按时间先后写入count条历史，返回id列表（从旧到新）"""
+        base = timezone.now() - timedelta(days=days_ago)
+        ids = []
+        for i in range(start, start + count):
+            entry = BugHistory.objects.create(
+                bug=self.bug, operator=self.tester, action=action, description=f'操作 {i}'
+            )
+            BugHistory.objects.filter(pk=entry.pk).update(created_at=base + timedelta(minutes=i))
+            ids.append(entry.id)
+        return ids
+
+    def archive(self, days):
+        call_command('archive_bug_history', days=days, batch_size=3, stdout=io.StringIO())
+
+    def detail(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/bugs/{self.bug.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.history_queries = [
+            query['sql'] for query in ctx.captured_queries if 'bug_history' in query['sql']
+        ]
+        return response.data
+
+    def page_through(self, cursor, page_size=None):
+        """从游标开始翻完 history 接口，返回依次得到的id；cursor为空字符串时从第一页开始"""
+        seen = []
+        params = {'page_size': page_size} if page_size else {}
+        while cursor is not None:
+            response = self.client.get(
+                f'/api/bugs/{self.bug.id}/history/', dict(params, cursor=cursor) if cursor else params
+            )
+            self.assertEqual(response.status_code, 200)
+            seen += [entry['id'] for entry in response.data['results']]
+            next_url = response.data['next']
+            cursor = parse_qs(urlsplit(next_url).query)['cursor'][0] if next_url else None
+        return seen
+
+    def test_detail_embeds_latest_entries(self):
+        ids = self.add_history(1, action='create') + self.add_history(44, start=1)
+        data = self.detail()
+        limit = BugDetailSerializer.HISTORY_LIMIT
+        self.assertEqual([entry['id'] for entry in data['history']], ids[::-1][:limit])
+        self.assertEqual(data['history'][0]['operator_name'], 't_tester')
+        # 在线记录足够时不查询归档表
+        self.assertEqual(len(self.history_queries), 1)
+        self.assertNotIn('bug_history_archive', self.history_queries[0])
+        self.assertEqual(self.page_through(data['history_next']), ids[::-1][limit:])
+
+    def test_short_history_without_create_entry(self):
+        ids = self.add_history(3)
+        data = self.detail()
+        self.assertEqual([entry['id'] for entry in data['history']], ids[::-1])
+        self.assertIsNone(data['history_next'])
+
+    def test_full_online_page_continues_into_archive(self):
+        archived = self.add_history(1, action='create', days_ago=30) + self.add_history(4, start=1, days_ago=30)
+        online = self.add_history(BugDetailSerializer.HISTORY_LIMIT + 1)
+        self.archive(days=20)
+        self.assertEqual(BugHistory.objects.filter(bug=self.bug).count(), len(online))
+
+        data = self.detail()
+        self.assertEqual([entry['id'] for entry in data['history']], online[::-1][:-1])
+        self.assertEqual(self.page_through(data['history_next']), online[:1] + archived[::-1])
+
+    def test_imported_bug_reads_archive_only_when_short(self):
+        archived = self.add_history(3, days_ago=30)
+        self.archive(days=20)
+        data = self.detail()
+        self.assertEqual([entry['id'] for entry in data['history']], archived[::-1])
+        self.assertEqual(len(self.history_queries), 2)
+
+    def test_paging_across_the_archive_boundary(self):
+        old = self.add_history(1, action='create', days_ago=30) + self.add_history(6, start=1, days_ago=30)
+        recent = self.add_history(6, days_ago=10)
+        # 同一时间的多条记录按id倒序，归档前后顺序不变
+        BugHistory.objects.filter(id__in=old[2:5]).update(created_at=timezone.now() - timedelta(days=29))
+        BugHistory.objects.filter(id__in=recent[:3]).update(created_at=timezone.now() - timedelta(days=9))
+        expected = list(
+            BugHistory.objects.filter(bug=self.bug).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.page_through('', page_size=4), expected)
+
+        self.archive(days=20)
+        self.assertEqual(BugHistoryArchive.objects.filter(bug=self.bug).count(), len(old))
+        self.assertEqual(BugHistory.objects.filter(bug=self.bug).count(), len(recent))
+        for page_size in (1, 3, 4, 6, 7):
+            self.assertEqual(self.page_through('', page_size=page_size), expected)
+
+    def test_history_endpoint_pages_from_the_start(self):
+        ids = self.add_history(25)
+        response = self.client.get(f'/api/bugs/{self.bug.id}/history/')
+        self.assertEqual([entry['id'] for entry in response.data['results']], ids[::-1][:20])
+        next_url = response.data['next']
+        self.assertEqual(self.page_through(parse_qs(urlsplit(next_url).query)['cursor'][0]), ids[::-1][20:])
+
+
+class BugImportTests(BugTestMixin, APITestCase):
+    """批量导入：分批、主键回填、无效记录、只校验"""
+
+    def ndjson(self, records):
+        return io.BytesIO(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode())
+
+    def record(self, i, **extra):
+        return {'title': f'导入的BUG {i}', 'creator_name': 't_tester', 'assignee_name': 't_dev',
+                'module_path': '电商平台 / 用户中心 / 用户登录', **extra}
+
+    def daily_stats(self):
+        return sorted(BugDailyStats.objects.values_list(
+            'date', 'module_id', 'creator_id', 'assignee_id', 'status', 'severity',
+            'created', 'entered', 'assigned'
+        ))
+
+    def test_batches_and_history_ids(self):
+        reports = []
+        history = [{'operator_name': 't_admin', 'action': 'status_change', 'new_value': '处理中',
+                    'created_at': '2024-01-02T08:00:00+08:00'}]
+        records = [self.record(i, created_at='2024-01-01T08:00:00+08:00', history=history) for i in range(5)]
+        importer = BugImporter(batch_size=2, progress=lambda report: reports.append(report['processed']))
+        report = importer.run(read_records(self.ndjson(records), 'ndjson'))
+
+        self.assertEqual(reports, [2, 4, 5])
+        self.assertEqual((report['imported'], report['failed']), (5, 0))
+        for bug in Bug.objects.all():
+            self.assertEqual(list(bug.history.values_list('new_value', flat=True)), ['处理中'])
+            self.assertEqual(bug.created_at.isoformat(), '2024-01-01T00:00:00+00:00')
+        # 每批累加的每日统计与全量重建一致
+        self.assertEqual(BugDailyStats.objects.filter(entered__gt=0).count(), 2)
+        incremental = self.daily_stats()
+        rebuild_daily_stats()
+        self.assertEqual(incremental, self.daily_stats())
+
+    def test_resume_from_start(self):
+        records = [self.record(i) for i in range(3)]
+        report = BugImporter(start=2).run(read_records(self.ndjson(records), 'ndjson'))
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(list(Bug.objects.values_list('title', flat=True)), ['导入的BUG 2'])
+
+    @skipUnless(not connection.features.can_return_rows_from_bulk_insert, '数据库可直接返回主键')
+    def test_id_read_back_detects_concurrent_insert(self):
+        original = Bug.objects.bulk_create
+
+        def racing_bulk_create(objs, *args, **kwargs):
+            # 模拟导入期间其他请求插入了一行
+            Bug.objects.create(title='并发创建', creator=self.tester)
+            return original(objs, *args, **kwargs)
+
+        importer = BugImporter()
+        with mock.patch.object(Bug.objects, 'bulk_create', racing_bulk_create):
+            with self.assertRaises(ImportConflict):
+                importer.run(read_records(self.ndjson([self.record(1)]), 'ndjson'))
+        # 整批回滚
+        self.assertFalse(Bug.objects.exists())
+        self.assertEqual(importer.report['processed'], 0)
+
+    def test_row_errors_are_reported(self):
+        records = [
+            self.record(0),
+            self.record(1, creator_name=['t_tester']),
+            self.record(2, module_path={'path': 'x'}),
+            self.record(3, assignee_name='ghost'),
+            self.record(4, status='unknown'),
+            self.record(5, history='x'),
+        ]
+        stream = io.BytesIO(self.ndjson(records).getvalue() + b'not json\n')
+        report = BugImporter().run(read_records(stream, 'ndjson'))
+        self.assertEqual((report['imported'], report['failed']), (1, 6))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4, 5, 6, 7])
+        self.assertEqual(report['errors'][0]['detail'], 'creator_name 应为字符串')
+        self.assertEqual(report['errors'][2]['detail'], '用户不存在: ghost')
+
+    def test_dry_run_writes_nothing(self):
+        records = [self.record(0), self.record(1, creator_name='ghost')]
+        report = BugImporter(dry_run=True).run(read_records(self.ndjson(records), 'ndjson'))
+        self.assertEqual((report['imported'], report['failed']), (1, 1))
+        self.assertFalse(Bug.objects.exists())
+        self.assertFalse(BugHistory.objects.exists())
+        self.assertFalse(BugDailyStats.objects.exists())
+
+    def test_import_endpoint(self):
+        upload = SimpleUploadedFile('bugs.ndjson', self.ndjson([self.record(0)]).getvalue())
+        self.client.force_authenticate(self.tester)
+        self.assertEqual(self.client.post('/api/bugs/import/', {'file': upload}).status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        upload.seek(0)
+        response = self.client.post('/api/bugs/import/', {'file': upload, 'dry_run': 'true'})
+        self.assertEqual(response.data['imported'], 1)
+        self.assertFalse(Bug.objects.exists())
+        upload.seek(0)
+        response = self.client.post('/api/bugs/import/', {'file': upload})
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(Bug.objects.get().history.get().action, 'create')
+
+
+class SimilarityIndexTests(BugTestMixin, APITestCase):
+    """相似BUG检测：索引只由管理命令构建，未构建时不提示"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            BUG_SIMILARITY_INDEX_PATH=os.path.join(directory.name, 'bug_minhash.pkl')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # 进程内索引在用例之间重置
+        patcher = mock.patch.object(similarity, '_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 停止后台写盘线程，退出时不再把测试用的索引写回临时目录
+        self.addCleanup(self.discard_loaded_index)
+
+    def discard_loaded_index(self):
+        if similarity._index is not None:
+            similarity._index.dirty = False
+            similarity._index.stopped.set()
+
+    def similar(self, title, description):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/bugs/similar/', {'title': title, 'description': description})
+        self.assertEqual(response.status_code, 200)
+        return [bug['id'] for bug in response.data['results']]
+
+    def test_no_index_returns_nothing_without_building(self):
+        self.create_bugs(1, description='点击登录按钮后页面一直转圈，控制台报错')
+        self.assertEqual(self.similar('BUG 0', '点击登录按钮后页面一直转圈，控制台报错'), [])
+        self.assertFalse(os.path.exists(similarity.index_path()))
+
+    def test_finds_duplicates_after_rebuild(self):
+        bug = self.create_bugs(1, description='点击登录按钮后页面一直转圈，控制台报错')[0]
+        call_command('rebuild_bug_similarity_index', stdout=io.StringIO())
+        self.assertEqual(self.similar('BUG 0', '点击登录按钮后页面一直转圈，控制台报错了'), [bug.id])
+        # 索引加载后新建的BUG增量加入
+        other = Bug.objects.create(
+            title='导出文件乱码', description='导出的CSV用Excel打开中文全是乱码', creator=self.tester
+        )
+        self.assertEqual(self.similar('导出文件乱码', '导出的CSV用Excel打开中文全是乱码'), [other.id])
+
+    def test_saving_a_bug_does_not_write_the_index(self):
+        self.create_bugs(1, description='点击登录按钮后页面一直转圈，控制台报错')
+        call_command('rebuild_bug_similarity_index', stdout=io.StringIO())
+        self.similar('BUG 0', '点击登录按钮后页面一直转圈')
+        with mock.patch.object(similarity.SimilarityIndex, 'save') as save:
+            bug = Bug.objects.create(
+                title='导出文件乱码', description='导出的CSV用Excel打开中文全是乱码', creator=self.tester
+            )
+        save.assert_not_called()
+        index = similarity._index
+        self.assertTrue(index.dirty)
+
+        # 由后台线程定期写盘，进程退出（stop）时写入剩余的更新
+        self.assertIn('bug-similarity-autosave', [thread.name for thread in threading.enumerate()])
+        index.stop()
+        self.assertFalse(index.dirty)
+        reloaded = similarity.SimilarityIndex(similarity.index_path())
+        self.assertTrue(reloaded.load())
+        self.assertIn(bug.id, reloaded.signatures)
+
+    def test_catch_up_applies_other_process_edits_and_deletes(self):
+        edited, deleted = self.create_bugs(2, description='点击登录按钮后页面一直转圈，控制台报错')
+        call_command('rebuild_bug_similarity_index', stdout=io.StringIO())
+        # 另一个进程的索引：本进程的保存/删除不会直接更新它
+        other = similarity.SimilarityIndex(similarity.index_path())
+        self.assertTrue(other.load())
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(
+            f'/api/bugs/{edited.id}/', {'title': '导出文件乱码', 'description': '导出的CSV用Excel打开中文全是乱码'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/bugs/{deleted.id}/').status_code, 204)
+
+        matches = dict(other.query('导出文件乱码', '导出的CSV用Excel打开中文全是乱码'))
+        self.assertIn(edited.id, matches)
+        self.assertEqual(other.query('BUG 0', '点击登录按钮后页面一直转圈，控制台报错'), [])
+        self.assertNotIn(deleted.id, other.signatures)
+
+    def test_long_text_signature_uses_capped_shingles(self):
+        text = ''.join(chr(0x4e00 + (i * 7919) % 3000) for i in range(2000))
+        tokens = similarity.shingles('标题', text)
+        self.assertGreater(len(tokens), similarity.MAX_SHINGLES)
+        signature = similarity.minhash(tokens)
+        self.assertEqual(signature, similarity.minhash(set(tokens)))
+        edited = similarity.minhash(similarity.shingles('标题', text[:1990] + '末尾改动'))
+        self.assertGreater(similarity.estimate_similarity(signature, edited), 0.8)
+
+
+class BulkActionTests(EagerPipelineMixin, BugTestMixin, APITestCase):
+    """批量修改状态/批量分配：数据范围与权限、单条UPDATE、历史与通知、墓碑、数量上限"""
+
+    def post(self, user, path, data):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(path, data, format='json')
+        self.queries = [query['sql'] for query in ctx.captured_queries]
+        return response
+
+    def bug_updates(self):
+        return [sql for sql in self.queries if sql.startswith('UPDATE "bugs"')]
+
+    def test_bulk_status_single_update_history_and_notifications(self):
+        bugs = self.create_bugs(3)
+        response = self.post(self.developer, '/api/bugs/bulk_update_status/', {
+            'ids': [bug.id for bug in bugs], 'status': 'resolved', 'solution': '已修复',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(self.bug_updates()), 1)
+        self.assertEqual(set(Bug.objects.values_list('status', 'solution')), {('resolved', '已修复')})
+
+        history = BugHistory.objects.filter(action='status_change')
+        self.assertEqual(sorted(history.values_list('bug_id', flat=True)), [bug.id for bug in bugs])
+        self.assertEqual(set(history.values_list('old_value', 'new_value')), {('待处理', '已解决')})
+        # 每个BUG通知其创建人
+        notifications = Notification.objects.filter(user=self.tester, type='bug_status')
+        self.assertEqual(sorted(notifications.values_list('bug_id', flat=True)), [bug.id for bug in bugs])
+        self.assertEqual(NotificationCounter.objects.get(user=self.tester).unread, 3)
+
+    def test_bulk_status_permissions(self):
+        mine = self.create_bugs(1)[0]
+        others = self.create_bugs(1, assignee=self.admin)[0]
+        # 开发人员数据范围外的BUG视为不存在，整批不执行
+        response = self.post(self.developer, '/api/bugs/bulk_update_status/', {
+            'ids': [mine.id, others.id], 'status': 'processing',
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['ids'], [others.id])
+        self.assertFalse(Bug.objects.exclude(status='pending').exists())
+
+        response = self.post(self.developer, '/api/bugs/bulk_update_status/', {
+            'ids': [mine.id], 'status': 'closed',
+        })
+        self.assertEqual(response.status_code, 403)
+        response = self.post(self.tester, '/api/bugs/bulk_update_status/', {
+            'ids': [mine.id], 'status': 'closed',
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(BugHistory.objects.filter(action='status_change').exists())
+
+    def test_bulk_assign(self):
+        other_dev = User.objects.create_user('t_dev2', password='x', role='developer')
+        bugs = self.create_bugs(2)
+        unassigned = self.create_bugs(1, assignee=None)[0]
+        ids = [bug.id for bug in bugs] + [unassigned.id]
+        response = self.post(self.admin, '/api/bugs/bulk_assign/', {'ids': ids, 'assignee': other_dev.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.bug_updates()), 1)
+        self.assertEqual(set(Bug.objects.values_list('assignee_id', flat=True)), {other_dev.id})
+
+        history = BugHistory.objects.filter(action='assign')
+        self.assertEqual(
+            sorted(history.values_list('old_value', flat=True)), ['t_dev', 't_dev', '未分配']
+        )
+        self.assertEqual(
+            sorted(Notification.objects.filter(user=other_dev).values_list('bug_id', flat=True)), sorted(ids)
+        )
+        # 原处理人各记一条墓碑，未分配的BUG没有
+        self.assertEqual(
+            sorted(BugTombstone.objects.values_list('bug_id', 'assignee_id')),
+            [(bug.id, self.developer.id) for bug in bugs]
+        )
+
+    def test_bulk_assign_permissions(self):
+        bug = self.create_bugs(1)[0]
+        for user in (self.tester, self.developer):
+            response = self.post(user, '/api/bugs/bulk_assign/', {'ids': [bug.id], 'assignee': self.admin.id})
+            self.assertEqual(response.status_code, 403)
+        response = self.post(self.admin, '/api/bugs/bulk_assign/', {'ids': [bug.id, 99999], 'assignee': self.admin.id})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Bug.objects.get().assignee, self.developer)
+
+    def test_ids_limit_and_duplicates(self):
+        bug = self.create_bugs(1)[0]
+        limit = BugBulkSerializer.MAX_IDS
+        response = self.post(self.admin, '/api/bugs/bulk_assign/', {
+            'ids': list(range(1, limit + 2)), 'assignee': self.admin.id,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response.data)
+        self.assertEqual(self.post(self.admin, '/api/bugs/bulk_assign/', {
+            'ids': [], 'assignee': self.admin.id,
+        }).status_code, 400)
+
+        response = self.post(self.admin, '/api/bugs/bulk_update_status/', {
+            'ids': [bug.id, bug.id], 'status': 'processing',
+        })
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(BugHistory.objects.filter(action='status_change').count(), 1)
+
+
+class StatisticsTests(BugTestMixin, APITestCase):
+
+    def test_module_ranking_keeps_slash_format(self):
+        self.create_bugs(2)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/bugs/statistics/')
+        self.assertEqual(response.data['module'], [{'name': '电商平台/用户中心/用户登录', 'count': 2}])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5检索只用于SQLite')
+class SQLiteSearchTests(BugTestMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.in_description = Bug.objects.create(
+            title='页面报错', description='点击登录失败后页面空白', module=self.module, creator=self.tester
+        )
+        self.in_title = Bug.objects.create(
+            title='登录失败', description='提示密码错误', module=self.module, creator=self.tester
+        )
+        Bug.objects.create(title='导出乱码', description='CSV中文乱码', module=self.module, creator=self.tester)
+
+    def search(self, query, **params):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/bugs/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [bug['id'] for bug in response.data['results']]
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('登录失败'), [self.in_title.id, self.in_description.id])
+        self.assertEqual(self.search('登录失败', pagination='cursor'), [self.in_title.id, self.in_description.id])
+        self.assertEqual(self.search('csv'), [Bug.objects.get(title='导出乱码').id])
+
+    def test_joins_fts_table_once(self):
+        queryset = get_search_backend().search(Bug.objects.all(), '登录失败')
+        sql = str(queryset.query)
+        self.assertEqual(sql.count('bugs_fts MATCH'), 1)
+        self.assertEqual(sql.count('bm25('), 1)
+        self.assertNotIn('SELECT rowid', sql)
+        self.assertEqual(queryset.count(), 2)
+
+    def test_single_cjk_char_falls_back_to_like(self):
+        self.assertEqual(sorted(self.search('乱')), [Bug.objects.get(title='导出乱码').id])
+
+    def fts_writes(self, action):
+        with CaptureQueriesContext(connection) as ctx:
+            action()
+        return [query['sql'] for query in ctx.captured_queries if 'bugs_fts' in query['sql']]
+
+    def test_reindexes_only_when_text_changes(self):
+        bug = Bug.objects.get(pk=self.in_title.pk)
+        bug.status = 'processing'
+        self.assertEqual(self.fts_writes(bug.save), [])
+        bug.title = bug.title
+        self.assertEqual(self.fts_writes(bug.save), [])
+
+        bug.title = '登录超时'
+        self.assertEqual(len(self.fts_writes(bug.save)), 2)
+        self.assertEqual(self.fts_writes(bug.save), [])
+        self.assertEqual(self.search('登录超时'), [bug.id])
+
+        # 加载时未包含描述，无法判断是否变化，按已变化重建
+        bug = Bug.objects.only('id', 'title').get(pk=self.in_description.pk)
+        bug.description = '点击注册失败'
+        self.assertEqual(len(self.fts_writes(bug.save)), 2)
+        self.assertEqual(self.search('注册'), [bug.id])
+
+    def test_mysql_short_terms_fall_back_to_like(self):
+        backend = MySQLFulltextSearchBackend()
+        self.assertIn('MATCH', str(backend.search(Bug.objects.all(), '登录 失败').query))
+        for query in ('乱', '导出 乱', 'a'):
+            with self.subTest(query=query):
+                queryset = backend.search(Bug.objects.all(), query)
+                self.assertNotIn('MATCH', str(queryset.query))
+        self.assertEqual(
+            list(backend.search(Bug.objects.all(), '乱').values_list('title', flat=True)), ['导出乱码']
+        )
+
+    def test_migration_tokenizer_matches_backend(self):
+        migration = import_module('bugs.migrations.0007_bug_search_index')
+        for text in ('登录失败 Login-Error 404', '', None, '单'):
+            self.assertEqual(migration.ngram_text(text), ngram_text(text))
+
+
+class DailyStatsTests(BugTestMixin, APITestCase):
+    """每日汇总表的增量维护与全量重建结果一致"""
+
+    def stats(self):
+        return sorted(BugDailyStats.objects.filter(
+            Q(created__gt=0) | Q(entered__gt=0) | Q(assigned__gt=0)
+        ).values_list(
+            'date', 'module_id', 'creator_id', 'assignee_id', 'status', 'severity',
+            'created', 'entered', 'assigned'
+        ))
+
+    def test_incremental_matches_rebuild(self):
+        self.client.force_authenticate(self.tester)
+        response = self.client.post('/api/bugs/', {
+            'title': '登录失败', 'description': '密码正确也提示错误', 'severity': 'major',
+            'module': self.module.id, 'assignee': self.developer.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        bug_id = response.data['id']
+        others = self.create_bugs(2)
+        bump_daily_stats(others, created=1, entered=1)
+
+        self.client.force_authenticate(self.developer)
+        for new_status in ('processing', 'processing', 'resolved'):
+            response = self.client.post(f'/api/bugs/{bug_id}/update_status/', {'status': new_status, 'solution': '已修复'})
+            self.assertEqual(response.status_code, 200)
+        # 批量修改中状态未变化的BUG同样不计入
+        response = self.client.post('/api/bugs/bulk_update_status/', {
+            'ids': [bug_id] + [bug.id for bug in others], 'status': 'resolved', 'solution': '已修复',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BugHistory.objects.filter(action='status_change', old_value=F('new_value')).count(), 2)
+
+        incremental = self.stats()
+        rebuild_daily_stats()
+        self.assertEqual(self.stats(), incremental)
+        self.assertEqual(
+            BugDailyStats.objects.filter(status='processing').values_list('entered', flat=True).get(), 1
+        )
+
+    def test_racing_first_events_without_module_or_assignee(self):
+        bug = self.create_bugs(1, module=None, assignee=None)[0]
+        bump_daily_stats([bug], created=1)
+        # 模拟并发：本请求的UPDATE在另一请求创建该行之前执行，未命中任何行，随后INSERT冲突
+        update = QuerySet.update
+        calls = []
+
+        def stale_first_update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', stale_first_update):
+            bump_daily_stats([bug], created=1)
+        self.assertEqual(len(calls), 2)
+        rows = BugDailyStats.objects.filter(module=None, assignee=None)
+        self.assertEqual(list(rows.values_list('created', flat=True)), [2])
+
+
+class KanbanTests(BugTestMixin, APITestCase):
+    """看板：每列的数量上限、列内游标翻页"""
+
+    def kanban(self, **params):
+        self.client.force_authenticate(self.admin)
+        return self.client.get('/api/bugs/kanban/', params)
+
+    def column(self, response, code):
+        return next(column for column in response.data['columns'] if column['status'] == code)
+
+    def test_columns_are_limited_independently(self):
+        self.create_bugs(25)
+        self.create_bugs(3, status='resolved')
+        response = self.kanban()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([column['status'] for column in response.data['columns']], [code for code, _ in Bug.STATUS_CHOICES])
+
+        pending = self.column(response, 'pending')
+        self.assertEqual((pending['count'], len(pending['results'])), (25, 20))
+        self.assertIsNotNone(pending['next'])
+        resolved = self.column(response, 'resolved')
+        self.assertEqual((resolved['count'], len(resolved['results']), resolved['next']), (3, 3, None))
+
+        response = self.kanban(page_size=5)
+        self.assertEqual(len(self.column(response, 'pending')['results']), 5)
+        self.assertEqual(len(self.column(response, 'resolved')['results']), 3)
+
+    def test_cursor_pages_one_column(self):
+        bugs = self.create_bugs(25)
+        first = self.column(self.kanban(), 'pending')
+        response = self.kanban(status='pending', cursor=first['next'])
+        self.assertEqual(len(response.data['columns']), 1)
+        rest = response.data['columns'][0]
+        self.assertEqual(rest['count'], 25)
+        self.assertIsNone(rest['next'])
+        seen = [card['id'] for card in first['results'] + rest['results']]
+        self.assertEqual(seen, sorted((bug.id for bug in bugs), reverse=True))
+
+    def test_cursor_requires_status(self):
+        self.create_bugs(25)
+        cursor = self.column(self.kanban(), 'pending')['next']
+        response = self.kanban(cursor=cursor)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+
+class NodeCountTests(BugTestMixin, APITestCase):
+    """节点BUG数量汇总：每次增量维护后都应与全量重建的结果一致"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        self.product = self.module.product
+        self.project = self.product.project
+        self.other_module = Module.objects.create(product=self.product, name='用户注册')
+        self.other_project = Project.objects.create(name='运营后台')
+        self.other_product = Product.objects.create(project=self.other_project, name='活动管理')
+
+    def assertCountsMatchRebuild(self):
+        maintained = node_counts()
+        rebuild_node_counts()
+        self.assertEqual(maintained, node_counts())
+        return maintained
+
+    def test_create(self):
+        self.create_bugs(3)
+        self.create_bugs(2, module=self.other_module, severity='critical')
+        self.create_bugs(1, module=None)
+        counts = self.assertCountsMatchRebuild()
+        self.assertEqual(counts[('module', self.module.id)]['total'], 3)
+        self.assertEqual(counts[('product', self.product.id)]['severity']['critical'], 2)
+        self.assertEqual(counts[('project', self.project.id)]['total'], 5)
+
+    def test_status_and_field_changes(self):
+        bugs = self.create_bugs(3)
+        response = self.client.post(f'/api/bugs/{bugs[0].id}/update_status/', {'status': 'closed'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/bugs/bulk_update_status/', {
+            'ids': [bugs[1].id], 'status': 'resolved', 'solution': '已修复',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(
+            f'/api/bugs/{bugs[2].id}/', {'severity': 'major', 'module': self.other_module.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        counts = self.assertCountsMatchRebuild()
+        module = counts[('module', self.module.id)]
+        self.assertEqual((module['total'], module['open']), (2, 0))
+        self.assertEqual((module['status']['closed'], module['status']['resolved']), (1, 1))
+        self.assertEqual(counts[('module', self.other_module.id)]['severity']['major'], 1)
+
+    def test_module_move(self):
+        self.create_bugs(2)
+        self.create_bugs(1, module=self.other_module)
+        response = self.client.patch(f'/api/modules/modules/{self.module.id}/', {'product': self.other_product.id})
+        self.assertEqual(response.status_code, 200)
+        counts = self.assertCountsMatchRebuild()
+        self.assertEqual(counts[('product', self.other_product.id)]['total'], 2)
+        self.assertEqual(counts[('project', self.other_project.id)]['total'], 2)
+        self.assertEqual(counts[('project', self.project.id)]['total'], 1)
+
+    def test_product_move(self):
+        self.create_bugs(2)
+        response = self.client.patch(f'/api/modules/products/{self.product.id}/', {'project': self.other_project.id})
+        self.assertEqual(response.status_code, 200)
+        counts = self.assertCountsMatchRebuild()
+        self.assertNotIn(('project', self.project.id), counts)
+        self.assertEqual(counts[('project', self.other_project.id)]['total'], 2)
+
+    def test_delete(self):
+        bugs = self.create_bugs(2)
+        self.create_bugs(3, module=self.other_module)
+        response = self.client.delete(f'/api/bugs/{bugs[0].id}/')
+        self.assertEqual(response.status_code, 204)
+        counts = self.assertCountsMatchRebuild()
+        self.assertEqual(counts[('product', self.product.id)]['total'], 4)
+
+        response = self.client.delete(f'/api/modules/modules/{self.other_module.id}/')
+        self.assertEqual(response.status_code, 204)
+        counts = self.assertCountsMatchRebuild()
+        self.assertNotIn(('module', self.other_module.id), counts)
+        self.assertEqual(counts[('project', self.project.id)]['total'], 1)
+
+        self.project.delete()
+        self.assertEqual(self.assertCountsMatchRebuild(), {})
+
+    def test_counts_in_node_responses(self):
+        self.create_bugs(2)
+        response = self.client.get(f'/api/modules/modules/{self.module.id}/')
+        self.assertEqual(response.data['bug_counts']['total'], 2)
+        response = self.client.get('/api/modules/projects/')
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        counts = {row['id']: row['bug_counts'] for row in results}
+        self.assertEqual(counts[self.project.id]['open'], 2)
+        self.assertEqual(counts[self.other_project.id]['total'], 0)
@@ -6,12 +6,31 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from datetime import datetime, time, timedelta
+import hashlib
 
-from .models import Bug, BugAttachment, BugHistory
+from modules.models import PATH_SEPARATOR
+from .changes import ExpiredToken, InvalidToken, collect_changes
+from .export import EXPORT_FORMATS, export_response
+from .importer import IMPORT_FORMATS, BugImporter, ImportConflict, read_records
+from .models import Bug, BugAttachment, BugHistory, BugDailyStats, BugTombstone
+from .pagination import ChainedQuerySet, KeysetPagination
+from .search import get_search_backend
+from .similarity import find_similar_bugs
+from .rollups import adjust_node_counts, bug_deltas
+from .stats import compute_breakdown, compute_trend, bump_daily_stats
 from .serializers import (
     BugListSerializer, BugDetailSerializer, BugCreateSerializer,
-    BugUpdateSerializer, BugStatusUpdateSerializer, BugAttachmentSerializer
+    BugUpdateSerializer, BugStatusUpdateSerializer, BugAttachmentSerializer,
+    BugKanbanCardSerializer, SimilarBugSerializer, SimilarBugQuerySerializer,
+    BugHistorySerializer, BugBulkStatusUpdateSerializer, BugBulkAssignSerializer
 )
 
 
@@ -27,15 +46,97 @@ def record_history(bug, user, action, field_name='', old_value='', new_value='',
     )
 
 
+def touch_bug(bug):
+    """只更新BUG的updated_at（附件变化等不经过bug.save()的修改），使条件请求的缓存失效"""
+    Bug.objects.filter(pk=bug.pk).update(updated_at=timezone.now())
+
+
 def send_notification(user, notification_type, title, content, bug_id=None):
+    from notifications.pipeline import send_notifications
+    send_notifications([user], notification_type, title, content, bug_id)
+
+
+def queue_bug_notifications(notifications):
+    """批量操作的通知：notifications为 [(用户id, 类型, 标题, 内容, BUG id), ...]，一次批量写入"""
     from notifications.models import Notification
-    Notification.objects.create(
-        user=user,
-        type=notification_type,
-        title=title,
-        content=content,
-        bug_id=bug_id
+    from notifications.pipeline import queue_notifications
+    queue_notifications([
+        Notification(user_id=user_id, type=notification_type, title=title, content=content, bug_id=bug_id)
+        for user_id, notification_type, title, content, bug_id in notifications
+    ])
+
+
+def local_day_start(value, param, offset_days=0):
+    """
+    将 YYYY-MM-DD 日期转换为当前时区该日（加offset_days天）零点的带时区时间
+    日期格式错误或超出可表示的范围（如9999-12-31的次日、0001-01-01换算时区）时返回400
+    """
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({param: '日期格式应为YYYY-MM-DD'})
+    try:
+        day += timedelta(days=offset_days)
+        return timezone.make_aware(datetime.combine(day, time.min))
+    except OverflowError:
+        raise ValidationError({param: '日期超出范围'})
+
+
+def make_validators(keys, timestamps):
+    """
+    生成条件请求的校验值，返回 (ETag, Last-Modified)
+    ETag为keys与各时间戳的摘要，Last-Modified取时间戳中最晚的一个（都为空时为None）
+    """
+    payload = '|'.join(
+        [str(key) for key in keys] + [value.isoformat() if value else '' for value in timestamps]
     )
+    etag = '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+    return etag, max((value for value in timestamps if value), default=None)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # 浏览器可以缓存，但每次使用前必须带上校验头向服务端确认
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """
+    按 If-None-Match / If-Modified-Since 判断客户端的缓存是否仍然有效（两者都有时以ETag为准），
+    有效时返回304响应，否则返回None
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def tracked_values(bug, changes=None):
+    """
+    返回编辑BUG时需要记录变更历史的字段值（显示值）
+    changes为待保存的新值（序列化器validated_data），未包含的字段取bug的当前值
+    """
+    changes = changes or {}
+    
+    def value(field):
+        return changes[field] if field in changes else getattr(bug, field)
+    
+    description = value('description')
+    assignee = value('assignee')
+    return {
+        'title': value('title'),
+        'description': description[:100] if description else '',
+        'severity': dict(Bug.SEVERITY_CHOICES).get(value('severity'), value('severity')),
+        'priority': dict(Bug.PRIORITY_CHOICES).get(value('priority'), value('priority')),
+        'version': value('version'),
+        'assignee': assignee.username if assignee else '',
+    }
 
 
 class BugViewSet(viewsets.ModelViewSet):
@@ -56,19 +157,36 @@ class BugViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         return [permissions.IsAuthenticated()]
     
-    def get_queryset(self):
+    @property
+    def paginator(self):
+        """
+        分页器：默认页码分页；传入 pagination=cursor 时使用键集分页，
+        按 (-created_at, -id) 定位，不统计总数，适合深度翻页和无限滚动
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+    
+    def scope_queryset(self, queryset):
+        """
+        数据权限控制：超管/管理员可见全部，测试人员可见自己创建或分配给自己的，开发人员可见分配给自己的
+        按 creator_id / assignee_id 过滤，BUG和墓碑记录通用
+        """
         user = self.request.user
-        queryset = Bug.objects.all()
-        
-        # 数据权限控制
         if user.is_super_admin or user.is_admin:
-            pass
+            return queryset
         elif user.is_tester:
-            queryset = queryset.filter(Q(creator=user) | Q(assignee=user))
+            return queryset.filter(Q(creator_id=user.id) | Q(assignee_id=user.id))
         elif user.is_developer:
-            queryset = queryset.filter(assignee=user)
-        else:
-            queryset = queryset.none()
+            return queryset.filter(assignee_id=user.id)
+        return queryset.none()
+    
+    def get_queryset(self):
+        user = self.request.user
+        queryset = self.scope_queryset(Bug.objects.all())
         
         status_param = self.request.query_params.get('status')
         severity = self.request.query_params.get('severity')
@@ -92,23 +210,125 @@ class BugViewSet(viewsets.ModelViewSet):
         if creator:
             queryset = queryset.filter(creator_id=creator)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
+            # 全文检索，结果按相关度排序
+            queryset = get_search_backend().search(queryset, search)
         if module:
             queryset = queryset.filter(module_id=module)
+        # 日期筛选转换为本地时区的半开时间区间 [起始日0点, 结束日次日0点)，
+        # 避免对created_at做日期转换，可直接走索引范围扫描
         if date_start:
-            queryset = queryset.filter(created_at__date__gte=date_start)
+            queryset = queryset.filter(created_at__gte=local_day_start(date_start, 'date_start'))
         if date_end:
-            queryset = queryset.filter(created_at__date__lte=date_end)
+            queryset = queryset.filter(
+                created_at__lt=local_day_start(date_end, 'date_end', offset_days=1)
+            )
         
         if my_bugs == 'created':
             queryset = queryset.filter(creator=user)
         elif my_bugs == 'assigned':
             queryset = queryset.filter(assignee=user)
         
+        # 列表/详情按序列化器声明的依赖一次性关联查询，查询次数与分页大小无关；
+        # 传入 fields / omit 时只查询输出字段需要的列和关联
+        if self.action in ('list', 'retrieve'):
+            serializer_class = self.get_serializer_class()
+            fields = self.requested_fields()
+            if fields is None:
+                fields = list(serializer_class.Meta.fields)
+            if self.action == 'list':
+                # 键集分页的游标取自 created_at、id
+                extra = ['id', 'created_at']
+                if isinstance(self.paginator, KeysetPagination):
+                    # 游标分页的ETag取自当前页各BUG及所属模块的updated_at
+                    extra += ['updated_at', 'module__updated_at']
+            else:
+                # 详情的ETag取自BUG及所属模块的updated_at；附件在序列化时再查询，命中缓存时只需一次查询
+                extra = ['updated_at', 'module__updated_at']
+            queryset = serializer_class.plan_queryset(queryset, fields + extra)
+        elif self.action in ('update', 'partial_update'):
+            # 编辑时记录处理人变更需要处理人用户名
+            queryset = queryset.select_related('assignee')
+        
         return queryset
     
+    def requested_fields(self):
+        """
+        列表/详情的稀疏字段集：fields=a,b 只输出指定字段，omit=a,b 排除指定字段
+        都未传时返回None（输出全部字段）
+        """
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self.get_serializer_class().select_fields(
+                self.request.query_params.get('fields'), self.request.query_params.get('omit')
+            )
+        return self._requested_fields
+    
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'changes'):
+            kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+    
+    def list(self, request, *args, **kwargs):
+        """
+        BUG列表，支持条件请求（ETag / Last-Modified）
+        指纹为筛选后查询集的总数、最大updated_at和所属模块的最大updated_at（模块路径随之变化），
+        与当前用户、查询参数一起计算ETag；指纹由一次聚合查询得到，总数同时供分页复用。
+        客户端缓存仍有效时直接返回304，不查询数据页也不序列化。
+        游标分页（pagination=cursor）不统计总数，指纹取自当前页各行的id和updated_at，只需查询数据页一次
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(self.paginator, KeysetPagination):
+            return self.list_keyset_page(request, queryset)
+        
+        fingerprint = queryset.order_by().aggregate(
+            count=Count('id'), updated=Max('updated_at'), module_updated=Max('module__updated_at')
+        )
+        etag, last_modified = make_validators(
+            [request.user.pk, request.user.role, request.get_full_path(), fingerprint['count']],
+            [fingerprint['updated'], fingerprint['module_updated']]
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        
+        self.known_count = fingerprint['count']
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(queryset, many=True).data)
+        return set_validators(response, etag, last_modified)
+    
+    def list_keyset_page(self, request, queryset):
+        """游标分页的一页：新增、删除的BUG改变当前页的id，编辑和模块路径变化改变updated_at"""
+        page = self.paginate_queryset(queryset)
+        etag, last_modified = make_validators(
+            [request.user.pk, request.user.role, request.get_full_path()] + [bug.id for bug in page],
+            [
+                max((bug.updated_at for bug in page), default=None),
+                max((bug.module.updated_at for bug in page if bug.module_id), default=None),
+            ]
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return set_validators(response, etag, last_modified)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        BUG详情，支持条件请求
+        BUG的编辑、状态流转、分配、附件增删都会更新updated_at，模块路径变化会更新模块的updated_at；
+        ETag按请求路径计算，不同的 fields / omit 参数互不影响
+        """
+        bug = self.get_object()
+        etag, last_modified = make_validators(
+            [request.get_full_path()], [bug.updated_at, bug.module.updated_at if bug.module else None]
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(Response(self.get_serializer(bug).data), etag, last_modified)
+    
     def create(self, request, *args, **kwargs):
         user = request.user
         if user.role not in ('super_admin', 'admin', 'tester'):
@@ -118,56 +338,50 @@ class BugViewSet(viewsets.ModelViewSet):
         
         bug = Bug.objects.get(id=response.data['id'])
         record_history(bug, user, 'create', description=f'创建了BUG: {bug.title}')
+        bump_daily_stats([bug], created=1, entered=1)
         
         return response
     
     def update(self, request, *args, **kwargs):
         user = request.user
+        partial = kwargs.pop('partial', False)
         bug = self.get_object()
         
         if user.is_super_admin:
             pass
         elif user.is_tester:
-            if bug.creator != user:
+            if bug.creator_id != user.id:
                 return Response({'detail': '您只能编辑自己创建的BUG'}, status=status.HTTP_403_FORBIDDEN)
             if bug.status != 'pending':
                 return Response({'detail': '只能编辑待处理状态的BUG'}, status=status.HTTP_403_FORBIDDEN)
         else:
             return Response({'detail': '您没有权限编辑BUG'}, status=status.HTTP_403_FORBIDDEN)
         
-        old_values = {
-            'title': bug.title,
-            'description': bug.description[:100] if bug.description else '',
-            'severity': bug.get_severity_display(),
-            'priority': bug.get_priority_display(),
-            'version': bug.version,
-            'assignee': bug.assignee.username if bug.assignee else '',
-        }
-        
-        response = super().update(request, *args, **kwargs)
-        
-        bug.refresh_from_db()
-        new_values = {
-            'title': bug.title,
-            'description': bug.description[:100] if bug.description else '',
-            'severity': bug.get_severity_display(),
-            'priority': bug.get_priority_display(),
-            'version': bug.version,
-            'assignee': bug.assignee.username if bug.assignee else '',
-        }
-        
-        for field, old_val in old_values.items():
-            new_val = new_values[field]
-            if old_val != new_val:
-                record_history(
-                    bug, user, 'update',
-                    field_name=field,
-                    old_value=str(old_val),
-                    new_value=str(new_val),
-                    description=f'将{field}从"{old_val}"修改为"{new_val}"'
-                )
+        serializer = self.get_serializer(bug, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        
+        # 在内存中比较修改前后的值，变更记录与BUG更新在同一事务中批量写入
+        old_values = tracked_values(bug)
+        new_values = tracked_values(bug, serializer.validated_data)
+        entries = [
+            BugHistory(
+                bug=bug,
+                operator=user,
+                action='update',
+                field_name=field,
+                old_value=str(old_val),
+                new_value=str(new_values[field]),
+                description=f'将{field}从"{old_val}"修改为"{new_values[field]}"'
+            )
+            for field, old_val in old_values.items()
+            if old_val != new_values[field]
+        ]
         
-        return response
+        with transaction.atomic():
+            serializer.save()
+            BugHistory.objects.bulk_create(entries)
+        
+        return Response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
         if not request.user.is_super_admin:
@@ -197,6 +411,7 @@ class BugViewSet(viewsets.ModelViewSet):
             return Response({'detail': '您没有权限修改BUG状态'}, status=status.HTTP_403_FORBIDDEN)
         
         old_status = bug.get_status_display()
+        status_changed = bug.status != new_status
         
         bug.status = new_status
         if new_status == 'resolved':
@@ -213,6 +428,8 @@ class BugViewSet(viewsets.ModelViewSet):
             new_value=new_status_display,
             description=f'将状态从"{old_status}"改为"{new_status_display}"'
         )
+        if status_changed:
+            bump_daily_stats([bug], entered=1)
         
         if bug.creator and bug.creator != user:
             send_notification(
@@ -250,6 +467,7 @@ class BugViewSet(viewsets.ModelViewSet):
             new_value=new_assignee,
             description=f'将处理人从"{old_assignee}"改为"{new_assignee}"'
         )
+        bump_daily_stats([bug], assigned=1)
         
         if bug.assignee and bug.assignee != user:
             send_notification(
@@ -262,6 +480,152 @@ class BugViewSet(viewsets.ModelViewSet):
         
         return Response({'detail': '分配成功'})
     
+    def get_bulk_bugs(self, ids):
+        """
+        取出批量操作的BUG（一次查询），数据范围与单个操作的get_object相同
+        返回 (BUG列表, 不存在或无权访问的id)；有缺失的id时调用方返回 missing_bugs_response，整批都不执行
+        """
+        bugs = list(self.get_queryset().filter(id__in=ids).select_related('assignee'))
+        missing = set(ids) - {bug.id for bug in bugs}
+        return bugs, sorted(missing)
+    
+    def missing_bugs_response(self, missing):
+        # 直接返回Response：异常中的ids会被转换为字符串
+        return Response({'detail': 'BUG不存在或无权访问', 'ids': missing}, status=status.HTTP_404_NOT_FOUND)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """
+        批量修改状态，权限规则与 update_status 相同
+        一条UPDATE修改全部BUG，操作历史一次bulk_create，通知一次批量写入
+        """
+        user = request.user
+        serializer = BugBulkStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        new_status = data['status']
+        
+        if user.is_developer:
+            if new_status not in ('processing', 'resolved', 'rejected'):
+                return Response({'detail': '您只能将状态改为处理中、已解决或已驳回'}, status=status.HTTP_403_FORBIDDEN)
+        elif not user.is_super_admin:
+            return Response({'detail': '您没有权限修改BUG状态'}, status=status.HTTP_403_FORBIDDEN)
+        
+        bugs, missing = self.get_bulk_bugs(data['ids'])
+        if missing:
+            return self.missing_bugs_response(missing)
+        if user.is_developer and any(bug.assignee_id != user.id for bug in bugs):
+            return Response({'detail': '您只能处理分配给自己的BUG'}, status=status.HTTP_403_FORBIDDEN)
+        
+        updates = {'status': new_status, 'updated_at': timezone.now()}
+        if new_status == 'resolved':
+            updates['solution'] = data.get('solution', '')
+        elif new_status == 'rejected':
+            updates['reject_reason'] = data.get('reject_reason', '')
+        
+        new_status_display = dict(Bug.STATUS_CHOICES)[new_status]
+        history = []
+        notifications = []
+        for bug in bugs:
+            old_status = bug.get_status_display()
+            history.append(BugHistory(
+                bug=bug, operator=user, action='status_change',
+                field_name='status',
+                old_value=old_status,
+                new_value=new_status_display,
+                description=f'将状态从"{old_status}"改为"{new_status_display}"'
+            ))
+            if bug.creator_id != user.id:
+                notifications.append((
+                    bug.creator_id, 'bug_status', f'BUG状态变更: {bug.title}',
+                    f'您的BUG "#{bug.id} {bug.title}" 状态已从"{old_status}"变更为"{new_status_display}"',
+                    bug.id
+                ))
+        
+        # 批量UPDATE不触发保存信号，节点数量汇总在这里按变化前后的状态调整
+        changed = [bug for bug in bugs if bug.status != new_status]
+        deltas = bug_deltas([(bug.module_id, bug.status, bug.severity) for bug in changed], -1)
+        for bug in changed:
+            bug.status = new_status
+        deltas.update(bug_deltas([(bug.module_id, bug.status, bug.severity) for bug in changed]))
+        
+        with transaction.atomic():
+            Bug.objects.filter(id__in=[bug.id for bug in bugs]).update(**updates)
+            BugHistory.objects.bulk_create(history)
+            adjust_node_counts(deltas)
+            bump_daily_stats(changed, entered=1)
+            queue_bug_notifications(notifications)
+        
+        return Response({'detail': '状态更新成功', 'status': new_status, 'count': len(bugs)})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_assign(self, request):
+        """
+        批量分配，权限规则与 assign 相同
+        一条UPDATE修改全部BUG，操作历史一次bulk_create，通知一次批量写入
+        """
+        user = request.user
+        if not user.is_super_admin and not user.is_admin:
+            return Response({'detail': '您没有权限分配BUG'}, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = BugBulkAssignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assignee = serializer.validated_data['assignee']
+        bugs, missing = self.get_bulk_bugs(serializer.validated_data['ids'])
+        if missing:
+            return self.missing_bugs_response(missing)
+        
+        history = []
+        notifications = []
+        # 批量UPDATE不触发保存信号，为原处理人记录墓碑（增量同步用）
+        tombstones = [
+            BugTombstone(bug_id=bug.id, assignee_id=bug.assignee_id)
+            for bug in bugs if bug.assignee_id is not None and bug.assignee_id != assignee.id
+        ]
+        for bug in bugs:
+            old_assignee = bug.assignee.username if bug.assignee else '未分配'
+            history.append(BugHistory(
+                bug=bug, operator=user, action='assign',
+                field_name='assignee',
+                old_value=old_assignee,
+                new_value=assignee.username,
+                description=f'将处理人从"{old_assignee}"改为"{assignee.username}"'
+            ))
+            if assignee != user:
+                notifications.append((
+                    assignee.id, 'bug_assigned', f'新BUG分配: {bug.title}',
+                    f'您被分配了一个新的BUG "#{bug.id} {bug.title}"，请及时处理',
+                    bug.id
+                ))
+            bug.assignee = assignee
+        
+        with transaction.atomic():
+            Bug.objects.filter(id__in=[bug.id for bug in bugs]).update(
+                assignee=assignee, updated_at=timezone.now()
+            )
+            BugHistory.objects.bulk_create(history)
+            BugTombstone.objects.bulk_create(tombstones)
+            bump_daily_stats(bugs, assigned=1)
+            queue_bug_notifications(notifications)
+        
+        return Response({'detail': '分配成功', 'count': len(bugs)})
+    
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        BUG操作历史（游标分页，按时间倒序）
+        详情接口只内嵌最近的记录，其余通过 history_next 游标从这里继续获取；
+        在线记录翻完后接着读取已归档的记录
+        """
+        bug = self.get_object()
+        paginator = KeysetPagination(page_size=20)
+        history = ChainedQuerySet([
+            bug.history.select_related('operator'),
+            bug.archived_history.select_related('operator'),
+        ], paginator.ordering)
+        page = paginator.paginate_queryset(history, request, view=self)
+        return paginator.get_paginated_response(BugHistorySerializer(page, many=True).data)
+    
     @action(detail=True, methods=['post'])
     def upload_attachment(self, request, pk=None):
         bug = self.get_object()
@@ -272,6 +636,7 @@ class BugViewSet(viewsets.ModelViewSet):
         
         attachment = BugAttachment.objects.create(bug=bug, file=file)
         serializer = BugAttachmentSerializer(attachment)
+        touch_bug(bug)
         
         record_history(
             bug, request.user, 'update',
@@ -290,6 +655,7 @@ class BugViewSet(viewsets.ModelViewSet):
             attachment = bug.attachments.get(id=attachment_id)
             file_name = attachment.file.name
             attachment.delete()
+            touch_bug(bug)
             
             record_history(
                 bug, request.user, 'update',
@@ -302,77 +668,183 @@ class BugViewSet(viewsets.ModelViewSet):
         except BugAttachment.DoesNotExist:
             return Response({'detail': '附件不存在'}, status=status.HTTP_404_NOT_FOUND)
     
+    @action(detail=False, methods=['post'])
+    def similar(self, request):
+        """
+        相似BUG检测：根据草稿的标题和描述返回最可能重复的BUG
+        只在当前用户可见的BUG范围内查找
+        """
+        serializer = SimilarBugQuerySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        matches = find_similar_bugs(
+            self.get_queryset(), data['title'], data['description'],
+            limit=data['limit'], exclude=data.get('exclude')
+        )
+        scores = {bug.id: score for bug, score in matches}
+        results = SimilarBugSerializer(
+            [bug for bug, _ in matches], many=True, context={'scores': scores}
+        ).data
+        return Response({'results': results})
+    
     @action(detail=False, methods=['get'])
-    def statistics(self, request):
-        from django.db.models import Count
-        from django.utils import timezone
-        from datetime import timedelta
+    def export(self, request):
+        """
+        按列表的数据权限和筛选条件导出BUG（流式下载）
+        file_type: csv（默认）/ ndjson / xlsx；不使用 format 参数，避免与DRF的格式后缀冲突
+        """
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORT_FORMATS:
+            return Response(
+                {'file_type': f'不支持的导出格式，可选: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_response(self.get_queryset(), file_type)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        增量同步：返回水位（since）之后新建/修改、删除或移出数据范围的BUG，以及路径变化的模块
+        数据范围与列表相同，不应用列表的筛选参数（客户端缓存全部数据后在本地筛选）；
+        BUG的输出字段同列表，支持 fields / omit。不传since时从头返回全部BUG，
+        has_more为true时用返回的next继续请求；水位过期（超过墓碑保留期限）返回410，客户端需重新全量同步
+        """
+        serializer_class = self.get_serializer_class()
+        fields = self.requested_fields()
+        if fields is None:
+            fields = list(serializer_class.Meta.fields)
+        # 新水位取自 updated_at、id
+        bugs = serializer_class.plan_queryset(
+            self.scope_queryset(Bug.objects.all()), fields + ['id', 'updated_at']
+        )
+        try:
+            result = collect_changes(
+                bugs, self.scope_queryset(BugTombstone.objects.all()), request.query_params.get('since')
+            )
+        except InvalidToken as e:
+            return Response({'since': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ExpiredToken as e:
+            return Response({'detail': str(e)}, status=status.HTTP_410_GONE)
         
+        return Response({
+            'changed': self.get_serializer(result['changed'], many=True).data,
+            'deleted': result['deleted'],
+            'modules': [{'id': module.id, 'path': module.path} for module in result['modules']],
+            'next': result['next'],
+            'has_more': result['has_more'],
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_bugs(self, request):
+        """
+        批量导入BUG（仅管理员）
+        上传CSV/NDJSON文件，start为跳过的记录数，用于从上次中断处（响应中的 processed）继续；
+        无效的记录跳过并在响应中列出。dry_run为true时只校验，不写入
+        """
+        user = request.user
+        if not (user.is_super_admin or user.is_admin):
+            return Response({'detail': '只有管理员可以导入BUG'}, status=status.HTTP_403_FORBIDDEN)
+        
+        file = request.FILES.get('file')
+        if not file:
+            return Response({'detail': '请选择文件'}, status=status.HTTP_400_BAD_REQUEST)
+        file_type = request.data.get('file_type') or (
+            'csv' if file.name.lower().endswith('.csv') else 'ndjson'
+        )
+        if file_type not in IMPORT_FORMATS:
+            return Response(
+                {'file_type': f'不支持的导入格式，可选: {", ".join(IMPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start = int(request.data.get('start') or 0)
+        except ValueError:
+            start = -1
+        if start < 0:
+            return Response({'start': '应为非负整数'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        importer = BugImporter(start=start, dry_run=dry_run)
+        try:
+            report = importer.run(read_records(file.file, file_type))
+        except ImportConflict as e:
+            return Response(
+                {'detail': str(e), **importer.report}, status=status.HTTP_409_CONFLICT
+            )
+        return Response(report)
+    
+    @action(detail=False, methods=['get'])
+    def kanban(self, request):
+        """
+        看板数据：按状态分列返回轻量卡片
+        
+        复用列表的数据权限和筛选条件；每列返回总数、首屏卡片和下一页游标，
+        传入 status 和 cursor 时只返回该列的下一页，用于列内懒加载；游标只属于一列，不带 status 时返回400
+        """
+        queryset = self.get_queryset()
+        status_param = request.query_params.get('status')
+        if request.query_params.get('cursor') and not status_param:
+            return Response({'cursor': '翻页时需要指定 status'}, status=status.HTTP_400_BAD_REQUEST)
+        statuses = [
+            (code, label) for code, label in Bug.STATUS_CHOICES
+            if not status_param or code == status_param
+        ]
+        
+        counts = dict(
+            queryset.order_by().values_list('status').annotate(count=Count('id'))
+        )
+        cards = BugKanbanCardSerializer.plan_queryset(queryset)
+        
+        columns = []
+        for code, label in statuses:
+            paginator = KeysetPagination(page_size=20)
+            page = paginator.paginate_queryset(cards.filter(status=code), request, view=self)
+            columns.append({
+                'status': code,
+                'status_display': label,
+                'count': counts.get(code, 0),
+                'results': BugKanbanCardSerializer(page, many=True).data,
+                'next': paginator.get_next_cursor(),
+            })
+        
+        return Response({'columns': columns})
+    
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
         user = request.user
         
+        # BUG表和每日汇总表的创建人/处理人字段同名，共用同一数据权限条件
         if user.is_super_admin or user.is_admin:
-            queryset = Bug.objects.all()
+            scope = Q()
         elif user.is_tester:
-            queryset = Bug.objects.filter(Q(creator=user) | Q(assignee=user))
+            scope = Q(creator=user) | Q(assignee=user)
         elif user.is_developer:
-            queryset = Bug.objects.filter(assignee=user)
+            scope = Q(assignee=user)
         else:
+            scope = None
+        
+        if scope is None:
             queryset = Bug.objects.none()
+            stats_queryset = BugDailyStats.objects.none()
+        else:
+            queryset = Bug.objects.filter(scope)
+            stats_queryset = BugDailyStats.objects.filter(scope)
         
-        total = queryset.count()
-        
-        status_data = {
-            'pending': queryset.filter(status='pending').count(),
-            'processing': queryset.filter(status='processing').count(),
-            'resolved': queryset.filter(status='resolved').count(),
-            'rejected': queryset.filter(status='rejected').count(),
-            'closed': queryset.filter(status='closed').count(),
-        }
-        
-        severity_data = {
-            'critical': queryset.filter(severity='critical').count(),
-            'major': queryset.filter(severity='major').count(),
-            'minor': queryset.filter(severity='minor').count(),
-            'trivial': queryset.filter(severity='trivial').count(),
-        }
-        
-        priority_data = {
-            'urgent': queryset.filter(priority='urgent').count(),
-            'high': queryset.filter(priority='high').count(),
-            'medium': queryset.filter(priority='medium').count(),
-            'low': queryset.filter(priority='low').count(),
-        }
-        
-        today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        
-        trend_data = []
-        for i in range(30):
-            date = thirty_days_ago + timedelta(days=i)
-            created = queryset.filter(created_at__date=date).count()
-            resolved = queryset.filter(
-                status='resolved',
-                updated_at__date=date
-            ).count()
-            trend_data.append({
-                'date': date.strftime('%m-%d'),
-                'created': created,
-                'resolved': resolved
-            })
+        # 总数及状态/严重程度/优先级分布：一次条件聚合查询
+        data = compute_breakdown(queryset)
+        # 近30天趋势：读取每日汇总表
+        data['trend'] = compute_trend(stats_queryset)
         
         module_stats = queryset.filter(
             module__isnull=False
         ).values(
-            'module__name',
-            'module__product__name',
-            'module__product__project__name'
+            'module__path'
         ).annotate(count=Count('id')).order_by('-count')[:10]
         
-        module_data = [
-            {
-                'name': f"{item['module__product__project__name']}/{item['module__product__name']}/{item['module__name']}",
-                'count': item['count']
-            }
+        # 保持原有的“项目/产品/模块”格式（模块路径字段以 PATH_SEPARATOR 分隔）
+        data['module'] = [
+            {'name': item['module__path'].replace(PATH_SEPARATOR, '/'), 'count': item['count']}
             for item in module_stats
         ]
         
@@ -383,17 +855,9 @@ class BugViewSet(viewsets.ModelViewSet):
             'assignee__username'
         ).annotate(count=Count('id')).order_by('-count')[:10]
         
-        developer_data = [
+        data['developer'] = [
             {'name': item['assignee__username'], 'count': item['count']}
             for item in developer_stats
         ]
         
-        return Response({
-            'total': total,
-            'status': status_data,
-            'severity': severity_data,
-            'priority': priority_data,
-            'trend': trend_data,
-            'module': module_data,
-            'developer': developer_data
-        })
+        return Response(data)
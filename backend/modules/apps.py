@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ModulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'modules'
+
+    def ready(self):
+        # 注册信号处理（模块路径同步）
+        from . import signals  # noqa: F401
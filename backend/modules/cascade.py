@@ -0,0 +1,98 @@
+"""
+模块管理 - 级联数据缓存
+BUG表单的项目-产品-模块级联选择器数据：
+- 三次平铺查询（项目、产品、模块各一次）后在内存中组装成树
+- 版本号由数据库计算：三张表各自的行数和最晚更新时间（保存改变更新时间，删除改变行数），
+  各进程看到的版本号一致，修改提交后立即生效，不依赖共享的缓存后端
+- 树按版本号缓存在进程内和Django缓存中，版本号未变化时不重新查询
+- 版本号同时作为ETag，树未变化时接口直接返回304
+- 需要BUG数量时，在缓存的树上附加节点汇总（实时读取，不进入缓存）
+"""
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from bugs.rollups import empty_summary, node_counts
+from .models import Project, Product, Module
+
+TREE_KEY = 'modules:cascade:tree:{version}'
+# 缓存中的树按版本号区分，旧版本自然过期即可
+TREE_TIMEOUT = 24 * 60 * 60
+
+_local = {'version': None, 'tree': None}
+_local_lock = threading.Lock()
+
+
+def get_tree_version():
+    """当前树的版本号：项目、产品、模块表各自的行数和最晚更新时间的摘要（每张表一次聚合查询）"""
+    parts = []
+    for model in (Project, Product, Module):
+        stats = model.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        latest = stats['latest'].isoformat() if stats['latest'] else ''
+        parts.append(f"{stats['count']}:{latest}")
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def build_cascade_tree():
+    """
+    构建级联树，只包含启用的节点（父节点停用时其下的节点也不显示）
+    返回格式：[{value, label, children: [{value, label, children: [{value, label}]}]}]
+    """
+    projects = [
+        {'value': project_id, 'label': name, 'children': []}
+        for project_id, name in Project.objects.filter(is_active=True).values_list('id', 'name')
+    ]
+    project_nodes = {node['value']: node for node in projects}
+
+    product_nodes = {}
+    products = Product.objects.filter(is_active=True).values_list('id', 'project_id', 'name')
+    for product_id, project_id, name in products:
+        parent = project_nodes.get(project_id)
+        if parent is not None:
+            node = {'value': product_id, 'label': name, 'children': []}
+            parent['children'].append(node)
+            product_nodes[product_id] = node
+
+    modules = Module.objects.filter(is_active=True).values_list('id', 'product_id', 'name')
+    for module_id, product_id, name in modules:
+        parent = product_nodes.get(product_id)
+        if parent is not None:
+            parent['children'].append({'value': module_id, 'label': name})
+    return projects
+
+
+def get_cascade_tree():
+    """返回 (版本号, 级联树)；依次查找进程内缓存、Django缓存，都未命中时重新构建"""
+    version = get_tree_version()
+    with _local_lock:
+        if _local['version'] == version:
+            return version, _local['tree']
+
+    key = TREE_KEY.format(version=version)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_cascade_tree()
+        cache.set(key, tree, TREE_TIMEOUT)
+
+    with _local_lock:
+        _local['version'], _local['tree'] = version, tree
+    return version, tree
+
+
+def with_bug_counts(tree):
+    """返回附加了各节点BUG数量汇总（bug_counts）的级联树副本，汇总数据一次查询读取"""
+    counts = node_counts()
+    levels = ('project', 'product', 'module')
+
+    def attach(nodes, depth):
+        result = []
+        for node in nodes:
+            node = dict(node, bug_counts=counts.get((levels[depth], node['value'])) or empty_summary())
+            if 'children' in node:
+                node['children'] = attach(node['children'], depth + 1)
+            result.append(node)
+        return result
+
+    return attach(tree, 0)
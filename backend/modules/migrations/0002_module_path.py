@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SEPARATOR = ' / '
+
+
+def backfill_paths(apps, schema_editor):
+    """为已有模块填充所属项目和完整路径"""
+    Module = apps.get_model('modules', 'Module')
+    modules = list(Module.objects.select_related('product__project'))
+    for module in modules:
+        module.project_id = module.product.project_id
+        module.path = SEPARATOR.join([module.product.project.name, module.product.name, module.name])
+    Module.objects.bulk_update(modules, ['project', 'path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='project',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='modules.project', verbose_name='所属项目'),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=320, verbose_name='完整路径'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='module',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='modules.project', verbose_name='所属项目'),
+        ),
+    ]
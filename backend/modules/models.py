@@ -19,6 +19,9 @@ Project (项目)
 """
 from django.db import models
 
+# 模块完整路径中各级名称的分隔符
+PATH_SEPARATOR = ' / '
+
 
 class Project(models.Model):
     """
@@ -99,8 +102,17 @@ class Module(models.Model):
         related_name='modules',    # 反向查询：product.modules.all()
         verbose_name='所属产品'
     )
+    # 所属项目（冗余自产品，由信号同步，避免展示路径时关联查询）
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='所属项目'
+    )
     # 模块名称
     name = models.CharField('模块名称', max_length=100)
+    # 完整路径“项目 / 产品 / 模块”（冗余字段，项目或产品改名、模块移动时由信号同步）
+    path = models.CharField('完整路径', max_length=320, blank=True, default='', editable=False)
     # 模块描述（可选）
     description = models.TextField('描述', blank=True, default='')
     # 是否启用
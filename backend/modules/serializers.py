@@ -1,13 +1,31 @@
 """
 模块管理 - 序列化器
 定义项目-产品-模块层级数据的序列化规则
-包括基础序列化器和级联选择器专用序列化器
+级联选择器的数据由 cascade.py 直接组装，不经过序列化器
 """
 from rest_framework import serializers
 from .models import Project, Product, Module
 
 
-class ModuleSerializer(serializers.ModelSerializer):
+class BugCountsMixin(serializers.Serializer):
+    """
+    节点的BUG数量汇总字段
+    
+    汇总数据由视图批量读取后放入 context['bug_counts']，未提供时（如新建、嵌套）为null
+    格式：{ total, open, status: {状态: 数量}, severity: {严重程度: 数量} }
+    """
+    bug_counts = serializers.SerializerMethodField()
+    # 节点层级：project/product/module
+    count_level = None
+    
+    def get_bug_counts(self, obj):
+        counts = self.context.get('bug_counts')
+        if counts is None:
+            return None
+        return counts.get((self.count_level, obj.id))
+
+
+class ModuleSerializer(BugCountsMixin, serializers.ModelSerializer):
     """
     模块序列化器
     
@@ -18,11 +36,13 @@ class ModuleSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Module
-        fields = ['id', 'product', 'product_name', 'name', 'description', 'is_active', 'created_at']
+        fields = ['id', 'product', 'product_name', 'name', 'path', 'description', 'is_active', 'bug_counts', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    count_level = 'module'
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(BugCountsMixin, serializers.ModelSerializer):
     """
     产品序列化器
     
@@ -35,8 +55,10 @@ class ProductSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Product
-        fields = ['id', 'project', 'project_name', 'name', 'description', 'is_active', 'modules', 'created_at']
+        fields = ['id', 'project', 'project_name', 'name', 'description', 'is_active', 'modules', 'bug_counts', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    count_level = 'product'
 
 
 class ProductSimpleSerializer(serializers.ModelSerializer):
@@ -51,7 +73,7 @@ class ProductSimpleSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'is_active']
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(BugCountsMixin, serializers.ModelSerializer):
     """
     项目序列化器
     
@@ -62,8 +84,10 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'is_active', 'products', 'created_at']
+        fields = ['id', 'name', 'description', 'is_active', 'products', 'bug_counts', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    count_level = 'project'
 
 
 class ProjectSimpleSerializer(serializers.ModelSerializer):
@@ -76,93 +100,3 @@ class ProjectSimpleSerializer(serializers.ModelSerializer):
         model = Project
         fields = ['id', 'name', 'is_active']
 
-
-# ============ 级联选择器专用序列化器 ============
-# 以下序列化器用于前端级联选择器（el-cascader）组件
-# 输出格式：{ value: id, label: name, children: [...] }
-
-
-class ModuleCascadeSerializer(serializers.ModelSerializer):
-    """
-    模块级联序列化器
-    
-    用于BUG提报时的级联选择器，最底层节点
-    输出格式：{ value: 模块ID, label: 模块名称 }
-    """
-    # Element Plus级联选择器需要的字段名
-    label = serializers.CharField(source='name')  # 显示文本
-    value = serializers.IntegerField(source='id')  # 选中值
-    
-    class Meta:
-        model = Module
-        fields = ['value', 'label']
-
-
-class ProductCascadeSerializer(serializers.ModelSerializer):
-    """
-    产品级联序列化器
-    
-    用于级联选择器的中间层，包含模块子节点
-    输出格式：{ value: 产品ID, label: 产品名称, children: [模块...] }
-    """
-    # Element Plus级联选择器需要的字段名
-    label = serializers.CharField(source='name')  # 显示文本
-    value = serializers.IntegerField(source='id')  # 选中值
-    # 子节点（模块列表）
-    children = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Product
-        fields = ['value', 'label', 'children']
-    
-    def get_children(self, obj):
-        """
-        获取该产品下所有启用的模块
-        只返回is_active=True的模块
-        """
-        modules = obj.modules.filter(is_active=True)
-        return ModuleCascadeSerializer(modules, many=True).data
-
-
-class ProjectCascadeSerializer(serializers.ModelSerializer):
-    """
-    项目级联序列化器
-    
-    用于级联选择器的顶层，包含产品子节点
-    输出格式：{ value: 项目ID, label: 项目名称, children: [产品...] }
-    
-    完整数据结构示例：
-    [
-        {
-            "value": 1,
-            "label": "电商平台",
-            "children": [
-                {
-                    "value": 1,
-                    "label": "用户中心",
-                    "children": [
-                        { "value": 1, "label": "用户注册" },
-                        { "value": 2, "label": "用户登录" }
-                    ]
-                }
-            ]
-        }
-    ]
-    """
-    # Element Plus级联选择器需要的字段名
-    label = serializers.CharField(source='name')  # 显示文本
-    value = serializers.IntegerField(source='id')  # 选中值
-    # 子节点（产品列表）
-    children = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Project
-        fields = ['value', 'label', 'children']
-    
-    def get_children(self, obj):
-        """
-        获取该项目下所有启用的产品
-        只返回is_active=True的产品
-        """
-        products = obj.products.filter(is_active=True)
-        return ProductCascadeSerializer(products, many=True).data
@@ -0,0 +1,72 @@
+"""
+模块管理 - 信号处理
+- 维护模块上冗余的所属项目和完整路径：模块保存前计算，项目改名、产品改名或移动后用一条UPDATE批量同步其下的模块，
+  同时刷新模块的更新时间（BUG列表/详情的ETag、增量同步依赖模块的updated_at）；名称和所属项目都未变化时不同步
+"""
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import PATH_SEPARATOR, Project, Product, Module
+
+
+@receiver(pre_save, sender=Module)
+def set_module_path(sender, instance, **kwargs):
+    product = Product.objects.select_related('project').get(pk=instance.product_id)
+    instance.project_id = product.project_id
+    instance.path = PATH_SEPARATOR.join([product.project.name, product.name, instance.name])
+
+
+# 影响其下模块路径的字段
+PATH_FIELDS = {Project: ('name',), Product: ('name', 'project_id')}
+
+
+def _path_state(instance):
+    """实例上影响模块路径的字段值；有字段被延迟加载时返回None（视为已变化）"""
+    fields = PATH_FIELDS[type(instance)]
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return tuple(instance.__dict__[field] for field in fields)
+
+
+@receiver(post_init, sender=Project)
+@receiver(post_init, sender=Product)
+def remember_path_state(sender, instance, **kwargs):
+    instance._synced_path_state = _path_state(instance)
+
+
+def _path_changed(instance, created):
+    """保存后判断路径相关字段是否变化，并更新快照"""
+    old_state = instance._synced_path_state
+    instance._synced_path_state = _path_state(instance)
+    return not created and (old_state is None or old_state != instance._synced_path_state)
+
+
+@receiver(post_save, sender=Product)
+def sync_product_modules(sender, instance, created, **kwargs):
+    """产品改名或移动到其他项目后，同步其下所有模块"""
+    if not _path_changed(instance, created):
+        return
+    prefix = PATH_SEPARATOR.join([instance.project.name, instance.name, ''])
+    Module.objects.filter(product=instance).update(
+        project_id=instance.project_id,
+        path=Concat(Value(prefix), F('name')),
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Project)
+def sync_project_modules(sender, instance, created, **kwargs):
+    """项目改名后，同步其下所有模块的路径（产品名通过子查询取得）"""
+    if not _path_changed(instance, created):
+        return
+    product_name = Product.objects.filter(pk=OuterRef('product_id')).values('name')[:1]
+    Module.objects.filter(project=instance).update(
+        path=Concat(
+            Value(instance.name + PATH_SEPARATOR), Subquery(product_name),
+            Value(PATH_SEPARATOR), F('name')
+        ),
+        updated_at=timezone.now()
+    )
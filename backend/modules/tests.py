@@ -1,3 +1,125 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import cascade
+from .models import Project, Product, Module
+
+
+class ModulePathSyncTests(TestCase):
+    """项目/产品保存后同步其下模块的路径：只有名称或所属项目变化时才更新"""
+
+    def setUp(self):
+        self.project = Project.objects.create(name='电商平台')
+        self.product = Product.objects.create(project=self.project, name='用户中心')
+        self.module = Module.objects.create(product=self.product, name='用户登录')
+
+    def module_state(self):
+        return Module.objects.values_list('path', 'project_id', 'updated_at').get(pk=self.module.pk)
+
+    def test_unchanged_save_keeps_modules(self):
+        before = self.module_state()
+        self.product.description = '只改了描述'
+        self.product.save()
+        Product.objects.get(pk=self.product.pk).save()
+        self.project.save()
+        self.assertEqual(self.module_state(), before)
+
+    def test_product_rename_and_move(self):
+        self.product.name = '会员中心'
+        self.product.save()
+        self.assertEqual(self.module_state()[0], '电商平台 / 会员中心 / 用户登录')
+
+        other = Project.objects.create(name='运营平台')
+        product = Product.objects.get(pk=self.product.pk)
+        product.project = other
+        product.save()
+        path, project_id, _ = self.module_state()
+        self.assertEqual((path, project_id), ('运营平台 / 会员中心 / 用户登录', other.id))
+
+    def test_project_rename(self):
+        before = self.module_state()
+        self.project.name = '商城'
+        self.project.save()
+        path, _, updated_at = self.module_state()
+        self.assertEqual(path, '商城 / 用户中心 / 用户登录')
+        self.assertGreater(updated_at, before[2])
+
+    def test_deferred_fields_still_sync(self):
+        product = Product.objects.only('id', 'project_id').get(pk=self.product.pk)
+        Product.objects.filter(pk=product.pk).update(name='会员中心')
+        product.save()
+        self.assertEqual(self.module_state()[0], '电商平台 / 会员中心 / 用户登录')
+
+
+class CascadeTreeTests(APITestCase):
+    """级联树：按数据库版本号缓存、修改后失效、ETag协商"""
+
+    def setUp(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('t_tester', password='x', role='tester')
+        )
+        self.project = Project.objects.create(name='电商平台')
+        self.product = Product.objects.create(project=self.project, name='用户中心')
+        self.module = Module.objects.create(product=self.product, name='用户登录')
+        Module.objects.create(product=self.product, name='已停用', is_active=False)
+        # 用例之间不共享缓存的树
+        patcher = mock.patch.dict(cascade._local, {'version': None, 'tree': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    def get(self, **headers):
+        return self.client.get('/api/modules/cascade/', **headers)
+
+    def test_tree_is_cached_by_version(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'value': self.project.id, 'label': '电商平台', 'children': [{
+                'value': self.product.id, 'label': '用户中心', 'children': [
+                    {'value': self.module.id, 'label': '用户登录'},
+                ],
+            }],
+        }])
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.get()
+        self.assertEqual(again.data, response.data)
+        # 只有计算版本号的三次聚合查询（另有认证无需查询）
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_changes_invalidate_without_signals(self):
+        etag = self.get()['ETag']
+        # 模拟其他进程的修改：不经过本进程的缓存，直接写数据库
+        Module.objects.filter(pk=self.module.pk).update(name='扫码登录', updated_at=timezone.now())
+        response = self.get()
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data[0]['children'][0]['children'][0]['label'], '扫码登录')
+
+        etag = response['ETag']
+        Module.objects.filter(is_active=False).delete()
+        self.assertNotEqual(self.get()['ETag'], etag)
+
+    def test_if_none_match(self):
+        etag = self.get()['ETag']
+        for header in (etag, f'"other", {etag}', f'W/{etag}', '*'):
+            response = self.get(HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+        for header in ('"other"', etag.strip('"'), f'"other-{etag[1:]}'):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=header).status_code, 200, header)
 
-# Create your tests here.
+    def test_with_counts_skips_etag(self):
+        response = self.get()
+        counted = self.client.get(
+            '/api/modules/cascade/', {'with_counts': 1}, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(counted.status_code, 200)
+        self.assertNotIn('ETag', counted)
+        self.assertEqual(counted.data[0]['bug_counts']['total'], 0)
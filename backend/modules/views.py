@@ -2,16 +2,17 @@
 模块管理 - 视图层
 处理项目-产品-模块三级层级结构的CRUD操作和级联数据获取
 """
+from django.utils.cache import get_conditional_response
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from bugs.rollups import node_counts
+
+from .cascade import get_cascade_tree, with_bug_counts
 from .models import Project, Product, Module
-from .serializers import (
-    ProjectSerializer, ProductSerializer, ModuleSerializer,
-    ProjectCascadeSerializer
-)
+from .serializers import ProjectSerializer, ProductSerializer, ModuleSerializer
 
 
 class IsSuperAdmin(permissions.BasePermission):
@@ -25,7 +26,22 @@ class IsSuperAdmin(permissions.BasePermission):
         return request.user.is_authenticated and request.user.role == 'super_admin'
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class BugCountsContextMixin:
+    """
+    列表/详情响应中附加各节点的BUG数量汇总（bug_counts）
+    一页数据的汇总通过一次查询读取，放入序列化器的context
+    """
+    
+    def get_serializer(self, *args, **kwargs):
+        if args and self.action in ('list', 'retrieve'):
+            instances = args[0] if kwargs.get('many') else [args[0]]
+            level = self.get_serializer_class().count_level
+            kwargs['context'] = self.get_serializer_context()
+            kwargs['context']['bug_counts'] = node_counts(level, [obj.id for obj in instances])
+        return super().get_serializer(*args, **kwargs)
+
+
+class ProjectViewSet(BugCountsContextMixin, viewsets.ModelViewSet):
     """
     项目管理视图集
     
@@ -57,7 +73,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(BugCountsContextMixin, viewsets.ModelViewSet):
     """
     产品管理视图集
     
@@ -98,7 +114,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class ModuleViewSet(viewsets.ModelViewSet):
+class ModuleViewSet(BugCountsContextMixin, viewsets.ModelViewSet):
     """
     功能模块管理视图集
     
@@ -167,16 +183,26 @@ class ModuleCascadeView(APIView):
         }
     ]
     
+    查询参数：
+    - with_counts: 传入时每个节点附加 bug_counts（BUG数量汇总）
+    
     注意：
     - 只返回启用状态(is_active=True)的数据
-    - 使用prefetch_related优化查询性能
+    - 级联树按版本号缓存（见 cascade.py），版本号作为ETag，
+      客户端携带 If-None-Match 且树未变化时返回304
     """
     
     def get(self, request):
-        # 查询所有启用的项目，并预加载产品和模块
-        projects = Project.objects.filter(is_active=True).prefetch_related(
-            'products__modules'
-        )
-        # 使用级联序列化器构建层级结构
-        serializer = ProjectCascadeSerializer(projects, many=True)
-        return Response(serializer.data)
+        version, tree = get_cascade_tree()
+        if request.query_params.get('with_counts'):
+            # BUG数量实时变化，不参与ETag协商
+            return Response(with_bug_counts(tree))
+        etag = f'"cascade-{version}"'
+        # 按标准解析 If-None-Match（多个ETag、弱校验 W/、*）
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(tree)
+        response['ETag'] = etag
+        # 允许浏览器缓存，但每次使用前向服务端确认
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,90 @@
+"""
+消息通知 - 投递渠道
+通知写入数据库后，由通知队列的工作线程依次交给各渠道投递，渠道的耗时不影响业务请求
+自定义渠道继承 BaseChannel 并实现 deliver，通过 NOTIFICATION_CHANNELS 配置启用的渠道类路径，例如：
+    NOTIFICATION_CHANNELS = [
+        'notifications.channels.StreamChannel',
+        'myapp.channels.EmailChannel',
+    ]
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .counters import unread_count
+from .models import Notification
+from .serializers import NotificationSerializer
+from .stream import get_broker
+
+DEFAULT_CHANNELS = ['notifications.channels.StreamChannel']
+
+
+class BaseChannel:
+    """投递渠道基类"""
+
+    def deliver(self, notifications):
+        """投递一批已保存的通知（可能属于多个用户）"""
+        raise NotImplementedError
+
+
+class StreamChannel(BaseChannel):
+    """向在线用户的SSE连接推送新通知及最新未读数量，没有在线连接的用户直接跳过"""
+
+    def deliver(self, notifications):
+        broker = get_broker()
+        online = [
+            notification for notification in notifications
+            if broker.has_subscribers(notification.user_id)
+        ]
+        if online and online[0].pk is None:
+            online = self.read_back(online)
+
+        by_user = defaultdict(list)
+        for notification in online:
+            by_user[notification.user_id].append(notification)
+
+        for user_id, items in by_user.items():
+            count = unread_count(user_id)
+            for notification in items:
+                broker.publish(user_id, 'notification', {
+                    'notification': NotificationSerializer(notification).data,
+                    'unread_count': count,
+                })
+
+    @staticmethod
+    def read_back(notifications):
+        """
+        数据库不支持批量插入后返回主键时（SQLite、MySQL），读回本批通知的数据库记录（一次查询）
+        created_at由bulk_create在本进程中逐条赋值，连同用户、类型、标题、内容、BUG一起逐条匹配，
+        不会取到其他写入方同时为这些用户创建的通知
+        """
+        def key(notification):
+            return (
+                notification.user_id, notification.created_at, notification.type,
+                notification.title, notification.content, notification.bug_id,
+            )
+
+        wanted = Counter(key(notification) for notification in notifications)
+        rows = Notification.objects.filter(
+            user_id__in={notification.user_id for notification in notifications},
+            created_at__in={notification.created_at for notification in notifications},
+        ).order_by('id')
+        saved = []
+        for row in rows:
+            if wanted[key(row)] > 0:
+                wanted[key(row)] -= 1
+                saved.append(row)
+        return saved
+
+
+_channels = None
+
+
+def get_channels():
+    """返回启用的投递渠道实例列表（进程内单例）"""
+    global _channels
+    if _channels is None:
+        paths = getattr(settings, 'NOTIFICATION_CHANNELS', DEFAULT_CHANNELS)
+        _channels = [import_string(path)() for path in paths]
+    return _channels
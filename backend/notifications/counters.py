@@ -0,0 +1,71 @@
+"""
+消息通知 - 未读计数
+维护 NotificationCounter 中每个用户的未读数量：
+- 创建通知、标记已读时用 F() 表达式原子增减，不读取再写回
+- 全量校正：按通知表重新统计并覆盖计数
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter
+
+
+def unread_count(user_id):
+    """按主键读取用户的未读数量"""
+    count = NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+    return count or 0
+
+
+def adjust_unread(user_ids, delta=1):
+    """
+    增减未读计数，user_ids中每出现一次计一次，相同用户合并为一次UPDATE
+    例：adjust_unread([user_id], -1) 标记一条已读
+    """
+    for user_id, n in Counter(user_ids).items():
+        change = delta * n
+        if not change:
+            continue
+        # 计数不会小于0（计数偏差时避免出现负数）
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            unread=Greatest(F('unread') + change, Value(0))
+        )
+        if updated or change < 0:
+            continue
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(user_id=user_id, unread=change)
+        except IntegrityError:
+            # 并发请求已创建该行，退回到UPDATE
+            NotificationCounter.objects.filter(user_id=user_id).update(unread=F('unread') + change)
+
+
+def reconcile_unread_counters():
+    """
+    按通知表重新统计所有用户的未读数量，返回被修正的用户数
+    先锁定计数行再统计，避免覆盖统计期间发生的增减
+    """
+    with transaction.atomic():
+        stored = dict(
+            NotificationCounter.objects.select_for_update().values_list('user_id', 'unread')
+        )
+        actual = dict(
+            Notification.objects.filter(is_read=False).order_by().values('user_id').annotate(
+                count=Count('id')
+            ).values_list('user_id', 'count')
+        )
+        stale = [
+            NotificationCounter(user_id=user_id, unread=actual.get(user_id, 0))
+            for user_id, unread in stored.items()
+            if unread != actual.get(user_id, 0)
+        ]
+        missing = [
+            NotificationCounter(user_id=user_id, unread=count)
+            for user_id, count in actual.items()
+            if user_id not in stored
+        ]
+        NotificationCounter.objects.bulk_update(stale, ['unread'], batch_size=1000)
+        NotificationCounter.objects.bulk_create(missing, batch_size=1000)
+    return len(stale) + len(missing)
@@ -0,0 +1,35 @@
+"""
+归档已读通知
+
+用法：python manage.py archive_notifications [--days 90] [--batch-size 1000]
+将早于保留天数的已读通知分批移入归档表 notifications_archive，未读通知不受影响，建议每天定时执行；
+保留天数默认取配置 NOTIFICATION_RETENTION_DAYS（90天）
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.archive import archive_in_batches
+from notifications.models import Notification, NotificationArchive
+
+
+class Command(BaseCommand):
+    help = '将超过保留期限的已读通知移入归档表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90),
+            help='在线保留的天数'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批移动的行数')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        count = archive_in_batches(
+            Notification.objects.filter(is_read=True, created_at__lt=cutoff),
+            NotificationArchive,
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'已归档 {count} 条通知'))
@@ -0,0 +1,17 @@
+"""
+校正未读通知计数
+
+用法：python manage.py reconcile_unread_counters
+适用于直接修改通知表等导致计数与实际未读数量出现偏差时
+"""
+from django.core.management.base import BaseCommand
+
+from notifications.counters import reconcile_unread_counters
+
+
+class Command(BaseCommand):
+    help = '按通知表重新统计并校正每个用户的未读通知计数'
+
+    def handle(self, *args, **options):
+        count = reconcile_unread_counters()
+        self.stdout.write(self.style.SUCCESS(f'未读通知计数已校正，修正 {count} 个用户'))
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.22 on 2026-10-17 20:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_counters(apps, schema_editor):
+    """按现有通知统计每个用户的未读数量"""
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationCounter = apps.get_model('notifications', 'NotificationCounter')
+    rows = Notification.objects.filter(is_read=False).order_by().values('user_id').annotate(
+        count=models.Count('id')
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row['user_id'], unread=row['count']) for row in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_create_default_admin'),
+        ('notifications', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='users.user', verbose_name='用户')),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='未读数量')),
+            ],
+            options={
+                'verbose_name': '未读通知计数',
+                'verbose_name_plural': '未读通知计数',
+                'db_table': 'notification_counters',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.22 on 2026-10-17 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0003_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='原通知ID')),
+                ('type', models.CharField(choices=[('bug_assigned', 'BUG分配'), ('bug_status', '状态变更'), ('bug_comment', '评论回复'), ('system', '系统通知')], max_length=20, verbose_name='通知类型')),
+                ('title', models.CharField(max_length=200, verbose_name='通知标题')),
+                ('content', models.TextField(verbose_name='通知内容')),
+                ('bug_id', models.IntegerField(blank=True, null=True, verbose_name='关联BUG ID')),
+                ('is_read', models.BooleanField(default=True, verbose_name='是否已读')),
+                ('created_at', models.DateTimeField(verbose_name='创建时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='接收用户')),
+            ],
+            options={
+                'verbose_name': '消息通知归档',
+                'verbose_name_plural': '消息通知归档',
+                'db_table': 'notifications_archive',
+            },
+        ),
+    ]
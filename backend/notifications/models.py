@@ -38,6 +38,69 @@ class Notification(models.Model):
         verbose_name = '消息通知'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            # 个人通知列表：WHERE user=? ORDER BY created_at DESC
+            models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+            # 未读数量统计及个人通知列表：WHERE user=? AND is_read=? ORDER BY created_at DESC
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user.username} - {self.title}'
+
+
+class NotificationArchive(models.Model):
+    """
+    消息通知归档
+
+    超过保留期限的已读通知由 archive_notifications 命令从 notifications 移入此表，保留原id，
+    仅用于留档，不再出现在通知列表中
+    """
+    
+    id = models.BigIntegerField('原通知ID', primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='接收用户'
+    )
+    type = models.CharField('通知类型', max_length=20, choices=Notification.TYPE_CHOICES)
+    title = models.CharField('通知标题', max_length=200)
+    content = models.TextField('通知内容')
+    bug_id = models.IntegerField('关联BUG ID', null=True, blank=True)
+    is_read = models.BooleanField('是否已读', default=True)
+    created_at = models.DateTimeField('创建时间')
+    
+    class Meta:
+        db_table = 'notifications_archive'
+        verbose_name = '消息通知归档'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f'{self.user_id} - {self.title}'
+
+
+class NotificationCounter(models.Model):
+    """
+    未读通知计数
+
+    每个用户一行，随通知创建、标记已读同步增减，未读数量查询只需按主键读取一行；
+    计数出现偏差时可执行 reconcile_unread_counters 命令校正
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='用户'
+    )
+    unread = models.PositiveIntegerField('未读数量', default=0)
+
+    class Meta:
+        db_table = 'notification_counters'
+        verbose_name = '未读通知计数'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f'{self.user_id} - {self.unread}'
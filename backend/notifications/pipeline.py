@@ -0,0 +1,150 @@
+"""
+消息通知 - 异步发送队列
+业务请求只把通知放入进程内队列（事务提交后），由后台工作线程批量写入：
+- 队列中积压的通知合并为一次 bulk_create，未读计数按用户合并为一次UPDATE
+- 写入后交给各投递渠道（见 channels.py），渠道耗时不影响业务请求
+- 进程退出时先处理完队列中剩余的通知
+
+配置 NOTIFICATION_PIPELINE_EAGER = True 时在当前线程同步处理，便于测试和调试
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .channels import get_channels
+from .counters import adjust_unread
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# 每批最多写入的通知数
+BATCH_SIZE = 500
+
+_STOP = object()
+
+
+class NotificationPipeline:
+    """
+    通知发送队列
+
+    - submit: 放入待发送的通知（Notification实例，尚未保存）
+    - process: 写入一批通知并投递，工作线程和同步模式共用
+    - shutdown: 停止工作线程，处理完剩余通知后返回
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, eager=False):
+        self.batch_size = batch_size
+        self.eager = eager
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, notifications):
+        if self.eager:
+            self.process(notifications)
+            return
+        self._ensure_worker()
+        for notification in notifications:
+            self.queue.put(notification)
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name='notification-pipeline', daemon=True
+                )
+                self.thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            batch = []
+            # 取出队列中已积压的通知，合并为一批
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.process(batch)
+
+    def process(self, notifications):
+        for start in range(0, len(notifications), self.batch_size):
+            batch = notifications[start:start + self.batch_size]
+            close_old_connections()
+            try:
+                with transaction.atomic():
+                    Notification.objects.bulk_create(batch)
+                    adjust_unread([notification.user_id for notification in batch])
+            except Exception:
+                logger.exception('写入 %d 条通知失败', len(batch))
+                continue
+            for channel in get_channels():
+                try:
+                    channel.deliver(batch)
+                except Exception:
+                    logger.exception('通知渠道 %s 投递失败', type(channel).__name__)
+            close_old_connections()
+
+    def shutdown(self, timeout=10):
+        with self.lock:
+            thread = self.thread
+        if thread is not None and thread.is_alive():
+            self.queue.put(_STOP)
+            thread.join(timeout)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """返回进程内的通知发送队列"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                pipeline = NotificationPipeline(
+                    eager=getattr(settings, 'NOTIFICATION_PIPELINE_EAGER', False)
+                )
+                atexit.register(pipeline.shutdown)
+                _pipeline = pipeline
+    return _pipeline
+
+
+def send_notifications(users, notification_type, title, content, bug_id=None):
+    """
+    向多个用户发送同一条通知
+    在事务中调用时，事务提交后才放入队列，回滚的操作不会产生通知
+    """
+    notifications = [
+        Notification(
+            user_id=getattr(user, 'pk', user),
+            type=notification_type,
+            title=title,
+            content=content,
+            bug_id=bug_id
+        )
+        for user in users
+    ]
+    queue_notifications(notifications)
+
+
+def queue_notifications(notifications):
+    """
+    发送一组内容各不相同的通知（未保存的Notification，如批量操作中每个BUG一条）
+    与send_notifications相同，在事务提交后才放入队列
+    """
+    if notifications:
+        transaction.on_commit(lambda: get_pipeline().submit(notifications))
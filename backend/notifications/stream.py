@@ -0,0 +1,204 @@
+"""
+消息通知 - 实时推送
+通过Server-Sent Events向浏览器推送新通知和未读数量，替代前端的定时轮询：
+- 推送接口是一个原生ASGI应用（由 backend/asgi.py 按路径分发），每个连接只占用一个协程，
+  单个工作进程即可维持大量空闲连接
+- 新通知（由通知队列的StreamChannel发布）、标记已读后的未读数量，经消息代理（broker）分发给该用户的所有连接
+- LocalBroker为进程内实现；多进程部署时可通过 NOTIFICATION_BROKER 配置跨进程的代理类
+"""
+import asyncio
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .counters import unread_count
+
+STREAM_PATH = '/api/notifications/stream/'
+# 心跳间隔（秒），防止代理服务器因连接空闲而断开
+HEARTBEAT_INTERVAL = 25
+# 断线后浏览器重连的等待时间（毫秒）
+RETRY_MS = 5000
+# 每个连接最多积压的事件数
+QUEUE_SIZE = 100
+
+
+def _offer(queue, item):
+    """队列已满（客户端消费过慢）时丢弃事件，客户端重连后会收到最新的未读数量"""
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        pass
+
+
+class LocalBroker:
+    """
+    进程内发布/订阅
+
+    订阅者是事件循环中的asyncio.Queue；publish可以在任意线程调用（同步视图运行在线程池中），
+    事件通过call_soon_threadsafe投递到订阅者所在的事件循环
+    """
+
+    def __init__(self):
+        # user_id => {队列: 所属事件循环}
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """在事件循环中调用，返回接收该用户事件的队列"""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(user_id, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self.lock:
+            queues = self.subscribers.get(user_id)
+            if queues is not None:
+                queues.pop(queue, None)
+                if not queues:
+                    del self.subscribers[user_id]
+
+    def has_subscribers(self, user_id):
+        """用户是否有在线连接，没有时发布方可以省去组装事件的查询"""
+        return user_id in self.subscribers
+
+    def publish(self, user_id, event, data):
+        with self.lock:
+            targets = list(self.subscribers.get(user_id, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, (event, data))
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+
+_broker = None
+
+
+def get_broker():
+    """返回当前使用的消息代理（进程内单例），可通过 NOTIFICATION_BROKER 配置代理类的路径"""
+    global _broker
+    if _broker is None:
+        path = getattr(settings, 'NOTIFICATION_BROKER', None)
+        broker_class = import_string(path) if path else LocalBroker
+        _broker = broker_class()
+    return _broker
+
+
+def publish_unread_count(user_id):
+    """事务提交后推送最新未读数量（标记已读后同步用户的其他标签页）"""
+    def push():
+        broker = get_broker()
+        if broker.has_subscribers(user_id):
+            broker.publish(user_id, 'unread', {'count': unread_count(user_id)})
+    transaction.on_commit(push)
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode()
+
+
+def _authenticate(token):
+    """校验access token，返回用户id；令牌无效时返回None（只解码令牌，不查询数据库）"""
+    try:
+        return AccessToken(token)[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+def _initial_unread_count(user_id):
+    """用户存在且启用时返回未读数量，否则返回None"""
+    close_old_connections()
+    try:
+        if not get_user_model().objects.filter(id=user_id, is_active=True).exists():
+            return None
+        return unread_count(user_id)
+    finally:
+        close_old_connections()
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_json(send, status, data):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(data, ensure_ascii=False).encode()})
+
+
+async def notification_stream(scope, receive, send):
+    """
+    SSE推送接口：GET /api/notifications/stream/?token=<access_token>
+
+    EventSource无法设置请求头，令牌通过查询参数传递。事件：
+    - unread: 连接建立及标记已读后推送 {count}
+    - notification: 新通知 {notification, unread_count}
+    """
+    if scope['method'] != 'GET':
+        await _send_json(send, 405, {'detail': f'方法 “{scope["method"]}” 不被允许。'})
+        return
+
+    params = parse_qs(scope.get('query_string', b'').decode())
+    user_id = _authenticate(params.get('token', [''])[0])
+    if user_id is None:
+        await _send_json(send, 401, {'detail': '身份认证信息未提供或已失效'})
+        return
+
+    # 先订阅再读取未读数量，避免漏掉两者之间创建的通知
+    broker = get_broker()
+    queue = broker.subscribe(user_id)
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        count = await sync_to_async(_initial_unread_count)(user_id)
+        if count is None:
+            await _send_json(send, 401, {'detail': '用户不存在或已禁用'})
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # 关闭Nginx的响应缓冲
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {RETRY_MS}\n\n'.encode() + format_event('unread', {'count': count}),
+            'more_body': True,
+        })
+
+        while not disconnect.done():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnect}, timeout=HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter in done:
+                body = format_event(*getter.result())
+            else:
+                getter.cancel()
+                if disconnect.done():
+                    break
+                body = b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        broker.unsubscribe(user_id, queue)
+        disconnect.cancel()
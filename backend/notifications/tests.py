@@ -0,0 +1,327 @@
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import pipeline as notification_pipeline
+from . import stream
+from .counters import adjust_unread, reconcile_unread_counters, unread_count
+from .channels import StreamChannel
+from .models import Notification, NotificationArchive, NotificationCounter
+from .pipeline import NotificationPipeline, send_notifications
+from .stream import STREAM_PATH, LocalBroker, notification_stream
+
+User = get_user_model()
+
+
+class UnreadCounterMixin:
+    """两名接收通知的用户，以及计数与通知表一致性的断言"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('t_alice', password='x', role='tester')
+        self.bob = User.objects.create_user('t_bob', password='x', role='developer')
+
+    def assertCounter(self, user, expected):
+        """计数等于预期，且与按通知表重新统计的结果一致"""
+        actual = Notification.objects.filter(user=user, is_read=False).count()
+        self.assertEqual((unread_count(user.id), actual), (expected, expected))
+
+
+class EagerPipelineMixin:
+    """send_notifications 使用的流水线换成同步模式，通知在提交回调中由当前线程直接写入"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(notification_pipeline, '_pipeline', NotificationPipeline(eager=True))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class UnreadCounterTests(EagerPipelineMixin, UnreadCounterMixin, APITestCase):
+    """未读计数随发送、标记已读、标记全部已读、归档同步增减"""
+
+    def notify(self, users, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                send_notifications(users, 'system', f'通知 {i}', '内容')
+
+    def post(self, user, path):
+        self.client.force_authenticate(user)
+        return self.client.post(path)
+
+    def mark_read(self, user, notification=None):
+        notification = notification or Notification.objects.filter(user=user).first()
+        return self.post(user, f'/api/notifications/{notification.id}/mark_read/')
+
+    def test_send_increments_per_user(self):
+        self.notify([self.alice, self.bob], 3)
+        self.notify([self.alice.id])
+        self.assertCounter(self.alice, 4)
+        self.assertCounter(self.bob, 3)
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(response.data, {'count': 4})
+
+    def test_rolled_back_transaction_sends_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    send_notifications([self.alice], 'system', '通知', '内容')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertCounter(self.alice, 0)
+        self.assertFalse(NotificationCounter.objects.filter(user=self.alice).exists())
+
+    def test_mark_read(self):
+        self.notify([self.alice, self.bob], 2)
+        notification = Notification.objects.filter(user=self.alice).first()
+        response = self.mark_read(self.alice, notification)
+        self.assertEqual(response.status_code, 200)
+        self.assertCounter(self.alice, 1)
+
+        # 重复标记不会重复扣减
+        self.mark_read(self.alice, notification)
+        self.assertCounter(self.alice, 1)
+
+        # 不能标记他人的通知
+        response = self.mark_read(self.bob, notification)
+        self.assertEqual(response.status_code, 404)
+        self.assertCounter(self.bob, 2)
+
+    def test_mark_all_read(self):
+        self.notify([self.alice, self.bob], 3)
+        self.mark_read(self.alice)
+
+        response = self.post(self.alice, '/api/notifications/mark_all_read/')
+        self.assertEqual(response.status_code, 200)
+        self.assertCounter(self.alice, 0)
+        self.assertCounter(self.bob, 3)
+
+        self.post(self.alice, '/api/notifications/mark_all_read/')
+        self.assertCounter(self.alice, 0)
+        self.notify([self.alice])
+        self.assertCounter(self.alice, 1)
+
+    def test_counter_is_never_negative(self):
+        adjust_unread([self.alice.id], -3)
+        self.assertFalse(NotificationCounter.objects.filter(user=self.alice).exists())
+        self.notify([self.alice])
+        adjust_unread([self.alice.id], -3)
+        self.assertEqual(unread_count(self.alice.id), 0)
+
+    def test_archive_keeps_counters(self):
+        self.notify([self.alice], 3)
+        self.mark_read(self.alice)
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=100))
+
+        call_command('archive_notifications', days=90, stdout=mock.Mock())
+        self.assertEqual(NotificationArchive.objects.filter(user=self.alice).count(), 1)
+        self.assertCounter(self.alice, 2)
+        self.assertEqual(reconcile_unread_counters(), 0)
+
+    def test_archive_in_batches_leaves_unread_online(self):
+        self.notify([self.alice, self.bob], 5)
+        for notification in Notification.objects.filter(user=self.alice)[:3]:
+            self.mark_read(self.alice, notification)
+        self.mark_read(self.bob)
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=100))
+
+        call_command('archive_notifications', days=90, batch_size=2, stdout=mock.Mock())
+        self.assertEqual(NotificationArchive.objects.count(), 4)
+        self.assertFalse(Notification.objects.filter(is_read=True).exists())
+        self.assertCounter(self.alice, 2)
+        self.assertCounter(self.bob, 4)
+        self.assertEqual(reconcile_unread_counters(), 0)
+
+        # 归档后新通知、标记全部已读仍在正确的计数上增减
+        self.notify([self.alice])
+        self.assertCounter(self.alice, 3)
+        self.post(self.alice, '/api/notifications/mark_all_read/')
+        self.assertCounter(self.alice, 0)
+        self.assertCounter(self.bob, 4)
+
+    def test_reconcile_after_direct_delete(self):
+        self.notify([self.alice, self.bob], 2)
+        # 绕过计数直接删除未读通知、丢失计数行
+        Notification.objects.filter(user=self.alice).first().delete()
+        NotificationCounter.objects.filter(user=self.bob).delete()
+        self.assertEqual(unread_count(self.alice.id), 2)
+        self.assertEqual(unread_count(self.bob.id), 0)
+
+        self.assertEqual(reconcile_unread_counters(), 2)
+        self.assertCounter(self.alice, 1)
+        self.assertCounter(self.bob, 2)
+        self.assertEqual(reconcile_unread_counters(), 0)
+
+
+class PipelineCounterTests(UnreadCounterMixin, TransactionTestCase):
+    """后台工作线程批量写入通知：计数按批合并增加，shutdown前处理完剩余通知"""
+
+    def build(self, users, count):
+        return [
+            Notification(user=user, type='system', title=f'通知 {i}', content='内容')
+            for i in range(count) for user in users
+        ]
+
+    def test_worker_thread_batches(self):
+        pipeline = NotificationPipeline(batch_size=4)
+        pipeline.submit(self.build([self.alice, self.bob], 5))
+        pipeline.submit(self.build([self.alice], 1))
+        pipeline.shutdown()
+
+        self.assertFalse(pipeline.thread.is_alive())
+        self.assertCounter(self.alice, 6)
+        self.assertCounter(self.bob, 5)
+        self.assertEqual(reconcile_unread_counters(), 0)
+
+    def test_failed_batch_leaves_counters_untouched(self):
+        pipeline = NotificationPipeline(eager=True)
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=RuntimeError), \
+                self.assertLogs('notifications.pipeline', 'ERROR'):
+            pipeline.submit(self.build([self.alice], 2))
+        self.assertCounter(self.alice, 0)
+
+        pipeline.submit(self.build([self.alice], 2))
+        self.assertCounter(self.alice, 2)
+
+
+class StreamChannelTests(UnreadCounterMixin, TransactionTestCase):
+    """SSE投递渠道推送的是本批写入的通知，不受同一用户其他并发写入的影响"""
+
+    def setUp(self):
+        super().setUp()
+        self.published = []
+        broker = mock.Mock(has_subscribers=lambda user_id: True)
+        broker.publish.side_effect = lambda user_id, event, data: self.published.append((user_id, data))
+        patcher = mock.patch.object(stream, '_broker', broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pushes_the_batch_not_the_latest_rows(self):
+        bulk_create = Notification.objects.bulk_create
+
+        def bulk_create_then_other_writer(batch):
+            created = bulk_create(batch)
+            # 写入后、投递前，另一个写入方为同一用户创建了通知
+            Notification.objects.create(user=self.alice, type='system', title='其他写入', content='内容')
+            return created
+
+        batch = [
+            Notification(user=self.alice, type='system', title='通知 1', content='内容'),
+            Notification(user=self.alice, type='system', title='通知 1', content='内容'),
+            Notification(user=self.bob, type='bug_assigned', title='通知 2', content='内容', bug_id=7),
+        ]
+        with mock.patch.object(Notification.objects, 'bulk_create', bulk_create_then_other_writer):
+            NotificationPipeline(eager=True).submit(batch)
+
+        pushed = [(user_id, data['notification']['id']) for user_id, data in self.published]
+        expected = list(Notification.objects.exclude(title='其他写入').order_by('id').values_list('user_id', 'id'))
+        self.assertEqual(pushed, expected)
+        self.assertEqual(len(set(pushed)), 3)
+
+    def test_uses_primary_keys_when_available(self):
+        notification = Notification.objects.create(user=self.alice, type='system', title='通知', content='内容')
+        with CaptureQueriesContext(connection) as ctx:
+            StreamChannel().deliver([notification])
+        self.assertEqual(self.published[0][1]['notification']['id'], notification.id)
+        self.assertFalse(any('FROM "notifications"' in query['sql'] for query in ctx.captured_queries))
+
+
+class NotificationStreamTests(UnreadCounterMixin, TransactionTestCase):
+    """SSE推送接口：令牌校验、初始未读数量、心跳，新通知只推送给接收用户的连接"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(stream, '_broker', LocalBroker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connect(self, user=None, token=None, method='GET'):
+        if token is None:
+            token = str(AccessToken.for_user(user))
+        return ApplicationCommunicator(notification_stream, {
+            'type': 'http',
+            'method': method,
+            'path': STREAM_PATH,
+            'query_string': f'token={token}'.encode(),
+        })
+
+    async def open(self, user):
+        """建立连接，返回 (communicator, 首个数据块)"""
+        communicator = self.connect(user)
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(1)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), start['headers'])
+        return communicator, (await communicator.receive_output(1))['body']
+
+    async def close(self, communicator):
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+
+    async def status(self, communicator):
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(1)
+        await communicator.wait(1)
+        return start['status']
+
+    def test_rejects_invalid_token(self):
+        self.bob.is_active = False
+        self.bob.save()
+
+        async def run():
+            return [
+                await self.status(self.connect(token='')),
+                await self.status(self.connect(token='not-a-token')),
+                await self.status(self.connect(self.bob)),
+                await self.status(self.connect(self.alice, method='POST')),
+            ]
+
+        self.assertEqual(async_to_sync(run)(), [401, 401, 401, 405])
+        self.assertEqual(stream.get_broker().subscribers, {})
+
+    def test_initial_count_and_heartbeat(self):
+        NotificationPipeline(eager=True).submit([
+            Notification(user=self.alice, type='system', title='通知', content='内容'),
+        ])
+
+        async def run():
+            communicator, first = await self.open(self.alice)
+            ping = (await communicator.receive_output(1))['body']
+            await self.close(communicator)
+            return first, ping
+
+        with mock.patch.object(stream, 'HEARTBEAT_INTERVAL', 0.05):
+            first, ping = async_to_sync(run)()
+        self.assertEqual(first, b'retry: 5000\n\n' + stream.format_event('unread', {'count': 1}))
+        self.assertEqual(ping, b': ping\n\n')
+        self.assertEqual(stream.get_broker().subscribers, {})
+
+    def test_notification_reaches_only_its_user(self):
+        async def run():
+            alice, _ = await self.open(self.alice)
+            bob, _ = await self.open(self.bob)
+            await sync_to_async(NotificationPipeline(eager=True).submit)([
+                Notification(user=self.alice, type='system', title='给alice的通知', content='内容'),
+            ])
+            received = (await alice.receive_output(1))['body']
+            self.assertTrue(await bob.receive_nothing(0.2))
+            await self.close(alice)
+            await self.close(bob)
+            return received
+
+        body = async_to_sync(run)().decode()
+        self.assertTrue(body.startswith('event: notification\n'))
+        self.assertIn('给alice的通知', body)
+        self.assertIn('"unread_count": 1', body)
@@ -2,10 +2,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from django.db.models import Count
 
+from .counters import adjust_unread, unread_count
 from .models import Notification
 from .serializers import NotificationSerializer
+from .stream import publish_unread_count
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -23,25 +26,27 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """获取未读消息数量"""
-        count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
-        return Response({'count': count})
+        return Response({'count': unread_count(request.user.id)})
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """标记所有消息为已读"""
-        Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).update(is_read=True)
+        with transaction.atomic():
+            count = Notification.objects.filter(
+                user=request.user,
+                is_read=False
+            ).update(is_read=True)
+            adjust_unread([request.user.id], -count)
+        publish_unread_count(request.user.id)
         return Response({'detail': '已标记所有消息为已读'})
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """标记单条消息为已读"""
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        # 条件更新：只有从未读变为已读时才减少计数，重复标记不会重复扣减
+        with transaction.atomic():
+            if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+                adjust_unread([request.user.id], -1)
+        publish_unread_count(request.user.id)
         return Response({'detail': '已标记为已读'})
@@ -0,0 +1,8 @@
+import request from '../utils/request'
+
+// 批量请求：在一次HTTP请求中执行多个接口调用
+// requests: [{ method, path, body }]，path 为完整路径（如 /api/bugs/1/）
+// 返回与 requests 一一对应的 [{ status, headers, body }]
+export function batch(requests, parallel = true) {
+  return request.post('/batch/', { requests, parallel }).then(res => res.responses)
+}
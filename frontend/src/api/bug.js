@@ -5,9 +5,24 @@ export function getBugList(params) {
   return request.get('/bugs/', { params })
 }
 
-// 获取BUG详情
-export function getBug(id) {
-  return request.get(`/bugs/${id}/`)
+// 获取看板数据（按状态分列，传入status和cursor时加载该列下一页）
+export function getBugKanban(params) {
+  return request.get('/bugs/kanban/', { params })
+}
+
+// 增量同步：获取水位（params.since）之后变化、删除的BUG及路径变化的模块
+export function getBugChanges(params) {
+  return request.get('/bugs/changes/', { params })
+}
+
+// 获取BUG详情（params.fields / params.omit 可只取需要的字段）
+export function getBug(id, params) {
+  return request.get(`/bugs/${id}/`, { params })
+}
+
+// 获取BUG操作历史（游标分页）
+export function getBugHistory(id, params) {
+  return request.get(`/bugs/${id}/history/`, { params })
 }
 
 // 创建BUG
@@ -17,6 +32,11 @@ export function createBug(data) {
   })
 }
 
+// 查找相似BUG（根据草稿标题和描述提示可能重复的BUG）
+export function findSimilarBugs(data) {
+  return request.post('/bugs/similar/', data)
+}
+
 // 更新BUG
 export function updateBug(id, data) {
   return request.put(`/bugs/${id}/`, data, {
@@ -39,6 +59,16 @@ export function assignBug(id, data) {
   return request.post(`/bugs/${id}/assign/`, data)
 }
 
+// 批量修改BUG状态 data: { ids, status, solution?, reject_reason? }
+export function bulkUpdateBugStatus(data) {
+  return request.post('/bugs/bulk_update_status/', data)
+}
+
+// 批量分配BUG data: { ids, assignee }
+export function bulkAssignBugs(data) {
+  return request.post('/bugs/bulk_assign/', data)
+}
+
 // 上传BUG附件
 export function uploadAttachment(id, file) {
   const formData = new FormData()
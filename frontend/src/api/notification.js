@@ -1,3 +1,4 @@
+import Cookies from 'js-cookie'
 import request from '../utils/request'
 
 // 获取通知列表
@@ -19,3 +20,9 @@ export function markAllRead() {
 export function markRead(id) {
   return request.post(`/notifications/${id}/mark_read/`)
 }
+
+// 订阅通知推送（Server-Sent Events），EventSource无法设置请求头，令牌通过查询参数传递
+export function openNotificationStream() {
+  const token = Cookies.get('access_token') || ''
+  return new EventSource(`/api/notifications/stream/?token=${encodeURIComponent(token)}`)
+}